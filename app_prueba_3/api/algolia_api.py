@@ -2,26 +2,106 @@
 API de Algolia para búsquedas optimizadas
 """
 import os
-from typing import List, Dict, Any
+from typing import List, Dict
 from dotenv import load_dotenv
 
-from algoliasearch.search.client import SearchClient
+from algoliasearch.search.client import SearchClient, SearchClientSync
+from .ttl_cache import TTLCache
+from .algolia_utils import algolia_to_cot, algolia_to_certs, algolia_to_fam, algolia_to_client
+from .model_mapping import COT_SPEC, CERTS_SPEC, FAM_SPEC, CLIENT_SPEC
 import asyncio
-import inspect
+from threading import Lock
 
 # Cargar variables de entorno desde .env
 load_dotenv()
-from dotenv import load_dotenv
-import json
 
-# Cargar variables de entorno
-load_dotenv()
+# Conversor hit -> modelo de cada índice (usado por multi_search)
+INDEX_CONVERTERS = {
+    "cotizaciones": algolia_to_cot,
+    "certificados": algolia_to_certs,
+    "familias": algolia_to_fam,
+    "clientes": algolia_to_client,
+}
+
+
+# Atributos que leen los conversores algolia_to_* de cada índice (objectID siempre se devuelve)
+_CONVERTER_ATTRIBUTES = {
+    index_name: [field.algolia for field in spec if field.algolia and field.algolia != "object_id"]
+    for index_name, spec in (
+        ("cotizaciones", COT_SPEC),
+        ("certificados", CERTS_SPEC),
+        ("familias", FAM_SPEC),
+        ("clientes", CLIENT_SPEC),
+    )
+}
+
+# Atributos mínimos para sugerencias mientras se escribe
+_TYPEAHEAD_ATTRIBUTES = {
+    "cotizaciones": ["number", "year", "razonsocial", "estado", "area"],
+    "certificados": ["num", "client", "status", "area"],
+    "familias": ["family", "razonsocial", "area"],
+    "clientes": ["id", "razonsocial"],
+}
+# Sugerencias por búsqueda mientras se escribe
+TYPEAHEAD_HITS_PER_PAGE = int(os.getenv("ALGOLIA_TYPEAHEAD_HITS", "8"))
+
+_PAGE_FIELDS = ["hits", "nbHits", "page", "nbPages", "hitsPerPage"]
+
+
+def view_params(index_name: str, view: str) -> Dict:
+    """
+    Parámetros de Algolia según la vista que va a usar los hits:
+        list       solo los atributos que leen los conversores, sin resaltado ni snippets
+        typeahead  los atributos mínimos para sugerir, sin resaltado, y TYPEAHEAD_HITS_PER_PAGE hits
+        detail     todos los atributos, sin resaltado
+    """
+    if view == "typeahead":
+        attributes = _TYPEAHEAD_ATTRIBUTES.get(index_name, ["*"])
+        return {"attributesToRetrieve": attributes, "attributesToHighlight": [], "attributesToSnippet": [], "hitsPerPage": TYPEAHEAD_HITS_PER_PAGE, "responseFields": _PAGE_FIELDS}
+    if view == "detail":
+        return {"attributesToRetrieve": ["*"], "attributesToHighlight": [], "attributesToSnippet": [], "responseFields": _PAGE_FIELDS}
+    return {"attributesToRetrieve": _CONVERTER_ATTRIBUTES.get(index_name, ["*"]), "attributesToHighlight": [], "attributesToSnippet": [], "responseFields": _PAGE_FIELDS}
+
+
+def typeahead_label(index_name: str, hit: Dict) -> str:
+    """Texto de la sugerencia de un hit del perfil typeahead (el mismo texto sirve como búsqueda)."""
+    if index_name == "familias":
+        return str(hit.get("family") or hit.get("razonsocial") or "")
+    if index_name == "certificados":
+        return str(hit.get("client") or "")
+    return str(hit.get("razonsocial") or "")
+
+
+def build_filters(area: str = "", filters: Dict = None) -> str:
+    """Arma el string de filtros de Algolia (área + filtros clave:valor unidos con AND)."""
+    algolia_filters = []
+    if area:
+        algolia_filters.append(f"area:{area}")
+    if filters:
+        for key, value in filters.items():
+            algolia_filters.append(f"{key}:{value}")
+    return " AND ".join(algolia_filters)
+
 
 class AlgoliaAPI:
     def __init__(self):
         self.app_id = os.getenv("ALGOLIA_APP_ID")
         self.api_key = os.getenv("ALGOLIA_API_KEY")
         self.search_api_key = os.getenv("ALGOLIA_SEARCH_API_KEY")  # Solo para búsquedas (más seguro)
+        # Clientes asíncronos reutilizados: (api key, id del event loop) -> SearchClient.
+        # Cada cliente mantiene su sesión HTTP abierta (keep-alive), así las búsquedas
+        # no repiten el handshake TLS ni bloquean el event loop.
+        self._clients: Dict[tuple, SearchClient] = {}
+        # Resultados de búsqueda: (índice, query, página, hitsPerPage, filtros, vista) -> resultado
+        self.search_cache = TTLCache(
+            max_entries=int(os.getenv("ALGOLIA_CACHE_MAX_ENTRIES", "256")),
+            ttl=float(os.getenv("ALGOLIA_CACHE_TTL", "60")),
+        )
+        # Búsquedas en curso (incluye prefetch): (id del event loop, clave) -> Task
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        # Cliente de escritura (API key de administración), sincrónico y compartido
+        self._admin_client = None
+        self._admin_lock = Lock()
         
         if not self.app_id or not self.api_key:
             print("⚠️  Credenciales de Algolia no configuradas")
@@ -32,7 +112,7 @@ class AlgoliaAPI:
         try:
             # Usar la clave de búsqueda para operaciones de búsqueda (más segura)
             self.search_key = self.search_api_key if self.search_api_key else self.api_key
-            self.client = SearchClient(self.app_id, self.search_key)
+            self.client = None  # Se crea al primer uso, dentro del event loop que lo va a usar
             
             self.enabled = True
             print("✅ Algolia inicializado correctamente")
@@ -41,191 +121,218 @@ class AlgoliaAPI:
             self.client = None
             self.enabled = False
 
-    async def search_cots(self, query: str, page: int = 0, hits_per_page: int = 20, area: str = "", filters: Dict = None) -> Dict:
-        """Buscar cotizaciones en Algolia con paginación"""
-        if not self.enabled:
-            print("⚠️  Algolia no está habilitado")
-            return {}
-        
+    def _get_client(self, api_key: str = None) -> SearchClient:
+        """
+        Devuelve el cliente asíncrono de `api_key` (por defecto la clave de búsqueda) para el event loop actual.
+        Se crea una sola vez por clave y loop: la sesión HTTP del cliente queda ligada al loop donde se abrió.
+        """
+        api_key = api_key or self.search_key
+        key = (api_key, id(asyncio.get_running_loop()))
+        client = self._clients.get(key)
+        if client is None:
+            client = SearchClient(self.app_id, api_key)
+            self._clients[key] = client
+            if api_key == self.search_key:
+                self.client = client
+            print(f"🔌 Cliente de Algolia creado ({len(self._clients)} en uso)")
+        return client
+
+    async def close(self):
+        """Cierra las sesiones HTTP de los clientes creados en el event loop actual."""
+        loop_id = id(asyncio.get_running_loop())
+        for key in [key for key in self._clients if key[1] == loop_id]:
+            client = self._clients.pop(key)
+            try:
+                await client.close()
+            except Exception as e:
+                print(f"⚠️ Error al cerrar cliente de Algolia: {e}")
+        self.client = None
+
+    async def _search(self, index_name: str, query: str, page: int, hits_per_page: int, area: str = "", filters: Dict = None, view: str = "list") -> Dict:
+        """Búsqueda paginada en `index_name` con el cliente compartido; devuelve {} si falla."""
         try:
-            print(f"🔍 Iniciando búsqueda en Algolia: '{query}', página: {page}")
+            print(f"🔍 Iniciando búsqueda de {index_name} en Algolia: '{query}', página: {page}")
             if area:
                 print(f"🔍 Filtrando por área: {area}")
             if filters:
                 print(f"🔍 Filtros adicionales: {filters}")
             
-            from algoliasearch.search.client import SearchClientSync
-            sync_client = SearchClientSync(self.app_id, self.search_key)
-            
             # Agregar filtros si se proporcionan
-            algolia_filters = []
-            if area:
-                algolia_filters.append(f"area:{area}")
-            if filters:
-                for key, value in filters.items():
-                    algolia_filters.append(f"{key}:{value}")
-            
+            algolia_filters = build_filters(area, filters)
             if algolia_filters:
-                print(f"🔍 Filtros aplicados: {' AND '.join(algolia_filters)}")
+                print(f"🔍 Filtros aplicados: {algolia_filters}")
             
-            results = sync_client.search_single_index(
-                index_name="cotizaciones", 
-                search_params={
-                    "query": query,
-                    "page": page,
-                    "hitsPerPage": hits_per_page,
-                    **({} if not algolia_filters else {"filters": " AND ".join(algolia_filters)})
-                }
-            )
+            key = (index_name, query, page, hits_per_page, algolia_filters, view)
+            results = self.search_cache.get(key)
+            if results is not None:
+                print(f"⚡ Página {page} de '{query}' servida desde cache ({index_name})")
+            else:
+                results = await self._fetch_search(key)
+            
+            # Dejar lista la página siguiente para el scroll infinito (las sugerencias no se paginan)
+            if view != "typeahead" and page + 1 < results["nbPages"]:
+                self._prefetch_search((index_name, query, page + 1, hits_per_page, algolia_filters, view))
+            
+            print(f"🔍 Algolia encontró {results['nbHits']} {index_name} para '{query}'")
+            return results
             
-            print(f"🔍 Algolia encontró {results.nb_hits} cotizaciones para '{query}'")
-            return {"hits": results.hits, "nbHits": results.nb_hits, "page": results.page, "nbPages": results.nb_pages, "hitsPerPage": results.hits_per_page}
-                
         except Exception as e:
-            print(f"❌ Error en búsqueda de Algolia (cotizaciones): {e}")
+            print(f"❌ Error en búsqueda de Algolia ({index_name}): {e}")
             return {}
 
-    async def search_certs(self, query: str, page: int = 0, hits_per_page: int = 20, area: str = "", filters: Dict = None) -> Dict:
+    async def _search_request(self, key: tuple) -> Dict:
+        """Ejecuta la búsqueda de `key` en Algolia y guarda el resultado en el cache."""
+        index_name, query, page, hits_per_page, algolia_filters, view = key
+        results = await self._get_client().search_single_index(
+            index_name=index_name, 
+            search_params={
+                "query": query,
+                "page": page,
+                "hitsPerPage": hits_per_page,
+                **({} if not algolia_filters else {"filters": algolia_filters}),
+                **view_params(index_name, view),
+            }
+        )
+        results = {"hits": results.hits, "nbHits": results.nb_hits, "page": results.page, "nbPages": results.nb_pages, "hitsPerPage": results.hits_per_page}
+        self.search_cache.set(key, results)
+        return results
+
+    async def _fetch_search(self, key: tuple) -> Dict:
+        """Resultado de `key` desde Algolia, reutilizando la búsqueda si ya está en curso (p. ej. un prefetch)."""
+        inflight_key = (id(asyncio.get_running_loop()), key)
+        task = self._inflight.get(inflight_key)
+        if task is None:
+            task = asyncio.ensure_future(self._search_request(key))
+            self._inflight[inflight_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(inflight_key, None))
+        # shield: si se cancela quien espera, la búsqueda sigue y queda en cache para el próximo
+        return await asyncio.shield(task)
+
+    def _prefetch_search(self, key: tuple):
+        """Lanza en segundo plano la búsqueda de `key` si no está en cache ni en curso."""
+        if self.search_cache.get(key) is not None or (id(asyncio.get_running_loop()), key) in self._inflight:
+            return
+
+        async def _prefetch():
+            try:
+                await self._fetch_search(key)
+                print(f"⚡ Prefetch de la página {key[2]} de '{key[1]}' ({key[0]}) listo")
+            except Exception as e:
+                print(f"⚠️ Error en prefetch de Algolia ({key[0]}): {e}")
+
+        asyncio.ensure_future(_prefetch())
+
+    def invalidate_search_cache(self, index_name: str = None) -> int:
+        """Elimina del cache las búsquedas de `index_name` (todas si es None). Devuelve cuántas."""
+        if index_name is None:
+            return self.search_cache.invalidate()
+        return self.search_cache.invalidate(lambda key: key[0] == index_name)
+
+    async def search_cots(self, query: str, page: int = 0, hits_per_page: int = 20, area: str = "", filters: Dict = None, view: str = "list") -> Dict:
+        """Buscar cotizaciones en Algolia con paginación"""
+        if not self.enabled:
+            print("⚠️  Algolia no está habilitado")
+            return {}
+        return await self._search("cotizaciones", query, page, hits_per_page, area, filters, view)
+
+    async def search_certs(self, query: str, page: int = 0, hits_per_page: int = 20, area: str = "", filters: Dict = None, view: str = "list") -> Dict:
         """
         Busca certificados en Algolia con paginación
         """
         if not self.enabled:
             print("⚠️  Algolia no está habilitado, usando búsqueda local")
             return {}
-            
-        try:
-            print(f"🔍 Iniciando búsqueda de certificados en Algolia: '{query}', página: {page}")
-            if area:
-                print(f"🔍 Filtrando por área: {area}")
-            if filters:
-                print(f"🔍 Filtros adicionales: {filters}")
-            
-            from algoliasearch.search.client import SearchClientSync
-            sync_client = SearchClientSync(self.app_id, self.search_key)
-            
-            # Agregar filtros si se proporcionan
-            algolia_filters = []
-            if area:
-                algolia_filters.append(f"area:{area}")
-            if filters:
-                for key, value in filters.items():
-                    algolia_filters.append(f"{key}:{value}")
-            
-            if algolia_filters:
-                print(f"🔍 Filtros aplicados: {' AND '.join(algolia_filters)}")
-            
-            results = sync_client.search_single_index(
-                index_name="certificados", 
-                search_params={
-                    "query": query,
-                    "page": page,
-                    "hitsPerPage": hits_per_page,
-                    **({} if not algolia_filters else {"filters": " AND ".join(algolia_filters)})
-                }
-            )
-            
-            print(f"🔍 Algolia encontró {results.nb_hits} certificados para '{query}'")
-            return {"hits": results.hits, "nbHits": results.nb_hits, "page": results.page, "nbPages": results.nb_pages, "hitsPerPage": results.hits_per_page}
-            
-        except Exception as e:
-            print(f"❌ Error en búsqueda de Algolia (certificados): {e}")
-            return {}
+        return await self._search("certificados", query, page, hits_per_page, area, filters, view)
     
-    async def search_fams(self, query: str, page: int = 0, hits_per_page: int = 20, area: str = "", filters: Dict = None) -> Dict:
+    async def search_fams(self, query: str, page: int = 0, hits_per_page: int = 20, area: str = "", filters: Dict = None, view: str = "list") -> Dict:
         """
         Busca familias en Algolia con paginación
         """
         if not self.enabled:
             print("⚠️  Algolia no está habilitado, usando búsqueda local")
             return {}
-            
-        try:
-            print(f"🔍 Iniciando búsqueda de familias en Algolia: '{query}', página: {page}")
-            if area:
-                print(f"🔍 Filtrando por área: {area}")
-            if filters:
-                print(f"🔍 Filtros adicionales: {filters}")
-            
-            from algoliasearch.search.client import SearchClientSync
-            sync_client = SearchClientSync(self.app_id, self.search_key)
-            
-            # Agregar filtros si se proporcionan
-            algolia_filters = []
-            if area:
-                algolia_filters.append(f"area:{area}")
-            if filters:
-                for key, value in filters.items():
-                    algolia_filters.append(f"{key}:{value}")
-            
-            if algolia_filters:
-                print(f"🔍 Filtros aplicados: {' AND '.join(algolia_filters)}")
-            
-            results = sync_client.search_single_index(
-                index_name="familias", 
-                search_params={
-                    "query": query,
-                    "page": page,
-                    "hitsPerPage": hits_per_page,
-                    **({} if not algolia_filters else {"filters": " AND ".join(algolia_filters)})
-                }
-            )
-            
-            print(f"🔍 Algolia encontró {results.nb_hits} familias para '{query}'")
-            return {"hits": results.hits, "nbHits": results.nb_hits, "page": results.page, "nbPages": results.nb_pages, "hitsPerPage": results.hits_per_page}
-            
-        except Exception as e:
-            print(f"❌ Error en búsqueda de Algolia (familias): {e}")
-            return {}
+        return await self._search("familias", query, page, hits_per_page, area, filters, view)
     
-    async def search_clients(self, query: str, page: int = 0, hits_per_page: int = 20, area: str = "", filters: Dict = None) -> Dict:
+    async def search_clients(self, query: str, page: int = 0, hits_per_page: int = 20, area: str = "", filters: Dict = None, view: str = "list") -> Dict:
         """
         Busca clientes en Algolia con paginación
         """
         if not self.enabled:
             print("⚠️  Algolia no está habilitado, usando búsqueda local")
             return {}
-            
+        return await self._search("clientes", query, page, hits_per_page, area, filters, view)
+
+    async def multi_search(self, searches: Dict[str, Dict]) -> Dict[str, Dict]:
+        """
+        Busca en varios índices en una sola llamada a Algolia.
+        
+        Args:
+            searches: índice -> parámetros. Cada entrada acepta query, page, hits_per_page,
+                      area y filters (como en search_*) y cualquier otro parámetro de
+                      búsqueda de Algolia (p. ej. {"attributesToRetrieve": [...]}).
+                      "view" elige el perfil de atributos (list, typeahead, detail; ver view_params).
+                      Índices: cotizaciones, certificados, familias, clientes.
+        
+        Returns:
+            índice -> {"hits": [modelos], "nbHits", "page", "nbPages", "hitsPerPage"}.
+            Los hits se convierten con los conversores de algolia_utils (Cot, Certs, Fam, Client).
+            Devuelve {} si Algolia no está habilitado o la llamada falla.
+        """
+        if not self.enabled:
+            print("⚠️  Algolia no está habilitado, usando búsqueda local")
+            return {}
+        if not searches:
+            return {}
+
         try:
-            print(f"🔍 Iniciando búsqueda de clientes en Algolia: '{query}', página: {page}")
-            if area:
-                print(f"🔍 Filtrando por área: {area}")
-            if filters:
-                print(f"🔍 Filtros adicionales: {filters}")
-            
-            from algoliasearch.search.client import SearchClientSync
-            sync_client = SearchClientSync(self.app_id, self.search_key)
-            
-            # Agregar filtros si se proporcionan
-            algolia_filters = []
-            if area:
-                algolia_filters.append(f"area:{area}")
-            if filters:
-                for key, value in filters.items():
-                    algolia_filters.append(f"{key}:{value}")
-            
-            if algolia_filters:
-                print(f"🔍 Filtros aplicados: {' AND '.join(algolia_filters)}")
-            
-            results = sync_client.search_single_index(
-                index_name="clientes", 
-                search_params={
-                    "query": query,
-                    "page": page,
-                    "hitsPerPage": hits_per_page,
-                    **({} if not algolia_filters else {"filters": " AND ".join(algolia_filters)})
+            index_names = list(searches)
+            requests = []
+            for index_name in index_names:
+                params = dict(searches[index_name])
+                algolia_filters = build_filters(params.pop("area", ""), params.pop("filters", None))
+                request = {
+                    "indexName": index_name,
+                    "query": params.pop("query", ""),
+                    "page": params.pop("page", 0),
+                    "hitsPerPage": params.pop("hits_per_page", 20),
+                    **view_params(index_name, params.pop("view", "list")),
+                    **params,
                 }
-            )
-            
-            print(f"🔍 Algolia encontró {results.nb_hits} clientes para '{query}'")
-            return {"hits": results.hits, "nbHits": results.nb_hits, "page": results.page, "nbPages": results.nb_pages, "hitsPerPage": results.hits_per_page}
-            
+                if algolia_filters:
+                    request["filters"] = algolia_filters
+                requests.append(request)
+
+            print(f"🔍 Búsqueda en Algolia sobre {len(requests)} índices: {', '.join(index_names)}")
+            response = await self._get_client().search(search_method_params={"requests": requests})
+
+            results = {}
+            for index_name, result in zip(index_names, response.results):
+                # Cada resultado viene envuelto (oneOf); el SearchResponse está en actual_instance
+                result = getattr(result, "actual_instance", None) or result
+                converter = INDEX_CONVERTERS.get(index_name)
+                hits = [converter(dict(hit)) if converter else dict(hit) for hit in result.hits]
+                results[index_name] = {"hits": hits, "nbHits": result.nb_hits, "page": result.page, "nbPages": result.nb_pages, "hitsPerPage": result.hits_per_page}
+                print(f"🔍 Algolia encontró {result.nb_hits} {index_name}")
+            return results
+
         except Exception as e:
-            print(f"❌ Error en búsqueda de Algolia (clientes): {e}")
+            print(f"❌ Error en búsqueda múltiple de Algolia: {e}")
             return {}
     
-    def index_data(self, index_name: str, records: List[Dict]) -> bool:
+    def get_admin_client(self) -> SearchClientSync:
+        """
+        Cliente sincrónico con la API key de administración, creado una sola vez.
+        Se usa desde código sincrónico (escrituras de FirestoreAPI, scripts de reindexado).
+        """
+        with self._admin_lock:
+            if self._admin_client is None:
+                self._admin_client = SearchClientSync(self.app_id, self.api_key)
+            return self._admin_client
+
+    def index_data(self, index_name: str, records: List[Dict], wait: bool = False) -> bool:
         """
         Indexa datos en Algolia usando el cliente administrativo.
+        Los registros se envían en lotes de 1000; con `wait` se espera a que Algolia los publique.
         """
         if not self.enabled:
             print("⚠️ Algolia deshabilitado - no se indexarán datos")
@@ -236,36 +343,9 @@ class AlgoliaAPI:
             return False
             
         try:
-            # Para indexar necesitamos la API key con permisos de escritura
-            admin_client = SearchClient(self.app_id, self.api_key)
-            
-            # Indexar en lotes usando save_objects directamente
-            batch_size = 1000
-            for i in range(0, len(records), batch_size):
-                batch = records[i:i + batch_size]
-                # Usar save_objects directamente en el cliente, pasando el índice como parámetro
-                # Nota: Algunas versiones de algoliasearch pueden devolver un coroutine
-                # Si save_objects devuelve coroutine, necesitamos await en contexto async
-                result = admin_client.save_objects(index_name, batch, {'autoGenerateObjectIDIfNotExist': True})
-                # Si save_objects devuelve un coroutine/future, ejecutarlo/awaitearlo correctamente
-                try:
-                    is_awaitable = inspect.isawaitable(result) or hasattr(result, '__await__') or isinstance(result, asyncio.Future)
-                    if is_awaitable:
-                        # Ejecutar la coroutine en un hilo separado para garantizar que se awaitée
-                        from threading import Thread
-
-                        def _run_coro():
-                            try:
-                                asyncio.run(result)
-                            except Exception as e_run:
-                                print(f"⚠️ Error al ejecutar save_objects en hilo: {e_run}")
-
-                        t = Thread(target=_run_coro, daemon=True)
-                        t.start()
-                except Exception as e_await:
-                    print(f"⚠️ Error detectando/ejecutando save_objects de Algolia: {e_await}")
-                
-            print(f"✅ {len(records)} registros indexados en '{index_name}'")
+            responses = self.get_admin_client().save_objects(index_name, records, wait_for_tasks=wait, batch_size=1000)
+            self.invalidate_search_cache(index_name)
+            print(f"✅ {len(records)} registros indexados en '{index_name}' ({len(responses)} lotes)")
             return True
             
         except Exception as e:
@@ -280,10 +360,7 @@ class AlgoliaAPI:
             return {}
 
         try:
-            from algoliasearch.search.client import SearchClientSync
-            sync_client = SearchClientSync(self.app_id, self.search_key)
-
-            results = sync_client.search_single_index(
+            results = await self._get_client().search_single_index(
                 index_name=index_name,
                 search_params={
                     "query": "",
@@ -0,0 +1,237 @@
+"""
+Sincronización incremental Firestore -> Algolia.
+
+Un listener on_snapshot por colección indexada (cotizaciones, certificados,
+familias, clientes) recibe solo los documentos que cambiaron. Los cambios se
+acumulan por id durante una ventana corta (el último cambio de cada documento
+gana) y un hilo los envía en lotes: save_objects con el registro completo de
+*_to_algolia para los documentos agregados o modificados (el mismo que arma
+scripts/reindex_algolia.py, así un campo borrado en Firestore también desaparece
+del registro) y delete_objects para los eliminados.
+
+Puesta al día: después de cada envío exitoso se guarda, por colección, el
+read_time del último snapshot enviado (ALGOLIA_SYNC_CHECKPOINT). El primer
+snapshot de un listener trae la colección completa; de él solo se envían los
+documentos con update_time posterior al checkpoint, es decir, los escritos
+mientras la sincronización no corría. Sin checkpoint no se envía nada (la carga
+inicial es tarea de scripts/reindex_algolia.py). Los documentos eliminados
+mientras no corría no aparecen en ningún snapshot: para quitarlos de Algolia
+hay que correr el reindex con --swap.
+
+Si un listener falla el error no llega al callback: el Watch deja de estar
+activo. En cada ventana se revisan los listeners y se reinician los que se
+detuvieron, con la misma puesta al día desde el checkpoint.
+
+Firestore cobra la lectura de todos los documentos cada vez que se inicia un
+listener y el Watch los mantiene en memoria, así que la sincronización debe
+correr en UN solo proceso: el script dedicado scripts/sync_algolia.py
+(recomendado) o un único proceso del backend con ALGOLIA_SYNC_ENABLED=true. Con
+varios procesos cada uno leería la base completa y enviaría los mismos cambios.
+
+El cache de búsquedas de cada proceso web (ALGOLIA_CACHE_TTL) no se entera de
+estos envíos: un resultado puede quedar desactualizado hasta que vence.
+"""
+import contextlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Dict, Union
+
+from .algolia_api import algolia_api
+from .algolia_utils import ALGOLIA_COLLECTIONS
+from .firestore_api import firestore_api
+
+# Segundos durante los que se acumulan cambios antes de enviarlos
+ALGOLIA_SYNC_WINDOW = float(os.getenv("ALGOLIA_SYNC_WINDOW", "2"))
+# Sincronizar desde el backend de Reflex (solo en un proceso; ver docstring del módulo)
+ALGOLIA_SYNC_ENABLED = os.getenv("ALGOLIA_SYNC_ENABLED", "false").lower() in ("1", "true", "yes")
+# Archivo con el read_time del último snapshot enviado de cada colección
+ALGOLIA_SYNC_CHECKPOINT = os.getenv("ALGOLIA_SYNC_CHECKPOINT", ".algolia_sync_checkpoint.json")
+
+
+class AlgoliaSyncWorker:
+    def __init__(self, window: float = ALGOLIA_SYNC_WINDOW, checkpoint_path: str = ALGOLIA_SYNC_CHECKPOINT):
+        self.window = window
+        self.checkpoint_path = Path(checkpoint_path)
+        self._pending: Dict[str, Dict[str, Union[dict, None]]] = {}  # colección -> id -> registro (None = eliminar)
+        self._read_times: Dict[str, datetime] = {}  # colección -> read_time del último snapshot acumulado
+        self._checkpoint: Dict[str, datetime] = {}  # colección -> read_time del último snapshot enviado
+        self._lock = Lock()
+        self._stop = Event()
+        self._watches = {}  # colección -> Watch
+        self._thread = None
+
+    def start(self) -> bool:
+        """Inicia los listeners y el hilo de envío. Devuelve False si Firestore o Algolia no están disponibles."""
+        if self._thread is not None:
+            return True
+        if not firestore_api.firebase_initialized or not algolia_api.enabled:
+            print("⚠️  Sincronización con Algolia deshabilitada (Firestore o Algolia no configurados)")
+            return False
+
+        self._checkpoint = self._load_checkpoint()
+        for collection in ALGOLIA_COLLECTIONS:
+            self._watch(collection)
+
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="algolia-sync", daemon=True)
+        self._thread.start()
+        print(f"👂 Sincronización con Algolia iniciada ({len(self._watches)} colecciones, ventana {self.window}s)")
+        return True
+
+    def stop(self):
+        """Detiene los listeners y envía los cambios pendientes."""
+        if self._thread is not None:
+            # Primero el hilo, para que el supervisor no reinicie los listeners que se detienen
+            self._stop.set()
+            self._thread.join(timeout=30)
+            self._thread = None
+        for watch in self._watches.values():
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                print(f"Error al detener listener de Algolia: {e}")
+        self._watches = {}
+        self.flush()
+        print("🔇 Sincronización con Algolia detenida")
+
+    def _watch(self, collection: str):
+        """Inicia (o reinicia) el listener de una colección."""
+        try:
+            self._watches[collection] = firestore_api.db.collection(collection).on_snapshot(self._listener(collection))
+        except Exception as e:
+            self._watches.pop(collection, None)
+            print(f"❌ Error al escuchar '{collection}' para Algolia: {e}")
+
+    def _supervise(self):
+        """Reinicia los listeners que se detuvieron (o que no se pudieron iniciar)."""
+        for collection in ALGOLIA_COLLECTIONS:
+            if self._stop.is_set():
+                return
+            watch = self._watches.get(collection)
+            if watch is not None and getattr(watch, "is_active", True):
+                continue
+            print(f"⚠️  Listener de Algolia para '{collection}' detenido; reiniciando")
+            if watch is not None:
+                try:
+                    watch.unsubscribe()
+                except Exception:
+                    pass
+            self._watch(collection)
+
+    def _listener(self, collection: str):
+        to_model, to_record = ALGOLIA_COLLECTIONS[collection]
+        initial = [True]
+
+        def on_snapshot(snapshot, changes, read_time):
+            try:
+                updates = {}
+                if initial[0]:
+                    # Colección completa: enviar solo lo escrito después del último envío
+                    initial[0] = False
+                    since = self._checkpoint.get(collection)
+                    if since is None:
+                        print(f"⚠️  Sin checkpoint de '{collection}': se sincronizan solo los cambios nuevos "
+                              f"(correr scripts/reindex_algolia.py para la carga inicial)")
+                    else:
+                        for doc in snapshot:
+                            if doc.update_time is not None and doc.update_time >= since:
+                                updates[doc.id] = to_record(to_model({"id": doc.id, **(doc.to_dict() or {})}))
+                        print(f"🔁 Algolia '{collection}': {len(updates)} documentos escritos desde {since.isoformat()}")
+                else:
+                    for change in changes:
+                        doc_id = change.document.id
+                        if change.type.name == "REMOVED":
+                            updates[doc_id] = None
+                        else:
+                            updates[doc_id] = to_record(to_model({"id": doc_id, **(change.document.to_dict() or {})}))
+                with self._lock:
+                    self._pending.setdefault(collection, {}).update(updates)
+                    self._read_times[collection] = read_time
+            except Exception as e:
+                print(f"❌ Error al preparar cambios de '{collection}' para Algolia: {e}")
+
+        return on_snapshot
+
+    def _run(self):
+        while not self._stop.wait(self.window):
+            self.flush()
+            self._supervise()
+        self.flush()
+
+    def flush(self):
+        """Envía a Algolia los cambios acumulados, un lote de registros y uno de eliminaciones por índice."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            read_times, self._read_times = self._read_times, {}
+
+        advanced = False
+        for collection in set(pending) | set(read_times):
+            changes = pending.get(collection, {})
+            records = [record for record in changes.values() if record is not None]
+            deleted = [doc_id for doc_id, record in changes.items() if record is None]
+            started = time.perf_counter()
+            try:
+                client = algolia_api.get_admin_client()
+                if records:
+                    client.save_objects(collection, records)
+                if deleted:
+                    client.delete_objects(collection, deleted)
+                if changes:
+                    print(f"🔄 Algolia '{collection}': {len(records)} guardados, {len(deleted)} eliminados "
+                          f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+                if collection in read_times:
+                    self._checkpoint[collection] = read_times[collection]
+                    advanced = True
+            except Exception as e:
+                print(f"❌ Error al sincronizar '{collection}' con Algolia: {e}")
+                # Reintentar en la próxima ventana, salvo los documentos que ya cambiaron de nuevo
+                with self._lock:
+                    newer = self._pending.setdefault(collection, {})
+                    for doc_id, record in changes.items():
+                        newer.setdefault(doc_id, record)
+                    if collection in read_times:
+                        self._read_times.setdefault(collection, read_times[collection])
+
+        if advanced:
+            self._save_checkpoint()
+
+    def _load_checkpoint(self) -> Dict[str, datetime]:
+        try:
+            if self.checkpoint_path.exists():
+                data = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+                return {collection: datetime.fromisoformat(value) for collection, value in data.items()}
+        except Exception as e:
+            print(f"⚠️  No se pudo leer el checkpoint de Algolia {self.checkpoint_path}: {e}")
+        return {}
+
+    def _save_checkpoint(self):
+        # Escribir y renombrar para no dejar un checkpoint truncado
+        try:
+            data = {collection: value.isoformat() for collection, value in self._checkpoint.items()}
+            tmp = self.checkpoint_path.with_suffix(self.checkpoint_path.suffix + ".tmp")
+            tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            os.replace(tmp, self.checkpoint_path)
+        except Exception as e:
+            print(f"⚠️  No se pudo guardar el checkpoint de Algolia {self.checkpoint_path}: {e}")
+
+
+# Instancia global
+algolia_sync = AlgoliaSyncWorker()
+
+
+@contextlib.asynccontextmanager
+async def algolia_sync_lifespan():
+    """
+    Tarea de ciclo de vida de la app: sincroniza mientras el backend está corriendo.
+    Solo si ALGOLIA_SYNC_ENABLED=true, en un único proceso (si no, usar scripts/sync_algolia.py).
+    """
+    started = ALGOLIA_SYNC_ENABLED and algolia_sync.start()
+    try:
+        yield
+    finally:
+        if started:
+            algolia_sync.stop()
@@ -0,0 +1,168 @@
+"""
+Índice de razones sociales de clientes para la búsqueda por similitud.
+
+Cada cliente se guarda una sola vez con su nombre normalizado y sus palabras y
+trigramas en listas invertidas. Una búsqueda:
+  1. resuelve la coincidencia exacta del nombre normalizado con un diccionario;
+  2. arma los candidatos (blocking) con los clientes que comparten alguna palabra
+     poco frecuente y los que más trigramas comparten con la búsqueda, ya
+     restringidos al área pedida;
+  3. recién ahí calcula difflib.SequenceMatcher, solo sobre esos candidatos.
+
+El índice se actualiza por cliente (add_many / remove), p. ej. desde un listener
+on_snapshot de la colección 'clientes', sin volver a normalizar los que no cambiaron.
+"""
+import difflib
+from collections import Counter
+from threading import Lock
+from typing import Callable, Dict, List, Tuple, Union
+
+
+def _trigrams(text: str) -> set:
+    # Con espacios a los lados para que los nombres cortos también tengan trigramas
+    text = f" {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ClientNameIndex:
+    def __init__(self, normalize: Callable[[str], str], max_candidates: int = 50):
+        """
+        Args:
+            normalize: Normalizador de razón social (mismo criterio para clientes y búsquedas).
+            max_candidates (int): Candidatos por trigramas a evaluar con SequenceMatcher.
+        """
+        self.normalize = normalize
+        self.max_candidates = max_candidates
+        self._clients: Dict[str, object] = {}    # id -> Client
+        self._areas: Dict[str, str] = {}         # id -> área del documento
+        self._by_area: Dict[str, set] = {}       # área -> ids
+        self._names: Dict[str, str] = {}         # id -> nombre normalizado
+        self._exact: Dict[str, set] = {}         # nombre normalizado -> ids
+        self._tokens: Dict[str, set] = {}        # palabra -> ids
+        self._grams: Dict[str, set] = {}         # trigrama -> ids
+        self._lock = Lock()
+
+    def add_many(self, clients: List[Tuple[object, str]]):
+        """Agrega o actualiza clientes como (Client, área). Solo se reindexan los que cambiaron de nombre."""
+        with self._lock:
+            for client, area in clients:
+                if not client.id:
+                    continue
+                self._clients[client.id] = client
+                self._set_area(client.id, area or "")
+                name = self.normalize(client.razonsocial) if client.razonsocial else ""
+                previous = self._names.get(client.id)
+                if previous == name:
+                    continue
+                if previous is not None:
+                    self._unpost(client.id, previous)
+                self._names[client.id] = name
+                if name:
+                    self._post(client.id, name)
+
+    def remove(self, client_id: str):
+        with self._lock:
+            name = self._names.pop(client_id, None)
+            if name:
+                self._unpost(client_id, name)
+            self._clients.pop(client_id, None)
+            self._set_area(client_id, None)
+
+    def _set_area(self, client_id: str, area: Union[str, None]):
+        """Actualiza el área del cliente (None = quitarlo)."""
+        previous = self._areas.pop(client_id, None)
+        if previous is not None:
+            ids = self._by_area.get(previous)
+            if ids is not None:
+                ids.discard(client_id)
+                if not ids:
+                    del self._by_area[previous]
+        if area is not None:
+            self._areas[client_id] = area
+            self._by_area.setdefault(area, set()).add(client_id)
+
+    def _post(self, client_id: str, name: str):
+        self._exact.setdefault(name, set()).add(client_id)
+        for token in set(name.split()):
+            self._tokens.setdefault(token, set()).add(client_id)
+        for gram in _trigrams(name):
+            self._grams.setdefault(gram, set()).add(client_id)
+
+    def _unpost(self, client_id: str, name: str):
+        for postings, keys in (
+            (self._exact, [name]),
+            (self._tokens, set(name.split())),
+            (self._grams, _trigrams(name)),
+        ):
+            for key in keys:
+                ids = postings.get(key)
+                if ids is not None:
+                    ids.discard(client_id)
+                    if not ids:
+                        del postings[key]
+
+    def _candidates(self, name: str, area: Union[str, None] = None) -> set:
+        """
+        Coincidencias exactas, clientes que comparten alguna palabra poco frecuente
+        y los `max_candidates` que más trigramas comparten con `name`. Con `area`
+        solo se consideran los clientes de esa área (antes de recortar).
+        """
+        in_area = self._by_area.get(area, set()) if area else None
+
+        def postings(table: dict, key: str) -> set:
+            ids = table.get(key, set())
+            return ids & in_area if in_area is not None else ids
+
+        candidates = set(postings(self._exact, name))
+        for token in set(name.split()):
+            ids = postings(self._tokens, token)
+            # Las palabras muy comunes (p. ej. INDUSTRIAS) no sirven para acotar
+            if len(ids) <= self.max_candidates:
+                candidates.update(ids)
+        shared = Counter()
+        for gram in _trigrams(name):
+            shared.update(postings(self._grams, gram))
+        candidates.update(client_id for client_id, _ in shared.most_common(self.max_candidates))
+        return candidates
+
+    def match(
+        self,
+        razonsocial: str,
+        similarity_threshold: float = 0.6,
+        area: Union[str, None] = None,
+        word_similarity: bool = True,
+        limit: int = 0,
+    ) -> List[Tuple[object, float]]:
+        """
+        Clientes similares a `razonsocial` como (Client, similitud), de mayor a menor.
+
+        La similitud es la de SequenceMatcher entre nombres normalizados; con
+        `word_similarity` se toma el máximo con la proporción de palabras en común.
+        Las coincidencias exactas del nombre normalizado valen 1.0.
+        """
+        name = self.normalize(razonsocial) if razonsocial else ""
+        if not name:
+            return []
+
+        with self._lock:
+            search_words = set(name.split())
+            scored = []
+            for client_id in self._candidates(name, area):
+                client_name = self._names[client_id]
+                if client_name == name:
+                    scored.append((self._clients[client_id], 1.0))
+                    continue
+                similarity = difflib.SequenceMatcher(None, name, client_name).ratio()
+                if word_similarity:
+                    client_words = set(client_name.split())
+                    overlap = len(search_words & client_words) / max(len(search_words), len(client_words))
+                    similarity = max(similarity, overlap)
+                if similarity >= similarity_threshold:
+                    scored.append((self._clients[client_id], similarity))
+
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit] if limit > 0 else scored
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
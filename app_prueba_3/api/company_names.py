@@ -0,0 +1,133 @@
+"""
+Normalización de razones sociales (compartida por Firestore, Algolia y la búsqueda de clientes).
+
+Pasa el nombre a mayúsculas, reemplaza la puntuación por espacios y quita las
+terminaciones de tipo de sociedad (S.A., S.R.L., SAS, SAICYF, ...). Las expresiones
+se compilan una sola vez: una combinada detecta si el nombre tiene alguna
+terminación (la mayoría de las veces no hace falta nada más) y solo en ese caso
+se aplican las terminaciones en orden. Los resultados se memorizan en un cache
+acotado porque los mismos nombres se normalizan una y otra vez.
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Iterable, List
+
+_PUNCTUATION = re.compile(r'[.,;:\-_()[\]{}"]')
+_SPACES = re.compile(r'\s+')
+
+# Terminaciones de tipos de sociedad, en el orden en que se eliminan del final del nombre
+SOCIETY_ENDINGS = [
+    # Formatos con puntos y sin puntos
+    'SOCIEDAD ANONIMA',
+    'S\\.?A\\.?$',  # SA, S.A., S.A
+    'S\\s+A$',  # S A
+
+    'SOCIEDAD DE RESPONSABILIDAD LIMITADA',
+    'S\\.?R\\.?L\\.?$',  # SRL, S.R.L., S.R.L
+    'S\\s+R\\s+L$',  # S R L
+
+    'CENTRO INTEGRAL DE COMERCIALIZACION SOCIEDAD ANONIMA',
+    'CICSA',
+
+    'S\\.?H\\.?$',  # SH, S.H.
+    'S\\s+H$',  # S H
+
+    'S\\.?A\\.?S\\.?$',  # SAS, S.A.S.
+
+    'LTD',
+
+    'S\\.?A\\.?I\\.?C\\.?A\\.?I\\.?$',  # SAICAI, S.A.I.C.A.I.
+    'S\\.?A\\.?I\\.?C\\s+Y\\s+F\\.?$',  # SAICYF, S.A.I.C Y F., S.A.I.C.YF.
+    'SAICYF$',
+    'S\\.?A\\.?I\\.?C\\.?YF\\.?$'
+]
+
+_ENDING_PATTERNS = [re.compile(f'\\s*{ending}\\s*$', re.IGNORECASE) for ending in SOCIETY_ENDINGS]
+_ANY_ENDING = re.compile('|'.join(f'(?:\\s*{ending}\\s*$)' for ending in SOCIETY_ENDINGS), re.IGNORECASE)
+# Todas las terminaciones están ancladas al final y ninguna ocupa más que esto (con los espacios ya
+# colapsados): alcanza con buscar en la cola del nombre en lugar de probar cada posición
+_ENDING_MAX_LEN = 64
+
+
+def _last_chars(ending: str) -> frozenset:
+    """Letras con las que puede terminar un nombre que tiene `ending` (İ: la búsqueda sin mayúsculas la iguala a I)."""
+    last = ending.rstrip('$').removesuffix('\\.?')[-1]
+    return frozenset({last, 'İ'} if last == 'I' else {last})
+
+
+_ENDING_LAST = [_last_chars(ending) for ending in SOCIETY_ENDINGS]
+_ENDING_LAST_CHARS = frozenset().union(*_ENDING_LAST)
+
+# Cantidad máxima de nombres memorizados
+COMPANY_NAME_CACHE_SIZE = int(os.getenv("COMPANY_NAME_CACHE_SIZE", "20000"))
+
+
+def _has_ending(normalized: str) -> bool:
+    if normalized[-1:] not in _ENDING_LAST_CHARS:
+        return False
+    return _ANY_ENDING.search(normalized, max(0, len(normalized) - _ENDING_MAX_LEN)) is not None
+
+
+@lru_cache(maxsize=COMPANY_NAME_CACHE_SIZE)
+def _normalize(name: str) -> str:
+    normalized = _SPACES.sub(' ', _PUNCTUATION.sub(' ', name.upper().strip())).strip()
+    if not _has_ending(normalized):
+        return normalized
+    return _strip_endings(normalized)
+
+
+def normalize_company_name(name: str) -> str:
+    """
+    Normaliza nombres de empresas eliminando puntuación y terminaciones de tipo de sociedad.
+
+    Args:
+        name (str): Nombre de la empresa a normalizar
+
+    Returns:
+        str: Nombre normalizado
+    """
+    if not name:
+        return ""
+    return _normalize(name)
+
+
+def _strip_endings(normalized: str) -> str:
+    for pattern, last_chars in zip(_ENDING_PATTERNS, _ENDING_LAST):
+        if normalized[-1:] not in last_chars:
+            continue
+        match = pattern.search(normalized, max(0, len(normalized) - _ENDING_MAX_LEN))
+        if match is not None:
+            normalized = normalized[:match.start()].strip()
+    return normalized
+
+
+def normalize_many(names: Iterable[str]) -> List[str]:
+    """
+    Normaliza una lista de nombres de una vez, con el mismo resultado que normalize_company_name.
+
+    Los repetidos se calculan una sola vez; la puntuación y los espacios se reemplazan
+    con una sola pasada de cada expresión sobre todos los nombres distintos unidos por
+    un separador (\\x00, que no es puntuación ni espacio), y solo los nombres que tienen
+    alguna terminación pasan por la lista de terminaciones. No usa el cache de
+    normalize_company_name.
+    """
+    names = list(names)
+    unique = [name for name in dict.fromkeys(names) if name]
+    if not unique:
+        return ["" for _ in names]
+
+    pieces = _SPACES.sub(' ', _PUNCTUATION.sub(' ', '\x00'.join(unique).upper())).split('\x00')
+    if len(pieces) != len(unique):
+        # Algún nombre contiene el separador: normalizar uno por uno
+        return [normalize_company_name(name) for name in names]
+    done = {"": ""}
+    for name, normalized in zip(unique, pieces):
+        normalized = normalized.strip()
+        done[name] = _strip_endings(normalized) if _has_ending(normalized) else normalized
+    return [done[name] if name else "" for name in names]
+
+
+def clear_cache():
+    """Vacía el cache de nombres normalizados."""
+    _normalize.cache_clear()
@@ -1,148 +1,203 @@
 import io
 import re
-from typing import List, Union, Dict, Optional, Tuple
+from typing import BinaryIO, List, Union, Dict, Optional, Tuple
 import pdfplumber
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-from google.oauth2 import service_account
+from .drive_client import drive_client
 from ..utils import Cot, completar_con_ceros
 
-SERVICE_ACCOUNT_FILE = 'app_prueba_3/serviceAccountKey.json'
-SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
-
-def get_drive_service():
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    return build('drive', 'v3', credentials=creds)
+# Versión del resultado de la extracción: incrementarla al cambiar cualquier
+# extractor para que los resultados guardados en cache se vuelvan a calcular
+EXTRACTOR_VERSION = 1
 
 def download_pdf_from_drive(file_id: str) -> bytes:
     """Descarga un archivo PDF de Google Drive por su ID (soporta unidades compartidas) y retorna los bytes."""
-    service = get_drive_service()
-    request = service.files().get_media(fileId=file_id, supportsAllDrives=True)
-    fh = io.BytesIO()
-    downloader = MediaIoBaseDownload(fh, request)
-    done = False
-    while not done:
-        status, done = downloader.next_chunk()
-    fh.seek(0)
-    return fh.read()
+    return drive_client.download_bytes(file_id)
+
+def get_drive_file_metadata(file_id: str) -> Dict:
+    """Devuelve md5Checksum, modifiedTime y size de un archivo de Drive (sin descargarlo)."""
+    return drive_client.get_metadata(file_id)
+
+class PdfPage:
+    """Página de un PDF con el texto, las tablas y las palabras calculados una sola vez."""
+
+    def __init__(self, page):
+        self.page = page
+        self._text = None
+        self._found_tables = None
+        self._tables = None
+        self._words = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.page.extract_text() or ""
+        return self._text
+
+    @property
+    def found_tables(self) -> list:
+        """Objetos Table de pdfplumber (con su bbox)."""
+        if self._found_tables is None:
+            self._found_tables = self.page.find_tables()
+        return self._found_tables
+
+    @property
+    def tables(self) -> List[List[List[Optional[str]]]]:
+        """Contenido de las tablas, igual que page.extract_tables() pero sin volver a detectarlas."""
+        if self._tables is None:
+            self._tables = [table.extract() for table in self.found_tables]
+        return self._tables
+
+    @property
+    def words(self) -> List[Dict]:
+        if self._words is None:
+            self._words = self.page.extract_words()
+        return self._words
+
+
+class PdfAnalysis:
+    """
+    Análisis único de un PDF compartido por todos los extractores.
+
+    pdfplumber abre el PDF una sola vez y cada página guarda sus caracteres ya
+    interpretados; PdfPage además memoriza el texto, las tablas y las palabras,
+    así que tablas, metadatos y condiciones no repiten el análisis de layout.
+    Acepta los bytes del PDF, una ruta o un archivo abierto (p. ej. una descarga
+    de drive_client). Se usa como context manager: `with PdfAnalysis(pdf) as analysis: ...`
+    """
+
+    def __init__(self, pdf: Union[bytes, str, BinaryIO]):
+        self._pdf = pdfplumber.open(io.BytesIO(pdf) if isinstance(pdf, bytes) else pdf)
+        self.pages = [PdfPage(page) for page in self._pdf.pages]
+
+    def close(self):
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 
 def extract_tables_from_pdf(pdf_bytes: bytes) -> List[Dict]:
     """Extrae tablas de un PDF (bytes) y retorna una lista de filas como diccionarios."""
+    with PdfAnalysis(pdf_bytes) as analysis:
+        return _extract_tables(analysis)
+
+
+def _extract_tables(analysis: PdfAnalysis) -> List[Dict]:
     tables = []
     descripcion_col = 'DESCRIPCIÓN DE PRODUCTOS'
     descripcion_trabajos_col = 'DESCRIPCIÓN DE TRABAJOS'
     descripcion_extraida = False
-    
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            for table in page.extract_tables():
-                # Detectar si es la tabla de productos
-                is_productos = False
-                is_trabajos = False
-                
-                for row in table[:2]:
+
+    for page in analysis.pages:
+        for table in page.tables:
+            # Detectar si es la tabla de productos
+            is_productos = False
+            is_trabajos = False
+            
+            for row in table[:2]:
+                if any((h or '').strip().upper() == descripcion_col for h in row):
+                    is_productos = True
+                    break
+                if any((h or '').strip().upper() == descripcion_trabajos_col for h in row):
+                    is_trabajos = True
+                    break
+            
+            if is_productos:
+                # --- Lógica especial para tabla de productos ---
+                header_row_idx = 0
+                for idx, row in enumerate(table):
                     if any((h or '').strip().upper() == descripcion_col for h in row):
-                        is_productos = True
-                        break
-                    if any((h or '').strip().upper() == descripcion_trabajos_col for h in row):
-                        is_trabajos = True
+                        header_row_idx = idx
                         break
-                
-                if is_productos:
-                    # --- Lógica especial para tabla de productos ---
-                    header_row_idx = 0
-                    for idx, row in enumerate(table):
-                        if any((h or '').strip().upper() == descripcion_col for h in row):
-                            header_row_idx = idx
-                            break
-                    raw_headers = [(h or "").strip() for h in table[header_row_idx]]
-                    valid_indices = [i for i, h in enumerate(raw_headers) if h]
-                    headers = [raw_headers[i] for i in valid_indices]
-                    num_cols = len(headers)
-                    cantidad_idx = None
-                    cantidad_valor = None
-                    for idx, row in enumerate(table[header_row_idx+1:], start=header_row_idx+1):
-                        for cell in row:
-                            if cell and 'CANTIDAD DE FAMILIAS' in cell.upper():
-                                cantidad_idx = idx
-                                m = re.search(r'CANTIDAD DE FAMILIAS\s*:?\s*(\d+)', cell, re.IGNORECASE)
-                                if m:
-                                    cantidad_valor = m.group(1)
-                                else:
-                                    cantidad_valor = cell.strip()
-                                break
-                        if cantidad_idx is not None:
-                            break
-                    if cantidad_idx and cantidad_idx > header_row_idx+1:
-                        for row in table[header_row_idx+1:cantidad_idx]:
-                            if len(row) == 1:
-                                descripcion = row[0].strip()
+                raw_headers = [(h or "").strip() for h in table[header_row_idx]]
+                valid_indices = [i for i, h in enumerate(raw_headers) if h]
+                headers = [raw_headers[i] for i in valid_indices]
+                num_cols = len(headers)
+                cantidad_idx = None
+                cantidad_valor = None
+                for idx, row in enumerate(table[header_row_idx+1:], start=header_row_idx+1):
+                    for cell in row:
+                        if cell and 'CANTIDAD DE FAMILIAS' in cell.upper():
+                            cantidad_idx = idx
+                            m = re.search(r'CANTIDAD DE FAMILIAS\s*:?\s*(\d+)', cell, re.IGNORECASE)
+                            if m:
+                                cantidad_valor = m.group(1)
                             else:
-                                try:
-                                    desc_idx = [h.upper() for h in headers].index(descripcion_col)
-                                    descripcion = (row[desc_idx] or '').strip() if desc_idx < len(row) else ''
-                                except ValueError:
-                                    descripcion = ''
-                            if descripcion:
-                                tables.append({descripcion_col: descripcion})
-                                descripcion_extraida = True
-                    if cantidad_valor:
-                        tables.append({'CANTIDAD DE FAMILIAS': cantidad_valor})
-                        
-                elif is_trabajos:
-                    # --- Lógica especial para tabla de trabajos ---
-                    header_row_idx = 0
-                    for idx, row in enumerate(table):
-                        if any((h or '').strip().upper() == descripcion_trabajos_col for h in row):
-                            header_row_idx = idx
+                                cantidad_valor = cell.strip()
                             break
+                    if cantidad_idx is not None:
+                        break
+                if cantidad_idx and cantidad_idx > header_row_idx+1:
+                    for row in table[header_row_idx+1:cantidad_idx]:
+                        if len(row) == 1:
+                            descripcion = row[0].strip()
+                        else:
+                            try:
+                                desc_idx = [h.upper() for h in headers].index(descripcion_col)
+                                descripcion = (row[desc_idx] or '').strip() if desc_idx < len(row) else ''
+                            except ValueError:
+                                descripcion = ''
+                        if descripcion:
+                            tables.append({descripcion_col: descripcion})
+                            descripcion_extraida = True
+                if cantidad_valor:
+                    tables.append({'CANTIDAD DE FAMILIAS': cantidad_valor})
                     
-                    raw_headers = [(h or "").strip() for h in table[header_row_idx]]
-                    valid_indices = [i for i, h in enumerate(raw_headers) if h]
-                    headers = [raw_headers[i] for i in valid_indices]
-                    
-                    # Procesar todas las filas después del header
-                    for row in table[header_row_idx+1:]:
-                        if isinstance(row, list) and len(row) > 0:
-                            # Crear un dict con las columnas disponibles
-                            clean_row = [(row[i].strip() if row[i] else "") if i < len(row) else "" for i in valid_indices]
-                            if any(cell for cell in clean_row):
-                                row_dict = dict(zip(headers, clean_row))
-                                # Solo agregar si tiene contenido útil en la descripción
-                                desc_value = row_dict.get(descripcion_trabajos_col, "").strip()
-                                if desc_value and desc_value.lower() != "sin trabajos disponibles":
-                                    tables.append(row_dict)
-                    
-                else:
-                    # --- Lógica general para cualquier otra tabla ---
-                    # Buscar la primera fila con más de una celda como header
-                    header_row_idx = 0
-                    for idx, row in enumerate(table):
-                        if len(row) > 1:
-                            header_row_idx = idx
-                            break
-                    raw_headers = [(h or "").strip() for h in table[header_row_idx]]
-                    valid_indices = [i for i, h in enumerate(raw_headers) if h]
-                    headers = [raw_headers[i] for i in valid_indices]
-                    num_cols = len(headers)
-                    for row in table[header_row_idx+1:]:
+            elif is_trabajos:
+                # --- Lógica especial para tabla de trabajos ---
+                header_row_idx = 0
+                for idx, row in enumerate(table):
+                    if any((h or '').strip().upper() == descripcion_trabajos_col for h in row):
+                        header_row_idx = idx
+                        break
+                
+                raw_headers = [(h or "").strip() for h in table[header_row_idx]]
+                valid_indices = [i for i, h in enumerate(raw_headers) if h]
+                headers = [raw_headers[i] for i in valid_indices]
+                
+                # Procesar todas las filas después del header
+                for row in table[header_row_idx+1:]:
+                    if isinstance(row, list) and len(row) > 0:
+                        # Crear un dict con las columnas disponibles
                         clean_row = [(row[i].strip() if row[i] else "") if i < len(row) else "" for i in valid_indices]
                         if any(cell for cell in clean_row):
-                            tables.append(dict(zip(headers, clean_row)))
-                            
-        # Si no hay filas intermedias en productos, fallback a texto plano
-        if not descripcion_extraida:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                lines = [l.strip() for l in text.splitlines()]
-                for i, line in enumerate(lines):
-                    if descripcion_col in line.upper():
-                        for next_line in lines[i+1:]:
-                            if next_line and 'CANTIDAD DE FAMILIAS' not in next_line.upper():
-                                tables.append({descripcion_col: next_line})
-                                break
+                            row_dict = dict(zip(headers, clean_row))
+                            # Solo agregar si tiene contenido útil en la descripción
+                            desc_value = row_dict.get(descripcion_trabajos_col, "").strip()
+                            if desc_value and desc_value.lower() != "sin trabajos disponibles":
+                                tables.append(row_dict)
+                
+            else:
+                # --- Lógica general para cualquier otra tabla ---
+                # Buscar la primera fila con más de una celda como header
+                header_row_idx = 0
+                for idx, row in enumerate(table):
+                    if len(row) > 1:
+                        header_row_idx = idx
                         break
+                raw_headers = [(h or "").strip() for h in table[header_row_idx]]
+                valid_indices = [i for i, h in enumerate(raw_headers) if h]
+                headers = [raw_headers[i] for i in valid_indices]
+                num_cols = len(headers)
+                for row in table[header_row_idx+1:]:
+                    clean_row = [(row[i].strip() if row[i] else "") if i < len(row) else "" for i in valid_indices]
+                    if any(cell for cell in clean_row):
+                        tables.append(dict(zip(headers, clean_row)))
+                        
+    # Si no hay filas intermedias en productos, fallback a texto plano
+    if not descripcion_extraida:
+        for page in analysis.pages:
+            lines = [l.strip() for l in page.text.splitlines()]
+            for i, line in enumerate(lines):
+                if descripcion_col in line.upper():
+                    for next_line in lines[i+1:]:
+                        if next_line and 'CANTIDAD DE FAMILIAS' not in next_line.upper():
+                            tables.append({descripcion_col: next_line})
+                            break
+                    break
     return tables
 
 
@@ -300,8 +355,8 @@ def validate_familias(familias: List[Dict], expected_count: Optional[int] = None
 
 def get_cotizacion_data_from_drive(file_id: str) -> List[Dict]:
     """Dado un ID de Drive, descarga el PDF y extrae las tablas de cotización."""
-    pdf_bytes = download_pdf_from_drive(file_id)
-    return extract_tables_from_pdf(pdf_bytes)
+    with drive_client.download(file_id) as pdf_file, PdfAnalysis(pdf_file) as analysis:
+        return _extract_tables(analysis)
 
 def get_next_cotizacion_number(year: Union[str, int], cots: List[Cot]) -> str:
     """
@@ -324,6 +379,11 @@ def extract_cotizacion_metadata_from_pdf(pdf_bytes: bytes) -> dict:
     Extrae metadatos clave de la cotización desde el texto del PDF.
     Devuelve un diccionario con: fecha, numero, empresa, dirigido_a, consultora, mail, template, revision.
     """
+    with PdfAnalysis(pdf_bytes) as analysis:
+        return _extract_metadata(analysis)
+
+
+def _extract_metadata(analysis: PdfAnalysis) -> dict:
     result = {
         'fecha': None,
         'numero_cotizacion': None,
@@ -334,90 +394,99 @@ def extract_cotizacion_metadata_from_pdf(pdf_bytes: bytes) -> dict:
         'template': None,
         'revision': None
     }
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        full_text = "\n".join([page.extract_text() or "" for page in pdf.pages])
-        # Fecha (formato dd/mm/yyyy o dd-mm-yyyy)
-        m = re.search(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', full_text)
-        if m:
-            result['fecha'] = m.group(1)
-        # N° de Cotización (N° o Cotización N°)
-        m = re.search(r'(?:Cotizaci[oó]n\s*N[°º:]?\s*|N[°º:]?\s*)?(\d{3,6}[ -/]?\d{2,4})', full_text, re.IGNORECASE)
-        if m:
-            result['numero_cotizacion'] = m.group(1)
-        # Empresa (busca "Empresa:" o "Cliente:")
-        m = re.search(r'(?:Empresa|Cliente)\s*[:\-]?\s*(.+)', full_text)
-        if m:
-            result['empresa'] = m.group(1).split('\n')[0].strip()
-        # Dirigido a (busca "A Atte. Sr./Sra.:" o variantes)
-        m = re.search(r'A\s*Atte\.?\s*Sr\.?\s*/?\s*Sra\.?\s*[:\-]?\s*(.+)', full_text, re.IGNORECASE)
-        if not m:
-            m = re.search(r'(?:Atte\.?Sr\.?/?Sra\.?|Dirigido a|Sr\.?/Sra\.?|Sra\.?|Sres\.?|Sr\.?|Atenci[oó]n)\s*[:\-]?\s*(.+)', full_text)
-        if m:
-            result['dirigido_a'] = m.group(1).split('\n')[0].strip()
-        # Consultora (si existe)
-        m = re.search(r'Consultora\s*[:\-]?\s*(.+)', full_text)
-        if m:
-            result['consultora'] = m.group(1).split('\n')[0].strip()
-        # Mail receptor
-        m = re.search(r'([\w\.-]+@[\w\.-]+)', full_text)
-        if m:
-            result['mail_receptor'] = m.group(1)
-        # Footer: nombre del template y revisión (busca en la última página)
-        last_page_text = pdf.pages[-1].extract_text() if pdf.pages else ""
-        m = re.search(r'(IT\s*\d+[^\n]*)', last_page_text)
-        if m:
-            result['template'] = m.group(1).strip()
-        # Revisión: busca "Rev. A – Fecha: 26/02/25" o variantes
-        m = re.search(r'Rev\.?\s*([A-Za-z0-9.]+)\s*[–-]\s*Fecha\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', last_page_text)
+    full_text = "\n".join(page.text for page in analysis.pages)
+    # Fecha (formato dd/mm/yyyy o dd-mm-yyyy)
+    m = re.search(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', full_text)
+    if m:
+        result['fecha'] = m.group(1)
+    # N° de Cotización (N° o Cotización N°)
+    m = re.search(r'(?:Cotizaci[oó]n\s*N[°º:]?\s*|N[°º:]?\s*)?(\d{3,6}[ -/]?\d{2,4})', full_text, re.IGNORECASE)
+    if m:
+        result['numero_cotizacion'] = m.group(1)
+    # Empresa (busca "Empresa:" o "Cliente:")
+    m = re.search(r'(?:Empresa|Cliente)\s*[:\-]?\s*(.+)', full_text)
+    if m:
+        result['empresa'] = m.group(1).split('\n')[0].strip()
+    # Dirigido a (busca "A Atte. Sr./Sra.:" o variantes)
+    m = re.search(r'A\s*Atte\.?\s*Sr\.?\s*/?\s*Sra\.?\s*[:\-]?\s*(.+)', full_text, re.IGNORECASE)
+    if not m:
+        m = re.search(r'(?:Atte\.?Sr\.?/?Sra\.?|Dirigido a|Sr\.?/Sra\.?|Sra\.?|Sres\.?|Sr\.?|Atenci[oó]n)\s*[:\-]?\s*(.+)', full_text)
+    if m:
+        result['dirigido_a'] = m.group(1).split('\n')[0].strip()
+    # Consultora (si existe)
+    m = re.search(r'Consultora\s*[:\-]?\s*(.+)', full_text)
+    if m:
+        result['consultora'] = m.group(1).split('\n')[0].strip()
+    # Mail receptor
+    m = re.search(r'([\w\.-]+@[\w\.-]+)', full_text)
+    if m:
+        result['mail_receptor'] = m.group(1)
+    # Footer: nombre del template y revisión (busca en la última página)
+    last_page_text = analysis.pages[-1].text if analysis.pages else ""
+    m = re.search(r'(IT\s*\d+[^\n]*)', last_page_text)
+    if m:
+        result['template'] = m.group(1).strip()
+    # Revisión: busca "Rev. A – Fecha: 26/02/25" o variantes
+    m = re.search(r'Rev\.?\s*([A-Za-z0-9.]+)\s*[–-]\s*Fecha\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', last_page_text)
+    if m:
+        result['revision'] = m.group(1).strip()
+        result['revision_fecha'] = m.group(2).strip()
+    else:
+        # fallback: solo "Revisión: X"
+        m = re.search(r'Revisi[oó]n\s*[:\-]?\s*([A-Za-z0-9.]+)', last_page_text)
         if m:
             result['revision'] = m.group(1).strip()
-            result['revision_fecha'] = m.group(2).strip()
-        else:
-            # fallback: solo "Revisión: X"
-            m = re.search(r'Revisi[oó]n\s*[:\-]?\s*([A-Za-z0-9.]+)', last_page_text)
-            if m:
-                result['revision'] = m.group(1).strip()
     return result
 
 def extract_condiciones_from_pdf(pdf_bytes: bytes) -> str:
     """
     Extrae el texto que aparece después de la última tabla del PDF (condiciones de la cotización), cortando en 'Atentamente'.
     """
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        last_table_end_y = None
-        last_table_page = None
-        # Buscar la última tabla y su posición
-        for page_num, page in enumerate(pdf.pages):
-            tables = page.find_tables()
-            if tables:
-                last_table = tables[-1]
-                last_table_end_y = last_table.bbox[3]  # y2 de la tabla
-                last_table_page = page
-        if last_table_page and last_table_end_y:
-            # Extraer todo el texto de la página después de la última tabla
-            words = last_table_page.extract_words()
-            condiciones_words = [w for w in words if float(w['top']) > last_table_end_y]
-            condiciones = ' '.join(w['text'] for w in condiciones_words)
-            # Cortar en 'Atentamente' (case-insensitive, con o sin dos puntos)
-            idx = re.search(r'Atentamente\s*:?', condiciones, re.IGNORECASE)
-            if idx:
-                condiciones = condiciones[:idx.start()].strip()
-            return condiciones.strip()
-        # Fallback: si no se encuentra tabla, devolver el texto de la última página
-        if pdf.pages:
-            condiciones = pdf.pages[-1].extract_text() or ""
-            idx = re.search(r'Atentamente\s*:?', condiciones, re.IGNORECASE)
-            if idx:
-                condiciones = condiciones[:idx.start()].strip()
-            return condiciones
-        return ""
+    with PdfAnalysis(pdf_bytes) as analysis:
+        return _extract_condiciones(analysis)
+
+
+def _extract_condiciones(analysis: PdfAnalysis) -> str:
+    last_table_end_y = None
+    last_table_page = None
+    # Buscar la última tabla y su posición
+    for page in analysis.pages:
+        tables = page.found_tables
+        if tables:
+            last_table = tables[-1]
+            last_table_end_y = last_table.bbox[3]  # y2 de la tabla
+            last_table_page = page
+    if last_table_page and last_table_end_y:
+        # Extraer todo el texto de la página después de la última tabla
+        words = last_table_page.words
+        condiciones_words = [w for w in words if float(w['top']) > last_table_end_y]
+        condiciones = ' '.join(w['text'] for w in condiciones_words)
+        # Cortar en 'Atentamente' (case-insensitive, con o sin dos puntos)
+        idx = re.search(r'Atentamente\s*:?', condiciones, re.IGNORECASE)
+        if idx:
+            condiciones = condiciones[:idx.start()].strip()
+        return condiciones.strip()
+    # Fallback: si no se encuentra tabla, devolver el texto de la última página
+    if analysis.pages:
+        condiciones = analysis.pages[-1].text
+        idx = re.search(r'Atentamente\s*:?', condiciones, re.IGNORECASE)
+        if idx:
+            condiciones = condiciones[:idx.start()].strip()
+        return condiciones
+    return ""
 
 # Modificar get_cotizacion_full_data_from_drive para incluir condiciones:
 def get_cotizacion_full_data_from_drive(file_id: str) -> dict:
-    pdf_bytes = download_pdf_from_drive(file_id)
-    tablas = extract_tables_from_pdf(pdf_bytes)
-    metadata = extract_cotizacion_metadata_from_pdf(pdf_bytes)
-    condiciones = extract_condiciones_from_pdf(pdf_bytes)
+    with drive_client.download(file_id) as pdf_file:
+        return extract_cotizacion_full_data(pdf_file)
+
+
+def extract_cotizacion_full_data(pdf: Union[bytes, str, BinaryIO]) -> dict:
+    """Extrae tablas, metadatos, condiciones y familias analizando el PDF una sola vez."""
+    with PdfAnalysis(pdf) as analysis:
+        tablas = _extract_tables(analysis)
+        metadata = _extract_metadata(analysis)
+        condiciones = _extract_condiciones(analysis)
 
     # Familias: parseo y validación
     familias, expected = extract_familias_from_tablas(tablas)
@@ -0,0 +1,107 @@
+"""
+Cliente de Google Drive compartido (solo lectura).
+
+Las credenciales de la service account y el servicio de Drive se crean una sola
+vez por proceso y se reutilizan en todas las descargas. httplib2 no es seguro
+entre hilos, así que cada hilo usa su propia conexión autorizada (AuthorizedHttp),
+que queda abierta (keep-alive) para los pedidos siguientes de ese hilo.
+
+Las descargas se hacen por partes de DRIVE_DOWNLOAD_CHUNK_MB dentro de un
+SpooledTemporaryFile: los archivos chicos quedan en memoria y los que superan
+DRIVE_SPOOL_MAX_MB pasan a un archivo temporal en disco, sin tener el archivo
+completo en memoria.
+"""
+import os
+import tempfile
+import threading
+from typing import BinaryIO, Dict
+
+import google_auth_httplib2
+import httplib2
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+from googleapiclient.http import MediaIoBaseDownload
+
+SERVICE_ACCOUNT_FILE = 'app_prueba_3/serviceAccountKey.json'
+SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+
+# Tamaño de cada parte de la descarga y tamaño a partir del cual se usa disco
+DRIVE_DOWNLOAD_CHUNK_MB = float(os.getenv("DRIVE_DOWNLOAD_CHUNK_MB", "4"))
+DRIVE_SPOOL_MAX_MB = float(os.getenv("DRIVE_SPOOL_MAX_MB", "16"))
+# Segundos de espera de cada pedido HTTP a Drive
+DRIVE_HTTP_TIMEOUT = float(os.getenv("DRIVE_HTTP_TIMEOUT", "60"))
+
+
+class DriveClient:
+    def __init__(self, service_account_file: str = SERVICE_ACCOUNT_FILE, scopes: list = SCOPES):
+        self.service_account_file = service_account_file
+        self.scopes = scopes
+        self._credentials = None
+        self._service = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def credentials(self):
+        if self._credentials is None:
+            with self._lock:
+                if self._credentials is None:
+                    self._credentials = service_account.Credentials.from_service_account_file(
+                        self.service_account_file, scopes=self.scopes)
+        return self._credentials
+
+    @property
+    def service(self):
+        """Servicio de Drive v3, construido una sola vez con el documento de discovery incluido en la librería."""
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    self._service = build('drive', 'v3', http=self._new_http(), cache_discovery=False, static_discovery=True)
+        return self._service
+
+    def _new_http(self):
+        return google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=DRIVE_HTTP_TIMEOUT))
+
+    def http(self):
+        """Conexión autorizada del hilo actual (se crea en el primer uso y se reutiliza)."""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = self._new_http()
+        return http
+
+    def get_metadata(self, file_id: str, fields: str = "md5Checksum,modifiedTime,size") -> Dict:
+        """Metadatos de un archivo (soporta unidades compartidas)."""
+        request = self.service.files().get(fileId=file_id, fields=fields, supportsAllDrives=True)
+        return request.execute(http=self.http())
+
+    def download_to(self, file_id: str, fh: BinaryIO) -> int:
+        """Descarga un archivo por partes en `fh`. Devuelve la cantidad de bytes escritos."""
+        request = self.service.files().get_media(fileId=file_id, supportsAllDrives=True)
+        request.http = self.http()
+        downloader = MediaIoBaseDownload(fh, request, chunksize=int(DRIVE_DOWNLOAD_CHUNK_MB * 1024 * 1024))
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+        return fh.tell()
+
+    def download(self, file_id: str) -> BinaryIO:
+        """
+        Descarga un archivo a un SpooledTemporaryFile posicionado al inicio.
+        Se usa como context manager: `with drive_client.download(file_id) as fh: ...`
+        """
+        fh = tempfile.SpooledTemporaryFile(max_size=int(DRIVE_SPOOL_MAX_MB * 1024 * 1024))
+        try:
+            self.download_to(file_id, fh)
+        except Exception:
+            fh.close()
+            raise
+        fh.seek(0)
+        return fh
+
+    def download_bytes(self, file_id: str) -> bytes:
+        with self.download(file_id) as fh:
+            return fh.read()
+
+
+# Instancia global
+drive_client = DriveClient()
@@ -0,0 +1,189 @@
+"""
+Cache en disco de la extracción de PDFs de cotizaciones, direccionado por contenido.
+
+Antes de descargar se piden a Drive solo los metadatos del archivo (md5Checksum,
+modifiedTime). El md5 identifica el contenido del PDF, así que:
+  - pdfs/<md5>.pdf guarda el PDF descargado;
+  - results/<md5>-v<EXTRACTOR_VERSION>.json guarda el resultado de
+    extract_cotizacion_full_data para esa versión de los extractores.
+Si el archivo de Drive no cambió, no se vuelve a descargar ni a procesar; si
+cambió, su md5 es otro y se calcula de nuevo. Al cambiar los extractores basta
+con incrementar EXTRACTOR_VERSION (el PDF guardado se reutiliza).
+
+El directorio se mantiene por debajo de EXTRACTION_CACHE_MAX_MB borrando los
+archivos usados hace más tiempo. Las escrituras son atómicas (archivo temporal
+y os.replace), por lo que varios procesos pueden compartir el mismo directorio.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Dict, Optional, Union
+
+from . import cotizacion_extractor
+from .drive_client import drive_client
+
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", ".extraction_cache")
+# Tamaño máximo del directorio del cache en MB
+EXTRACTION_CACHE_MAX_MB = float(os.getenv("EXTRACTION_CACHE_MAX_MB", "500"))
+
+
+class ExtractionCache:
+    def __init__(self, directory: str = EXTRACTION_CACHE_DIR, max_bytes: int = int(EXTRACTION_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+
+    @staticmethod
+    def content_key(file_id: str, drive_metadata: Dict) -> str:
+        """md5 del archivo según Drive; si no lo informa, un hash de id + fecha de modificación."""
+        md5 = drive_metadata.get("md5Checksum")
+        if md5:
+            return md5
+        raw = f"{file_id}:{drive_metadata.get('modifiedTime', '')}:{drive_metadata.get('size', '')}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _pdf_path(self, key: str) -> Path:
+        return self.directory / "pdfs" / f"{key}.pdf"
+
+    def _result_path(self, key: str) -> Path:
+        return self.directory / "results" / f"{key}-v{cotizacion_extractor.EXTRACTOR_VERSION}.json"
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        """Marca el uso del archivo para el desalojo por antigüedad. Devuelve False si no existe."""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @classmethod
+    def _read(cls, path: Path) -> Optional[bytes]:
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        cls._touch(path)
+        return data
+
+    def _write(self, path: Path, data: Union[bytes, BinaryIO]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        if isinstance(data, bytes):
+            tmp.write_bytes(data)
+        else:
+            with open(tmp, "wb") as fh:
+                shutil.copyfileobj(data, fh)
+        os.replace(tmp, path)
+        self.evict()
+
+    def get_result(self, key: str) -> Optional[Dict]:
+        data = self._read(self._result_path(key))
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def put_result(self, key: str, result: Dict):
+        self._write(self._result_path(key), json.dumps(result, ensure_ascii=False).encode("utf-8"))
+
+    def get_pdf_path(self, key: str) -> Optional[Path]:
+        """Ruta del PDF guardado, o None si no está en el cache."""
+        path = self._pdf_path(key)
+        return path if self._touch(path) else None
+
+    def put_pdf(self, key: str, pdf: Union[bytes, BinaryIO]):
+        """Guarda el PDF (bytes o archivo abierto, que se copia por partes)."""
+        self._write(self._pdf_path(key), pdf)
+
+    def evict(self) -> int:
+        """Borra los archivos usados hace más tiempo hasta quedar por debajo de max_bytes. Devuelve cuántos."""
+        with self._lock:
+            entries = []
+            total = 0
+            for sub in ("pdfs", "results"):
+                folder = self.directory / sub
+                if not folder.is_dir():
+                    continue
+                for entry in os.scandir(folder):
+                    if entry.name.endswith(".tmp"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return 0
+
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            return removed
+
+    def get_cotizacion_full_data(self, file_id: str) -> Dict:
+        """
+        Igual que cotizacion_extractor.get_cotizacion_full_data_from_drive, pero
+        sin descargar ni procesar de nuevo un PDF que no cambió en Drive.
+        """
+        try:
+            key = self.content_key(file_id, cotizacion_extractor.get_drive_file_metadata(file_id))
+        except Exception as e:
+            print(f"⚠️  No se pudieron leer los metadatos de Drive de {file_id}, se procesa sin cache: {e}")
+            return cotizacion_extractor.get_cotizacion_full_data_from_drive(file_id)
+
+        result = self.get_result(key)
+        if result is not None:
+            print(f"⚡ Extracción de {file_id} leída del cache")
+            return result
+
+        started = time.perf_counter()
+        pdf_path = self.get_pdf_path(key)
+        if pdf_path is not None:
+            # pdfplumber lee el PDF guardado directamente del disco
+            result = cotizacion_extractor.extract_cotizacion_full_data(str(pdf_path))
+        else:
+            with drive_client.download(file_id) as pdf_file:
+                result = cotizacion_extractor.extract_cotizacion_full_data(pdf_file)
+                pdf_file.seek(0)
+                try:
+                    self.put_pdf(key, pdf_file)
+                except OSError as e:
+                    print(f"⚠️  No se pudo guardar el PDF en el cache: {e}")
+
+        try:
+            self.put_result(key, result)
+        except OSError as e:
+            print(f"⚠️  No se pudo guardar la extracción en el cache: {e}")
+        print(f"📄 Extracción de {file_id} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return result
+
+    def clear(self):
+        """Borra todo el contenido del cache."""
+        with self._lock:
+            for sub in ("pdfs", "results"):
+                folder = self.directory / sub
+                if folder.is_dir():
+                    for entry in os.scandir(folder):
+                        try:
+                            os.remove(entry.path)
+                        except FileNotFoundError:
+                            pass
+
+
+# Instancia global
+extraction_cache = ExtractionCache()
@@ -0,0 +1,153 @@
+"""
+Pool acotado de procesos para extraer PDFs de cotizaciones.
+
+La descarga de Drive y el análisis con pdfplumber usan CPU durante segundos; si
+corren dentro del handler de Reflex bloquean el event loop y con él a todas las
+sesiones del worker. ExtractionPool los ejecuta en procesos aparte:
+  - a lo sumo EXTRACTION_WORKERS extracciones a la vez (el resto espera turno);
+  - cada proceso tiene su memoria limitada a EXTRACTION_MEMORY_MB (RLIMIT_AS);
+  - una extracción que supera EXTRACTION_TIMEOUT segundos, o cuya tarea se
+    cancela (el usuario salió de la página), termina matando su proceso, que se
+    reemplaza por uno nuevo en el próximo pedido.
+Los procesos se reutilizan entre extracciones y usan el cache en disco de
+extraction_cache, así que un PDF que no cambió no se vuelve a procesar.
+"""
+import asyncio
+import multiprocessing
+import os
+from threading import Lock
+from typing import Dict, List
+
+try:
+    import resource
+except ImportError:  # Windows: sin límite de memoria por proceso
+    resource = None
+
+from .extraction_cache import extraction_cache
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "120"))
+EXTRACTION_MEMORY_MB = int(os.getenv("EXTRACTION_MEMORY_MB", "2048"))
+
+
+def _limit_memory(memory_mb: int):
+    if resource is None or memory_mb <= 0:
+        return
+    limit = memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        print(f"⚠️  No se pudo limitar la memoria del proceso de extracción: {e}")
+
+
+def _worker_main(conn, memory_mb: int):
+    """Bucle del proceso de extracción: recibe ids de Drive y responde (ok, resultado o mensaje de error)."""
+    _limit_memory(memory_mb)
+    while True:
+        try:
+            file_id = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        try:
+            reply = (True, extraction_cache.get_cotizacion_full_data(file_id))
+        except MemoryError:
+            reply = (False, f"El PDF superó el límite de memoria de extracción ({memory_mb} MB)")
+        except Exception as e:
+            reply = (False, str(e))
+        conn.send(reply)
+
+
+class _Worker:
+    def __init__(self, context, memory_mb: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, memory_mb), name="pdf-extraction", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class ExtractionPool:
+    def __init__(self, max_workers: int = EXTRACTION_WORKERS, timeout: float = EXTRACTION_TIMEOUT,
+                 memory_mb: int = EXTRACTION_MEMORY_MB):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        # spawn: el backend tiene hilos (listeners de Firestore, Algolia) que fork no copia bien
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: List[_Worker] = []
+        self._lock = Lock()
+        self._slots = None  # asyncio.Semaphore, se crea en el event loop del backend
+
+    def _acquire_worker(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    return worker
+                worker.kill()
+        return _Worker(self._context, self.memory_mb)
+
+    def _release_worker(self, worker: _Worker):
+        with self._lock:
+            self._idle.append(worker)
+
+    def _receive(self, worker: _Worker):
+        """
+        Espera la respuesta del proceso (en un hilo). Con conn.poll el hilo termina a lo
+        sumo en `timeout` segundos, o antes si el proceso muere. None = no respondió a tiempo.
+        """
+        if not worker.conn.poll(self.timeout):
+            return None
+        return worker.conn.recv()
+
+    async def extract(self, file_id: str) -> Dict:
+        """
+        Igual que extraction_cache.get_cotizacion_full_data(file_id), en un proceso del pool.
+
+        Lanza TimeoutError si supera el tiempo máximo y RuntimeError si la extracción
+        falla o el proceso muere. Si la tarea se cancela, el proceso se termina.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        async with self._slots:
+            # Iniciar un proceso nuevo tarda: se hace fuera del event loop
+            worker = await asyncio.to_thread(self._acquire_worker)
+            try:
+                worker.conn.send(file_id)
+                reply = await asyncio.to_thread(self._receive, worker)
+            except asyncio.CancelledError:
+                # Al morir el proceso el hilo sale del poll con EOF
+                worker.kill()
+                print(f"⏹️  Extracción de {file_id} cancelada")
+                raise
+            except (EOFError, OSError):
+                worker.kill()
+                raise RuntimeError("El proceso de extracción terminó inesperadamente (posible límite de memoria)")
+            if reply is None:
+                worker.kill()
+                raise TimeoutError(f"La extracción del PDF superó el tiempo máximo ({self.timeout:.0f}s)")
+            ok, payload = reply
+            self._release_worker(worker)
+
+        if not ok:
+            raise RuntimeError(payload)
+        return payload
+
+    def shutdown(self):
+        """Termina los procesos inactivos."""
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.kill()
+
+
+# Instancia global
+extraction_pool = ExtractionPool()
@@ -1,13 +1,44 @@
 import os
+import json
+import base64
+import hashlib
+import time
+from collections import OrderedDict
 from typing import Dict, Callable, Union, List, Tuple, Any
 from dotenv import load_dotenv
 import firebase_admin
 from firebase_admin import credentials, firestore
 from google.cloud.firestore_v1 import FieldFilter
 import asyncio
-from threading import Thread, Lock
-from ..utils import User, Fam, Cot, Certs, Model, Client, completar_con_ceros
+from threading import Thread, Lock, Event
+from ..utils import User, Fam, Cot, Certs, Client
 from .algolia_api import algolia_api
+from .algolia_utils import cot_to_algolia
+from .ttl_cache import TTLCache
+from .model_mapping import firestore_to_cot, firestore_to_certs, firestore_to_fam, firestore_to_client
+from .live_index import LiveIndex
+from .client_index import ClientNameIndex
+from .company_names import normalize_company_name
+
+# Colecciones de catálogo y el campo que contiene el nombre visible
+CATALOG_NAME_FIELDS = {"roles": "title", "areas": "name"}
+
+# Campos que usa la vista de lista de cotizaciones (_doc_to_cot). Las consultas de
+# lista proyectan solo estos campos para no descargar el blob 'detalle'.
+COT_LIST_FIELDS = [
+    "area", "number", "year", "razonsocial", "client", "issuedate", "issuedate_timestamp",
+    "vigencia", "estado", "aprueba", "drive_file_id", "drive_file_id_name",
+    "drive_aprobacion_id", "drive_aceptacion_id", "enviada_fecha", "facturada_fecha",
+    "facturar", "nombre", "mail", "op", "rev", "resolucion", "cuenta",
+]
+
+
+def _cot_sort_key(cot: Cot) -> tuple:
+    """Orden de la lista de cotizaciones: año y número descendentes."""
+    return (
+        -(int(cot.year) if cot.year.isdigit() else 0),
+        -(int(cot.num) if cot.num.isdigit() else 0),
+    )
 
 class FirestoreAPI:
     def __init__(self):
@@ -63,8 +94,33 @@ class FirestoreAPI:
         self.callback_loop = None  # Event loop para ejecutar callbacks
         self.callback_thread = None
         self.lock = Lock()  # Para asegurar el manejo del loop en hilos
-        self.roles: list = []
-        self.areas: list = []
+        # Catálogos id -> nombre de roles y áreas, sincronizados con on_snapshot
+        self.catalogs: Dict[str, Dict[str, str]] = {name: {} for name in CATALOG_NAME_FIELDS}
+        self.catalog_listeners: dict = {}
+        self.catalog_lock = Lock()
+        # Cursores de paginación: token -> snapshot del último documento de la página
+        self.page_cursors: OrderedDict = OrderedDict()
+        self.max_page_cursors: int = 500
+        self.cursor_lock = Lock()
+        # Cache de lecturas de listas (colección, área, filtros, orden, dirección, límite, token)
+        self.query_cache = TTLCache(
+            max_entries=int(os.getenv("FIRESTORE_CACHE_MAX_ENTRIES", "256")),
+            ttl=float(os.getenv("FIRESTORE_CACHE_TTL", "60")),
+        )
+        # Vigencia (segundos) de los conteos; más corta que la de las listas
+        self.count_cache_ttl = float(os.getenv("FIRESTORE_COUNT_CACHE_TTL", "30"))
+        # Índices en vivo (colección, área) -> LiveIndex, compartidos entre sesiones
+        self.live_indexes: Dict[tuple, LiveIndex] = {}
+        self.live_index_lock = Lock()
+        self.live_index_limit = int(os.getenv("FIRESTORE_LIVE_INDEX_LIMIT", "500"))
+        # Segundos sin reintentar un índice cuyo listener falló; (colección, área) -> momento de la falla
+        self.live_index_retry = float(os.getenv("FIRESTORE_LIVE_INDEX_RETRY", "60"))
+        self.live_index_failures: Dict[tuple, float] = {}
+        # Índice de razones sociales (búsqueda por similitud), sincronizado con on_snapshot
+        self.client_name_index: Union[ClientNameIndex, None] = None
+        self.client_name_index_ready = Event()
+        self.client_name_watch = None
+        self.client_name_index_failed = False
 
     def start_callback_loop(self):
         """Inicia un thread con un event loop para ejecutar coroutines."""
@@ -145,178 +201,193 @@ class FirestoreAPI:
             print(f"Error al obtener usuario: {e}")
             return {}
 
-    def get_roles(self) -> dict:
-        """Obtiene el nombre del rol desde Firestore"""
+    def get_roles(self) -> list:
+        """Obtiene los roles (id y nombre) desde el catálogo en memoria"""
         if not self.firebase_initialized:
             print("⚠️  Firebase no inicializado. Retornando roles de ejemplo.")
             return [{"id": "role1", "name": "Admin"}, {"id": "role2", "name": "User"}]
-            
-        if not self.roles:
-            try:
-                query = self.db.collection("roles")
-                docs = query.stream()
-                roles = {doc.id: doc.to_dict() for doc in docs}
-                resultados = [{"id": role_id, "name": role_data.get("title", "")} for role_id, role_data in roles.items()]
-                self.roles = resultados
-                return resultados
-            except Exception as e:
-                print(f"Error al obtener roles: {e}")
-                return [] 
-        else:   
-            print("Roles ya obtenidos.")
-            return self.roles
-        
+
+        try:
+            return [{"id": role_id, "name": name} for role_id, name in self._get_catalog("roles").items()]
+        except Exception as e:
+            print(f"Error al obtener roles: {e}")
+            return []
+
     def get_rol_name(self, rol_id: str) -> str:
-        """Obtiene el nombre del rol desde Firestore"""
+        """Obtiene el nombre del rol desde el catálogo en memoria (sin consultar Firestore)"""
+        if not self.firebase_initialized or not rol_id:
+            return ""
         try:
-            doc = self.db.collection("roles").document(rol_id).get()
-            return doc.to_dict().get("title", "") if doc.exists else ""
+            return self._get_catalog_name("roles", rol_id)
         except Exception as e:
             print(f"Error al obtener nombre del rol: {e}")
-            return "" 
-    
-    def get_certs(self, area: str = "HGGSLLi2VCJaBtK0w794", order_by: str = "issuedate", limit: int = 50, filter: str = "") -> list:
+            return ""
+
+    def _get_catalog(self, collection: str) -> Dict[str, str]:
+        """Devuelve una copia del mapa id -> nombre de un catálogo ('roles' o 'areas')."""
+        self._load_catalog(collection)
+        with self.catalog_lock:
+            return dict(self.catalogs[collection])
+
+    def _get_catalog_name(self, collection: str, item_id: str) -> str:
+        """Nombre de un id del catálogo, buscado directamente en el mapa en memoria."""
+        self._load_catalog(collection)
+        with self.catalog_lock:
+            return self.catalogs[collection].get(item_id, "")
+
+    def _load_catalog(self, collection: str):
+        """
+        La primera llamada lee la colección y registra un listener on_snapshot que
+        mantiene el mapa actualizado; las siguientes no hacen nada.
+        """
+        if collection not in self.catalog_listeners:
+            with self.catalog_lock:
+                if collection not in self.catalog_listeners:
+                    name_field = CATALOG_NAME_FIELDS[collection]
+                    names = self.catalogs[collection]
+                    for doc in self.db.collection(collection).stream():
+                        names[doc.id] = (doc.to_dict() or {}).get(name_field, "")
+
+                    def on_snapshot(snapshot, changes, read_time):
+                        with self.catalog_lock:
+                            for change in changes:
+                                doc = change.document
+                                if change.type.name == "REMOVED":
+                                    names.pop(doc.id, None)
+                                else:
+                                    names[doc.id] = (doc.to_dict() or {}).get(name_field, "")
+
+                    self.catalog_listeners[collection] = self.db.collection(collection).on_snapshot(on_snapshot)
+                    print(f"✅ Catálogo '{collection}' cargado ({len(names)}) y sincronizado con Firestore")
+
+    def get_certs(
+            self,
+            area: str = "HGGSLLi2VCJaBtK0w794",
+            order_by: str = "issuedate",
+            limit: int = 50,
+            filter: str = "",
+            page_token: str = "",
+            use_cache: bool = True
+        ) -> list:
         """Obtiene los certificados del usuario desde Firestore"""
+        return self.get_certs_page(area, order_by, limit, filter, page_token, use_cache=use_cache)[0]
+
+    def get_certs_page(
+            self,
+            area: str = "HGGSLLi2VCJaBtK0w794",
+            order_by: str = "issuedate",
+            page_size: int = 50,
+            filter: str = "",
+            page_token: str = "",
+            use_cache: bool = True
+        ) -> Tuple[list, str]:
+        """
+        Obtiene una página de certificados desde Firestore.
+
+        Returns:
+            tuple: (lista de Certs, token de la página siguiente o "" si no hay más)
+        """
         if not self.firebase_initialized:
             print("⚠️  Firebase no inicializado. Retornando lista vacía.")
-            return []
-            
+            return [], ""
+
         try:
+            # Caso donde area es string vacío pero no None
+            if area is not None and not area:
+                print("📋 Área vacía, retornando lista vacía")
+                return [], ""
+
             # Si area es None, obtener todos los certificados sin filtro por área
             if area is None:
                 print("📋 Obteniendo TODOS los certificados (sin filtro por área)")
-                # Obtener todos los certificados sin filtrar por área
-                certs_collection = self.db.collection("certificados")
-                
-                # Aplicar filtros adicionales si los hay
-                query = certs_collection
-                if filter:
-                    if isinstance(filter, list):
-                        for f in filter:
-                            field, op, value = f
-                            query = query.where(field, op, value)
-                
-                # Aplicar ordenamiento
-                if order_by:
-                    query = query.order_by(order_by, direction=firestore.Query.ASCENDING)
-                
-                # Aplicar límite
-                if limit > 0:
-                    query = query.limit(limit)
-                
-                docs_snapshot = query.get()
-                docs = []
-                for doc in docs_snapshot:
-                    data = doc.to_dict()
-                    data["id"] = doc.id
-                    docs.append(data)
-                    
-            elif area:  # Si hay un área específica
-                docs = self.get_collection_data(
-                    collection="certificados",
-                    area=area,
-                    order_by=order_by,
-                    direction=firestore.Query.ASCENDING,
-                    limit=limit
-                )
-            else:
-                # Caso donde area es string vacío pero no None
-                print("📋 Área vacía, retornando lista vacía")
-                return []
-            
+
+            docs, next_token = self.get_collection_page(
+                collection="certificados",
+                area=area,
+                order_by=order_by,
+                direction=firestore.Query.ASCENDING,
+                page_size=page_size,
+                filters=filter if isinstance(filter, list) else None,
+                page_token=page_token,
+                use_cache=use_cache
+            )
+
             # Verificar si docs es None o vacío
             if not docs:
                 if area is None:
                     print("📋 No se encontraron certificados en toda la base de datos")
                 else:
                     print(f"📋 No se encontraron certificados para el área: {area}")
-                return []
-            
-            resultados = [Certs(
-                id=cert_data.get("id", ""),
-                num=completar_con_ceros(cert_data.get("number", ""),4),
-                year=completar_con_ceros(cert_data.get("year", ""),2),
-                rev=completar_con_ceros(cert_data.get("revisionnumber", ""),2),
-                assigmentdate=cert_data.get("assigmentdate", ""),
-                issuedate=cert_data.get("issuedate", ""),
-                vencimiento=cert_data.get("vencimiento", ""),
-                area=cert_data.get("area", ""),
-                client=cert_data.get("client", ""),
-                client_id=cert_data.get("client_id", ""),
-                status=cert_data.get("status", ""),
-                family_id=cert_data.get("family", ""),
-                family= Fam(),
-                ensayos=cert_data.get("ensayos", []),
-                drive_file_id=cert_data.get("drive_file_id", ""),
-                drive_file_id_signed=cert_data.get("drive_file_id_signed", ""),
-                ) for cert_data in docs]
-            
+                return [], ""
+
+            resultados = [self._doc_to_cert(cert_data) for cert_data in docs]
+
             if area is None:
                 print(f"✅ {len(resultados)} certificados obtenidos correctamente (TODAS las áreas)")
             else:
                 print(f"✅ {len(resultados)} certificados obtenidos correctamente para área: {area}")
-            return resultados
+            return resultados, next_token
         except Exception as e:
             print(f"❌ Error al obtener certificados: {e}")
             import traceback
             traceback.print_exc()
-            return []
-    
+            return [], ""
+
+    def _doc_to_cert(self, cert_data: dict) -> Certs:
+        """Convierte un documento de 'certificados' (con su id) en Certs."""
+        return firestore_to_certs(cert_data)
+
     def get_fams(
-            self, 
-            area: str = "HGGSLLi2VCJaBtK0w794", 
-            order_by: str = "razonsocial", 
-            limit: int = 50, 
-            filter: str = ""
+            self,
+            area: str = "HGGSLLi2VCJaBtK0w794",
+            order_by: str = "razonsocial",
+            limit: int = 50,
+            filter: str = "",
+            page_token: str = "",
+            use_cache: bool = True
         ) -> list:
         """Obtiene las familias del usuario desde Firestore"""
+        return self.get_fams_page(area, order_by, limit, filter, page_token, use_cache=use_cache)[0]
+
+    def get_fams_page(
+            self,
+            area: str = "HGGSLLi2VCJaBtK0w794",
+            order_by: str = "razonsocial",
+            page_size: int = 50,
+            filter: str = "",
+            page_token: str = "",
+            use_cache: bool = True
+        ) -> Tuple[list, str]:
+        """
+        Obtiene una página de familias desde Firestore.
+
+        Returns:
+            tuple: (lista de Fam, token de la página siguiente o "" si no hay más)
+        """
         if not self.firebase_initialized:
             print("⚠️  Firebase no inicializado. Retornando lista vacía.")
-            return []
-            
+            return [], ""
+
         try:
+            # Caso donde area es string vacío pero no None
+            if area is not None and not area:
+                print("📋 Área vacía, retornando lista vacía")
+                return [], ""
+
             # Si area es None, obtener todas las familias sin filtro por área
             if area is None:
                 print("📋 Obteniendo TODAS las familias (sin filtro por área)")
-                # Obtener todas las familias sin filtrar por área
-                fams_collection = self.db.collection("familias")
-                
-                # Aplicar filtros adicionales si los hay
-                query = fams_collection
-                if filter:
-                    if isinstance(filter, list):
-                        for f in filter:
-                            field, op, value = f
-                            query = query.where(field, op, value)
-                
-                # Aplicar ordenamiento
-                if order_by:
-                    query = query.order_by(order_by, direction=firestore.Query.ASCENDING)
-                
-                # Aplicar límite
-                if limit > 0:
-                    query = query.limit(limit)
-                
-                docs = query.get()
-                fams = []
-                for doc in docs:
-                    data = doc.to_dict()
-                    data["id"] = doc.id
-                    fams.append(data)
-                    
-            elif area:  # Si hay un área específica
-                fams = self.get_collection_data(
-                    collection="familias",
-                    area=area,
-                    filters=filter,
-                    order_by=order_by,
-                    direction=firestore.Query.ASCENDING,
-                    limit=limit
-                )
-            else:
-                # Caso donde area es string vacío pero no None
-                print("📋 Área vacía, retornando lista vacía")
-                return []
+
+            fams, next_token = self.get_collection_page(
+                collection="familias",
+                area=area,
+                order_by=order_by,
+                direction=firestore.Query.ASCENDING,
+                page_size=page_size,
+                filters=filter if isinstance(filter, list) else None,
+                page_token=page_token,
+                use_cache=use_cache
+            )
 
             # Verificar si fams es None o vacío
             if not fams:
@@ -324,95 +395,82 @@ class FirestoreAPI:
                     print("📋 No se encontraron familias en toda la base de datos")
                 else:
                     print(f"📋 No se encontraron familias para el área: {area}")
-                return []
+                return [], ""
 
-            resultados = [Fam(
-                id=fam.get("id", ""),
-                area=fam.get("area", ""),
-                family=fam.get("family", ""),
-                product=fam.get("product", ""),
-                origen=fam.get("origen", ""),
-                expirationdate=fam.get("expirationdate", ""),
-                vigencia=fam.get("vigencia", ""),
-                client=fam.get("razonsocial", ""),
-                client_id=fam["client"] if "client" in fam and fam["client"] is not None and isinstance(fam["client"], str) else "",
-                system=fam.get("system", "") if fam.get("system") is not None else "",
-                status=fam.get("status", "") if fam.get("status") is not None else "",
-                models=[Model()],
-                rubro=fam["rubro"] if "rubro" in fam and fam["rubro"] is not None else "",
-                subrubro=fam["subrubro"] if "subrubro" in fam and fam["subrubro"] is not None else ""
-            ) for fam in fams]
+            resultados = [self._doc_to_fam(fam) for fam in fams]
 
             if area is None:
                 print(f"✅ {len(resultados)} familias obtenidas correctamente (TODAS las áreas)")
             else:
                 print(f"✅ {len(resultados)} familias obtenidas correctamente para área: {area}")
-            return resultados
-            
+            return resultados, next_token
+
         except Exception as e:
             print(f"❌ Error al obtener familias: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return [], ""
+
+    def _doc_to_fam(self, fam: dict) -> Fam:
+        """Convierte un documento de 'familias' (con su id) en Fam."""
+        return firestore_to_fam(fam)
 
     def get_cots(
-            self, 
-            area: str = "HGGSLLi2VCJaBtK0w794", 
-            order_by: str = "issuedate", 
-            limit: int = 50, 
-            filter: str = ""
+            self,
+            area: str = "HGGSLLi2VCJaBtK0w794",
+            order_by: str = "issuedate",
+            limit: int = 50,
+            filter: str = "",
+            page_token: str = "",
+            use_cache: bool = True
         ) -> list:
         """Obtiene las cotizaciones del usuario desde Firestore"""
+        return self.get_cots_page(area, order_by, limit, filter, page_token, use_cache=use_cache)[0]
+
+    def get_cots_page(
+            self,
+            area: str = "HGGSLLi2VCJaBtK0w794",
+            order_by: str = "issuedate",
+            page_size: int = 50,
+            filter: str = "",
+            page_token: str = "",
+            fields: Union[List[str], None] = COT_LIST_FIELDS,
+            use_cache: bool = True
+        ) -> Tuple[list, str]:
+        """
+        Obtiene una página de cotizaciones desde Firestore (más recientes primero).
+
+        Por defecto solo se descargan los campos de la lista (COT_LIST_FIELDS);
+        con fields=None se trae el documento completo, incluido 'detalle'.
+
+        Returns:
+            tuple: (lista de Cot, token de la página siguiente o "" si no hay más)
+        """
         if not self.firebase_initialized:
             print("⚠️  Firebase no inicializado. Retornando lista vacía.")
-            return []
-            
+            return [], ""
+
         try:
+            # Caso donde area es string vacío pero no None
+            if area is not None and not area:
+                print("📋 Área vacía, retornando lista vacía")
+                return [], ""
+
             # Si area es None, obtener todas las cotizaciones sin filtro por área
             if area is None:
                 print("📋 Obteniendo TODAS las cotizaciones (sin filtro por área)")
-                # Obtener todas las cotizaciones sin filtrar por área
-                cots_collection = self.db.collection("cotizaciones")
-                
-                # Aplicar filtros adicionales si los hay
-                query = cots_collection
-                if filter:
-                    if isinstance(filter, list):
-                        for f in filter:
-                            field, op, value = f
-                            query = query.where(field, op, value)
-                    else:
-                        # Manejo de filtros string (si es necesario)
-                        pass
-                
-                # Aplicar ordenamiento
-                if order_by:
-                    query = query.order_by(order_by, direction=firestore.Query.DESCENDING)
-                
-                # Aplicar límite
-                if limit > 0:
-                    query = query.limit(limit)
-                
-                docs = query.get()
-                cots = []
-                for doc in docs:
-                    data = doc.to_dict()
-                    data["id"] = doc.id
-                    cots.append(data)
-                    
-            elif area:  # Si hay un área específica
-                cots = self.get_collection_data(
-                    collection="cotizaciones",
-                    area=area,
-                    filters=filter,
-                    order_by=order_by,
-                    direction=firestore.Query.DESCENDING,  # Más recientes primero
-                    limit=limit
-                )
-            else:
-                # Caso donde area es string vacío pero no None
-                print("📋 Área vacía, retornando lista vacía")
-                return []
+
+            cots, next_token = self.get_collection_page(
+                collection="cotizaciones",
+                area=area,
+                order_by=order_by,
+                direction=firestore.Query.DESCENDING,  # Más recientes primero
+                page_size=page_size,
+                filters=filter if isinstance(filter, list) else None,
+                page_token=page_token,
+                fields=fields,
+                use_cache=use_cache
+            )
 
             # Verificar si cots es None o vacío
             if not cots:
@@ -420,50 +478,175 @@ class FirestoreAPI:
                     print("📋 No se encontraron cotizaciones en toda la base de datos")
                 else:
                     print(f"📋 No se encontraron cotizaciones para el área: {area}")
-                return []
+                return [], ""
 
-            resultados = [Cot(
-                id=cot.get("id", ""),
-                area=cot.get("area", ""),
-                #family=cot.get("family", ""),
-                #product=cot.get("product", ""),
-                num=completar_con_ceros(cot.get("number", ""), 4),
-                year=completar_con_ceros(cot.get("year", ""), 2),
-                client=cot.get("razonsocial", ""),
-                client_id=cot["client"] if "client" in cot and cot["client"] is not None and isinstance(cot["client"], str) else "",
-                issuedate=cot.get("issuedate", ""),
-                issuedate_timestamp=cot.get("issuedate_timestamp", 0.0),  # Timestamp para ordenamiento
-                vigencia=cot.get("vigencia", ""),
-                status=cot.get("estado", "") if cot.get("estado") is not None else "",
-                aprueba=cot.get("aprueba", "") if cot.get("aprueba") is not None else "",
-                drive_file_id=cot.get("drive_file_id", "") if cot.get("drive_file_id") is not None else "",
-                drive_file_id_name=cot.get("drive_file_id_name", "") if cot.get("drive_file_id_name") is not None else "",
-                drive_aprobacion_id=cot.get("drive_aprobacion_id", "") if cot.get("drive_aprobacion_id") is not None else "",
-                drive_aceptacion_id=cot.get("drive_aceptacion_id", "") if cot.get("drive_aceptacion_id") is not None else "",
-                enviada_fecha=cot.get("enviada_fecha", "") if cot.get("enviada_fecha") is not None else "",
-                facturada_fecha=cot.get("facturada_fecha", "") if cot.get("facturada_fecha") is not None else "",
-                facturar=cot.get("facturar", "") if cot.get("facturar") is not None else "",
-                nombre=cot.get("nombre", "") if cot.get("nombre") is not None else "",
-                email=cot.get("mail", "") if cot.get("mail") is not None else "",
-                ot=cot.get("op", "") if cot.get("op") is not None else "",
-                rev=cot.get("rev", "") if cot.get("rev") is not None else "",
-                resolucion=cot.get("resolucion", "") if cot.get("resolucion") is not None else "",
-                cuenta=cot.get("cuenta", "") if cot.get("cuenta") is not None else "",
-            ) for cot in cots]
+            resultados = [self._doc_to_cot(cot) for cot in cots]
 
             if area is None:
                 print(f"✅ {len(resultados)} cotizaciones obtenidas correctamente (TODAS las áreas)")
             else:
                 print(f"✅ {len(resultados)} cotizaciones obtenidas correctamente para área: {area}")
-            return resultados
-            
+            return resultados, next_token
+
         except Exception as e:
             print(f"❌ Error al obtener cotizaciones: {e}")
             import traceback
             traceback.print_exc()
+            return [], ""
+
+    def _doc_to_cot(self, cot: dict) -> Cot:
+        """Convierte un documento de 'cotizaciones' (con su id) en Cot."""
+        return firestore_to_cot(cot)
+
+    def get_cot_by_id(self, cot_id: str) -> Union[Cot, None]:
+        """
+        Obtiene una cotización por su ID (lectura directa del documento).
+
+        Args:
+            cot_id (str): ID del documento en 'cotizaciones'
+
+        Returns:
+            Cot: La cotización, o None si no existe o hubo un error
+        """
+        if not self.firebase_initialized or not cot_id:
+            return None
+
+        try:
+            doc = self.db.collection("cotizaciones").document(cot_id).get()
+            if not doc.exists:
+                print(f"📋 No existe la cotización: {cot_id}")
+                return None
+            return self._doc_to_cot({"id": doc.id, **doc.to_dict()})
+        except Exception as e:
+            print(f"❌ Error al obtener cotización {cot_id}: {e}")
+            return None
+
+    def get_cots_by_ids(self, cot_ids: List[str]) -> List[Cot]:
+        """
+        Obtiene varias cotizaciones por ID en una sola llamada (db.get_all).
+
+        Args:
+            cot_ids (list): IDs de documentos en 'cotizaciones'
+
+        Returns:
+            list[Cot]: Cotizaciones encontradas, en el orden de cot_ids (se omiten las inexistentes)
+        """
+        if not self.firebase_initialized or not cot_ids:
+            return []
+
+        try:
+            unique_ids = list(dict.fromkeys(cid for cid in cot_ids if cid))
+            collection_ref = self.db.collection("cotizaciones")
+            refs = [collection_ref.document(cid) for cid in unique_ids]
+            found = {
+                doc.id: self._doc_to_cot({"id": doc.id, **doc.to_dict()})
+                for doc in self.db.get_all(refs)
+                if doc.exists
+            }
+            print(f"✅ {len(found)} de {len(unique_ids)} cotizaciones obtenidas por ID")
+            return [found[cid] for cid in unique_ids if cid in found]
+        except Exception as e:
+            print(f"❌ Error al obtener cotizaciones por ID: {e}")
             return []
 
     # Métodos para manejar cotizaciones detalle (información extraída)
+    def _cotizacion_detalle_data(
+        self,
+        cotizacion_id: str,
+        client_data: dict,
+        familias: list,
+        trabajos: list,
+        productos: list = None,
+        metadata: dict = None,
+        tables: list = None,
+        condiciones: Union[str, None] = None,
+        extractor_version: Union[int, None] = None
+    ) -> dict:
+        """Arma el subcampo 'detalle' de una cotización."""
+        # Preparar los datos para guardar
+        # Sanitizar 'tables' para evitar arrays anidados (Firestore no permite arrays dentro de arrays)
+        sanitized_tables = tables
+        if isinstance(tables, list) and any(isinstance(el, list) for el in tables):
+            # Convertir cada fila (lista) en un objeto para evitar arrays anidados
+            sanitized_tables = [{"row": el} for el in tables]
+
+        detalle_data = {
+            "cotizacion_id": cotizacion_id,
+            "client": client_data,
+            "familias": familias or [],
+            "trabajos": trabajos or [],
+            "productos": productos or [],
+            # Campos adicionales solicitados
+            "metadata": metadata or {},
+            "tables": sanitized_tables or [],
+            "condiciones": condiciones or "",
+            "fecha_procesamiento": firestore.SERVER_TIMESTAMP,
+            "version": "1.0"
+        }
+        if extractor_version is not None:
+            detalle_data["extractor_version"] = extractor_version
+        return detalle_data
+
+    def _cotizacion_top_fields(self, detalle_data: dict) -> dict:
+        """Campos principales de la cotización que se completan a partir del detalle."""
+        top_update = {}
+        # Fecha
+        fecha = detalle_data.get('metadata', {}).get('fecha') or detalle_data.get('metadata', {}).get('issuedate')
+        if fecha:
+            top_update['issuedate'] = fecha
+        # Empresa / Razón social
+        empresa = detalle_data.get('client', {}).get('razonsocial') or detalle_data.get('client', {}).get('name')
+        if empresa:
+            top_update['razonsocial'] = empresa
+        # At (nombre)
+        at = detalle_data.get('metadata', {}).get('dirigido_a') or detalle_data.get('metadata', {}).get('at')
+        if at:
+            top_update['nombre'] = at
+        # Consultora
+        consultora = detalle_data.get('metadata', {}).get('consultora') or detalle_data.get('client', {}).get('consultora')
+        if consultora:
+            top_update['consultora'] = consultora
+        # Facturar a
+        facturar = detalle_data.get('metadata', {}).get('facturar') or detalle_data.get('client', {}).get('facturar')
+        if facturar:
+            top_update['facturar'] = facturar
+        # Mail receptor
+        mail_receptor = detalle_data.get('metadata', {}).get('mail_receptor') or detalle_data.get('client', {}).get('email_cotizacion') or detalle_data.get('condiciones', '')
+        if mail_receptor:
+            top_update['mail'] = mail_receptor
+        # Familias y trabajos (guardar versiones simplificadas)
+        familias_top = []
+        for f in detalle_data.get('familias', []) or []:
+            if isinstance(f, dict):
+                familias_top.append({
+                    'id': f.get('id', ''),
+                    'family': f.get('family', ''),
+                    'product': f.get('product', '')
+                })
+            else:
+                familias_top.append({'value': str(f)})
+        if familias_top:
+            top_update['familias'] = familias_top
+
+        trabajos_top = []
+        for t in detalle_data.get('trabajos', []) or []:
+            if isinstance(t, dict):
+                trabajos_top.append({
+                    'descripcion': t.get('descripcion') or t.get('Descripcion') or t.get('desc', ''),
+                    'cantidad': t.get('cantidad', 0),
+                    'descuento': t.get('descuento', 0),
+                    'precio': t.get('precio', 0)
+                })
+            else:
+                trabajos_top.append({'descripcion': str(t)})
+        if trabajos_top:
+            top_update['trabajos'] = trabajos_top
+        return top_update
+
+    def _cot_algolia_record(self, cotizacion_id: str, cot_data: dict) -> dict:
+        """Registro de Algolia de una cotización: mismo formato (y objectID) que el reindex y la sincronización."""
+        return cot_to_algolia(self._doc_to_cot({"id": cotizacion_id, **cot_data}))
+
     def save_cotizacion_detalle(
         self,
         cotizacion_id: str,
@@ -473,7 +656,8 @@ class FirestoreAPI:
         productos: list = None,
         metadata: dict = None,
         tables: list = None,
-        condiciones: Union[str, None] = None
+        condiciones: Union[str, None] = None,
+        extractor_version: Union[int, None] = None
     ) -> bool:
         """
         Guarda la información extraída de una cotización en Firestore.
@@ -485,6 +669,7 @@ class FirestoreAPI:
             trabajos (list): Lista de trabajos extraídos
             productos (list): Lista de productos extraídos (opcional)
             metadata (dict): Metadatos adicionales (fecha de procesamiento, etc.)
+            extractor_version (int): Versión de los extractores de PDF que generaron el detalle (opcional)
         
         Returns:
             bool: True si se guardó exitosamente, False en caso contrario
@@ -494,26 +679,10 @@ class FirestoreAPI:
             return False
         
         try:
-            # Preparar los datos para guardar
-            # Sanitizar 'tables' para evitar arrays anidados (Firestore no permite arrays dentro de arrays)
-            sanitized_tables = tables
-            if isinstance(tables, list) and any(isinstance(el, list) for el in tables):
-                # Convertir cada fila (lista) en un objeto para evitar arrays anidados
-                sanitized_tables = [{"row": el} for el in tables]
-
-            detalle_data = {
-                "cotizacion_id": cotizacion_id,
-                "client": client_data,
-                "familias": familias or [],
-                "trabajos": trabajos or [],
-                "productos": productos or [],
-                # Campos adicionales solicitados
-                "metadata": metadata or {},
-                "tables": sanitized_tables or [],
-                "condiciones": condiciones or "",
-                "fecha_procesamiento": firestore.SERVER_TIMESTAMP,
-                "version": "1.0"
-            }
+            detalle_data = self._cotizacion_detalle_data(
+                cotizacion_id, client_data, familias, trabajos, productos,
+                metadata, tables, condiciones, extractor_version
+            )
 
             # Guardar dentro del documento existente de la colección 'cotizaciones'
             try:
@@ -522,119 +691,20 @@ class FirestoreAPI:
                 cot_ref.set({"detalle": detalle_data}, merge=True)
                 # Además, asegurar que los campos principales solicitados estén en el doc de cotización
                 try:
-                    top_update = {}
-                    # Fecha
-                    fecha = detalle_data.get('metadata', {}).get('fecha') or detalle_data.get('metadata', {}).get('issuedate')
-                    if fecha:
-                        top_update['issuedate'] = fecha
-                    # Empresa / Razón social
-                    empresa = detalle_data.get('client', {}).get('razonsocial') or detalle_data.get('client', {}).get('name')
-                    if empresa:
-                        top_update['razonsocial'] = empresa
-                    # At (nombre)
-                    at = detalle_data.get('metadata', {}).get('dirigido_a') or detalle_data.get('metadata', {}).get('at')
-                    if at:
-                        top_update['nombre'] = at
-                    # Consultora
-                    consultora = detalle_data.get('metadata', {}).get('consultora') or detalle_data.get('client', {}).get('consultora')
-                    if consultora:
-                        top_update['consultora'] = consultora
-                    # Facturar a
-                    facturar = detalle_data.get('metadata', {}).get('facturar') or detalle_data.get('client', {}).get('facturar')
-                    if facturar:
-                        top_update['facturar'] = facturar
-                    # Mail receptor
-                    mail_receptor = detalle_data.get('metadata', {}).get('mail_receptor') or detalle_data.get('client', {}).get('email_cotizacion') or detalle_data.get('condiciones', '')
-                    if mail_receptor:
-                        top_update['mail'] = mail_receptor
-                    # Familias y trabajos (guardar versiones simplificadas)
-                    familias_top = []
-                    for f in detalle_data.get('familias', []) or []:
-                        if isinstance(f, dict):
-                            familias_top.append({
-                                'id': f.get('id', ''),
-                                'family': f.get('family', ''),
-                                'product': f.get('product', '')
-                            })
-                        else:
-                            familias_top.append({'value': str(f)})
-                    if familias_top:
-                        top_update['familias'] = familias_top
-
-                    trabajos_top = []
-                    for t in detalle_data.get('trabajos', []) or []:
-                        if isinstance(t, dict):
-                            trabajos_top.append({
-                                'descripcion': t.get('descripcion') or t.get('Descripcion') or t.get('desc', ''),
-                                'cantidad': t.get('cantidad', 0),
-                                'descuento': t.get('descuento', 0),
-                                'precio': t.get('precio', 0)
-                            })
-                        else:
-                            trabajos_top.append({'descripcion': str(t)})
-                    if trabajos_top:
-                        top_update['trabajos'] = trabajos_top
-
+                    top_update = self._cotizacion_top_fields(detalle_data)
                     if top_update:
                         cot_ref.set(top_update, merge=True)
                 except Exception as e_top:
                     print(f"⚠️ Error actualizando campos principales de cotización: {e_top}")
                 print(f"✅ Cotización detalle guardada dentro de cotizaciones/{cotizacion_id}")
+                self.invalidate_query_cache("cotizaciones")
                 # Indexar en Algolia para búsquedas rápidas (si está configurado)
                 try:
                     if algolia_api and getattr(algolia_api, 'enabled', False):
-                        # Construir registro mínimo para Algolia combinando cot info + detalle
+                        # Mismo registro que el reindex y la sincronización (objectID = id del documento)
                         cot_doc = cot_ref.get()
-                        cot_top = cot_doc.to_dict() if cot_doc.exists else {}
-                        # Priorizar campos del doc top-level, si existen
-                        fecha = (cot_top.get('issuedate') or detalle_data.get('metadata', {}).get('issuedate') or detalle_data.get('metadata', {}).get('fecha') or '')
-                        numero = (str(cot_top.get('number') or detalle_data.get('metadata', {}).get('numero_cotizacion') or detalle_data.get('metadata', {}).get('number', '')))
-                        empresa = (cot_top.get('razonsocial') or detalle_data.get('client', {}).get('razonsocial') or detalle_data.get('client', {}).get('name') or '')
-                        at = detalle_data.get('metadata', {}).get('at', detalle_data.get('metadata', {}).get('nombre', ''))
-                        consultora = cot_top.get('consultora') or detalle_data.get('client', {}).get('consultora') or detalle_data.get('metadata', {}).get('consultora', '')
-                        facturar = cot_top.get('facturar') or detalle_data.get('metadata', {}).get('facturar', '')
-                        mail_receptor = cot_top.get('mail') or detalle_data.get('metadata', {}).get('mail_receptor') or detalle_data.get('client', {}).get('email_cotizacion', '')
-
-                        familias_list = []
-                        try:
-                            for f in detalle_data.get('familias', []):
-                                if isinstance(f, dict):
-                                    familias_list.append(f.get('family') or f.get('product') or f.get('razonsocial') or f.get('id') or str(f))
-                                else:
-                                    familias_list.append(str(f))
-                        except Exception:
-                            familias_list = []
-
-                        trabajos_list = []
-                        try:
-                            for t in detalle_data.get('trabajos', []):
-                                if isinstance(t, dict):
-                                    trabajos_list.append({
-                                        'descripcion': t.get('descripcion') or t.get('Descripcion') or t.get('desc') or t.get('description',''),
-                                        'cantidad': t.get('cantidad') or t.get('qty') or t.get('cantidad', 0),
-                                        'descuento': t.get('descuento') or t.get('discount') or 0,
-                                        'precio': t.get('precio') or t.get('price') or t.get('unit_price') or 0
-                                    })
-                                else:
-                                    trabajos_list.append({'descripcion': str(t)})
-                        except Exception:
-                            trabajos_list = []
-
-                        algolia_record = {
-                            'objectID': f"cot_{cotizacion_id}",
-                            'id': cotizacion_id,
-                            'num': numero,
-                            'fecha': fecha,
-                            'empresa': empresa,
-                            'at': at,
-                            'consultora': consultora,
-                            'facturar': facturar,
-                            'mail_receptor': mail_receptor,
-                            'familias': familias_list,
-                            'trabajos': trabajos_list,
-                            'type': 'cotizacion'
-                        }
-                        algolia_api.index_data('cotizaciones', [algolia_record])
+                        if cot_doc.exists:
+                            algolia_api.index_data('cotizaciones', [self._cot_algolia_record(cotizacion_id, cot_doc.to_dict())])
                 except Exception as e:
                     print(f"⚠️ Error indexando cotización en Algolia: {e}")
                 return True
@@ -643,37 +713,55 @@ class FirestoreAPI:
                 doc_ref = self.db.collection("cotizaciones_detalle").document(cotizacion_id)
                 doc_ref.set(detalle_data, merge=True)
                 print(f"⚠️  Fallback: Cotización detalle guardada en cotizaciones_detalle/{cotizacion_id}")
-                # Intentar indexar también en Algolia con la información disponible
-                try:
-                    if algolia_api and getattr(algolia_api, 'enabled', False):
-                        algolia_record = {
-                            'objectID': f"cot_{cotizacion_id}",
-                            'id': cotizacion_id,
-                            'num': detalle_data.get('metadata', {}).get('numero_cotizacion', ''),
-                            'fecha': detalle_data.get('metadata', {}).get('issuedate', ''),
-                            'empresa': detalle_data.get('client', {}).get('razonsocial', ''),
-                            'at': detalle_data.get('metadata', {}).get('at', ''),
-                            'consultora': detalle_data.get('client', {}).get('consultora', ''),
-                            'facturar': detalle_data.get('metadata', {}).get('facturar', ''),
-                            'mail_receptor': detalle_data.get('metadata', {}).get('mail_receptor', ''),
-                            'familias': [f.get('family', '') if isinstance(f, dict) else str(f) for f in detalle_data.get('familias', [])],
-                            'trabajos': [{
-                                'descripcion': t.get('descripcion') or t.get('Descripcion', ''),
-                                'cantidad': t.get('cantidad', 0),
-                                'descuento': t.get('descuento', 0),
-                                'precio': t.get('precio', 0),
-                            } if isinstance(t, dict) else {'descripcion': str(t)} for t in detalle_data.get('trabajos', [])],
-                            'type': 'cotizacion'
-                        }
-                        algolia_api.index_data('cotizaciones', [algolia_record])
-                except Exception as e:
-                    print(f"⚠️ Error indexando cotización (fallback) en Algolia: {e}")
+                # El documento de 'cotizaciones' no cambió: su registro de Algolia sigue vigente
                 return True
             
         except Exception as e:
             print(f"❌ Error al guardar cotización detalle: {e}")
             return False
     
+    def save_cotizacion_detalles(self, detalles: List[dict], batch_size: int = 100) -> int:
+        """
+        Versión por lotes de save_cotizacion_detalle para cargas masivas.
+
+        Cada elemento de `detalles` tiene los argumentos de save_cotizacion_detalle. El
+        detalle y los campos principales de cada cotización se escriben en una sola
+        operación, hasta `batch_size` cotizaciones por WriteBatch, y cada lote se indexa
+        en Algolia con un único envío.
+
+        Returns:
+            int: Cantidad de cotizaciones guardadas
+        """
+        if not self.firebase_initialized:
+            print("⚠️  Firebase no inicializado. No se pueden guardar cotizaciones detalle.")
+            return 0
+
+        saved = 0
+        for start in range(0, len(detalles), batch_size):
+            written = []  # refs de las cotizaciones del lote
+            try:
+                batch = self.db.batch()
+                for item in detalles[start:start + batch_size]:
+                    detalle_data = self._cotizacion_detalle_data(**item)
+                    cot_ref = self.db.collection("cotizaciones").document(item["cotizacion_id"])
+                    batch.set(cot_ref, {"detalle": detalle_data, **self._cotizacion_top_fields(detalle_data)}, merge=True)
+                    written.append(cot_ref)
+                batch.commit()
+                saved += len(written)
+            except Exception as e:
+                print(f"❌ Error al guardar lote de cotizaciones detalle: {e}")
+                continue
+            self.invalidate_query_cache("cotizaciones")
+
+            try:
+                if algolia_api and getattr(algolia_api, 'enabled', False):
+                    cot_tops = {doc.id: doc.to_dict() for doc in self.db.get_all(written) if doc.exists}
+                    records = [self._cot_algolia_record(ref.id, cot_tops[ref.id]) for ref in written if ref.id in cot_tops]
+                    algolia_api.index_data('cotizaciones', records)
+            except Exception as e:
+                print(f"⚠️ Error indexando lote de cotizaciones en Algolia: {e}")
+        return saved
+
     def get_cotizacion_detalle(self, cotizacion_id: str) -> dict:
         """
         Obtiene la información extraída de una cotización desde Firestore.
@@ -762,6 +850,7 @@ class FirestoreAPI:
                 # Usar update con DELETE_FIELD para eliminar solo el subcampo
                 cot_ref.update({"detalle": firestore.DELETE_FIELD})
                 print(f"✅ Campo 'detalle' eliminado de cotizaciones/{cotizacion_id}")
+                self.invalidate_query_cache("cotizaciones")
                 return True
             except Exception:
                 # Fallback: eliminar documento en la colección legacy
@@ -900,7 +989,9 @@ class FirestoreAPI:
     
     def get_next_cotizacion_number(self, area: str, year: str = None) -> dict:
         """
-        Obtiene el siguiente número de cotización para un área específica.
+        Obtiene (sin reservarlo) el siguiente número de cotización para un área.
+        Lee el documento contador del área/año; para reservar el número usar
+        allocate_cotizacion_number.
         
         Args:
             area (str): ID del área
@@ -914,45 +1005,114 @@ class FirestoreAPI:
             return {"number": "0001", "year": "25", "formatted": "0001/25"}
         
         try:
-            from datetime import datetime
-            
-            # Usar año actual si no se especifica
-            if not year:
-                current_year = datetime.now().year
-                year = str(current_year)[-2:]  # Últimos 2 dígitos del año
-            
-            # Obtener la última cotización del área y año
-            query = (self.db.collection("cotizaciones")
-                    .where("area", "==", area)
-                    .where("year", "==", year)
-                    .order_by("number", direction=firestore.Query.DESCENDING)
-                    .limit(1))
-            
-            docs = list(query.get())
-            
-            if docs:
-                last_doc = docs[0].to_dict()
-                last_number = int(last_doc.get("number", 0))
-                next_number = last_number + 1
+            year = year or self._current_year()
+            counter = self._cotizacion_counter_ref(area, year).get()
+            if counter.exists:
+                last_number = int(counter.to_dict().get("last_number", 0))
             else:
-                next_number = 1
-            
-            # Formatear con ceros a la izquierda
-            formatted_number = str(next_number).zfill(4)
-            formatted_full = f"{formatted_number}/{year}"
-            
-            print(f"✅ Siguiente número de cotización: {formatted_full}")
-            
-            return {
-                "number": formatted_number,
-                "year": year,
-                "formatted": formatted_full
-            }
+                last_number = self._max_cotizacion_number(area, year)
+            return self._format_cotizacion_number(last_number + 1, year)
             
         except Exception as e:
             print(f"❌ Error al obtener siguiente número de cotización: {e}")
             # Retornar número por defecto en caso de error
             return {"number": "0001", "year": year or "25", "formatted": f"0001/{year or '25'}"}
+
+    def allocate_cotizacion_number(self, area: str, year: str = None) -> dict:
+        """
+        Reserva el siguiente número de cotización del área/año de forma atómica.
+
+        Incrementa el documento contador 'contadores_cotizacion/{area}_{year}' dentro de
+        una transacción: una lectura y una escritura, sin índices compuestos y sin
+        números duplicados entre usuarios concurrentes (Firestore reintenta la
+        transacción si el contador cambió). La primera vez el contador se inicializa
+        con el mayor número existente del área/año, leído en la misma transacción.
+
+        Args:
+            area (str): ID del área
+            year (str): Año (formato YY), si no se especifica usa el año actual
+
+        Returns:
+            dict: {"number": str, "year": str, "formatted": "NNNN/YY"}, o None si falló
+        """
+        if not self.firebase_initialized:
+            print("⚠️  Firebase no inicializado. No se puede reservar número de cotización.")
+            return None
+
+        try:
+            year = year or self._current_year()
+            counter_ref = self._cotizacion_counter_ref(area, year)
+
+            @firestore.transactional
+            def increment(transaction):
+                snapshot = counter_ref.get(transaction=transaction)
+                if snapshot.exists:
+                    last_number = int(snapshot.to_dict().get("last_number", 0))
+                else:
+                    # Primera reserva del área/año: el mayor número se lee dentro de la transacción
+                    last_number = self._max_cotizacion_number(area, year, transaction=transaction)
+                next_number = last_number + 1
+                transaction.set(counter_ref, {
+                    "area": area,
+                    "year": year,
+                    "last_number": next_number,
+                    "updated": firestore.SERVER_TIMESTAMP,
+                })
+                return next_number
+
+            next_info = self._format_cotizacion_number(increment(self.db.transaction()), year)
+            print(f"✅ Número de cotización reservado: {next_info['formatted']}")
+            return next_info
+
+        except Exception as e:
+            print(f"❌ Error al reservar número de cotización: {e}")
+            return None
+
+    def _cotizacion_counter_ref(self, area: str, year: str):
+        """Documento contador de números de cotización de un área y año."""
+        return self.db.collection("contadores_cotizacion").document(f"{area}_{year}")
+
+    def _max_cotizacion_number(self, area: str, year: str, transaction=None) -> int:
+        """
+        Mayor número de cotización existente del área/año (solo para inicializar el contador).
+
+        Con `transaction` la lectura forma parte de la transacción que crea el contador.
+        Ordenar por 'number' requiere un índice compuesto (area, year, number); si no
+        existe se leen las cotizaciones del área/año (solo el campo 'number') y se toma
+        el máximo en memoria.
+        """
+        query = (self.db.collection("cotizaciones")
+                .where(filter=FieldFilter("area", "==", area))
+                .where(filter=FieldFilter("year", "==", year))
+                .select(["number"]))
+        try:
+            docs = list(query.order_by("number", direction=firestore.Query.DESCENDING)
+                        .limit(1).get(transaction=transaction))
+        except Exception as index_error:
+            if "index" not in str(index_error).lower():
+                raise
+            print("⚠️  Falta el índice (area, year, number) de cotizaciones; se calcula el máximo sin ordenar")
+            docs = list(query.get(transaction=transaction))
+
+        numbers = []
+        for doc in docs:
+            try:
+                numbers.append(int((doc.to_dict() or {}).get("number", 0) or 0))
+            except (TypeError, ValueError):
+                continue
+        return max(numbers, default=0)
+
+    def _current_year(self) -> str:
+        from datetime import datetime
+        return str(datetime.now().year)[-2:]  # Últimos 2 dígitos del año
+
+    def _format_cotizacion_number(self, number: int, year: str) -> dict:
+        formatted_number = str(number).zfill(4)
+        return {
+            "number": formatted_number,
+            "year": year,
+            "formatted": f"{formatted_number}/{year}"
+        }
     
     def create_cotizacion_from_template(
         self,
@@ -978,9 +1138,6 @@ class FirestoreAPI:
             return None
         
         try:
-            # Obtener siguiente número
-            next_info = self.get_next_cotizacion_number(area)
-            
             # Obtener datos del cliente
             client_doc = self.db.collection("clientes").document(client_id).get()
             if not client_doc.exists:
@@ -988,6 +1145,11 @@ class FirestoreAPI:
                 return None
             
             client_data = client_doc.to_dict()
+
+            # Reservar el siguiente número (transacción sobre el contador del área/año)
+            next_info = self.allocate_cotizacion_number(area)
+            if not next_info:
+                return None
             
             # Preparar datos de la cotización
             from datetime import datetime
@@ -1021,23 +1183,11 @@ class FirestoreAPI:
             cotizacion_id = doc_ref[1].id
             
             print(f"✅ Cotización creada desde template: {next_info['formatted']} (ID: {cotizacion_id})")
-            # Indexar en Algolia el registro básico de la cotización
+            self.invalidate_query_cache("cotizaciones", area)
+            # Indexar en Algolia el registro de la cotización (mismo formato que el reindex)
             try:
                 if algolia_api and getattr(algolia_api, 'enabled', False):
-                    algolia_record = {
-                        'objectID': f"cot_{cotizacion_id}",
-                        'id': cotizacion_id,
-                        'num': next_info['number'],
-                        'fecha': cotizacion_data.get('issuedate', ''),
-                        'empresa': cotizacion_data.get('empresa', ''),
-                        'at': cotizacion_data.get('at', ''),
-                        'consultora': cotizacion_data.get('consultora', ''),
-                        'facturar': cotizacion_data.get('facturar', ''),
-                        'mail_receptor': cotizacion_data.get('mail_receptor', ''),
-                        'familias': [],
-                        'trabajos': [],
-                        'type': 'cotizacion'
-                    }
+                    algolia_record = self._cot_algolia_record(cotizacion_id, cotizacion_data)
                     algolia_api.index_data('cotizaciones', [algolia_record])
             except Exception as e:
                 print(f"⚠️ Error indexando cotización recién creada en Algolia: {e}")
@@ -1054,7 +1204,8 @@ class FirestoreAPI:
         order_by: str = "",
         direction=firestore.Query.DESCENDING,
         limit: int = 50,
-        filters: List[Tuple[str, str, Any]] = None
+        filters: List[Tuple[str, str, Any]] = None,
+        page_token: str = ""
     ) -> Union[list, None]:
         """
         Obtiene los datos desde Firestore con múltiples filtros opcionales.
@@ -1066,81 +1217,495 @@ class FirestoreAPI:
             direction: Dirección de orden (ASCENDING o DESCENDING).
             limit (int): Número máximo de resultados.
             filters (list): Lista de tuplas (campo, operador, valor), ej: [("status", "==", "aprobado")]
+            page_token (str): Token de página devuelto por get_collection_page ("" = desde el inicio).
 
         Returns:
             list: Lista de documentos con sus IDs, o lista vacía en caso de error.
         """
+        return self.get_collection_page(
+            collection=collection,
+            area=area,
+            order_by=order_by,
+            direction=direction,
+            page_size=limit,
+            filters=filters,
+            page_token=page_token
+        )[0]
+
+    def get_collection_page(
+        self,
+        collection: str = "",
+        area: Union[str, None] = "HGGSLLi2VCJaBtK0w794",
+        order_by: str = "",
+        direction=firestore.Query.DESCENDING,
+        page_size: int = 50,
+        filters: List[Tuple[str, str, Any]] = None,
+        page_token: str = "",
+        use_cache: bool = True,
+        fields: List[str] = None
+    ) -> Tuple[list, str]:
+        """
+        Obtiene una página de documentos usando cursores de Firestore (start_after).
+
+        Cada página cuesta `page_size` lecturas: la consulta continúa después del
+        último documento de la página anterior en lugar de volver a leer desde el inicio.
+
+        Args:
+            collection (str): Nombre de la colección de Firestore.
+            area (str): Valor del campo 'area' para filtrar. None = sin filtro por área.
+            order_by (str): Campo por el cual ordenar.
+            direction: Dirección de orden (ASCENDING o DESCENDING).
+            page_size (int): Documentos por página (0 = sin límite, sin página siguiente).
+            filters (list): Lista de tuplas (campo, operador, valor).
+            page_token (str): Token opaco devuelto por la página anterior ("" = primera página).
+            use_cache (bool): Si es False se lee de Firestore sin consultar ni llenar el cache de consultas
+                (para cargas completas que no conviene guardar en memoria).
+            fields (list): Proyección (select) de campos a descargar. None = documento completo.
+
+        Returns:
+            tuple: (lista de documentos con sus IDs, token de la página siguiente o "" si no hay más)
+        """
         if not self.firebase_initialized:
             print("⚠️  Firebase no inicializado. Retornando lista vacía.")
-            return []
-            
+            return [], ""
+
         try:
-            if not collection:
-                raise ValueError("El nombre de la colección no puede estar vacío.")
-            
-            cert_ref = self.db.collection(collection)
-            query = cert_ref.where(filter=FieldFilter("area", "==", area))
+            cache_key, fingerprint, cached = self._page_lookup(
+                collection, area, filters, order_by, direction, page_size, page_token, use_cache, fields
+            )
+            if cached is not None:
+                return cached
 
-            if filters:
-                for field, op, value in filters:
-                    print(f"Aplicando filtro: {field} {op} {value}")
-                    query = query.where(filter=FieldFilter(field, op, value))
+            cursor = None
+            if page_token:
+                cursor = self._resolve_page_token(collection, page_token, fingerprint)
+                if cursor is None:
+                    print("⚠️  Token de página inválido o expirado. Retornando lista vacía.")
+                    return [], ""
 
-            # Si la consulta requiere un índice compuesto, intentar sin order_by primero
+            query, unordered_query = self._page_queries(
+                self.db, collection, area, filters, order_by, direction, page_size, cursor, fields
+            )
             try:
-                if order_by:
-                    query = query.order_by(order_by, direction=direction)
-                
-                if limit > 0:
-                    query = query.limit(limit)
-
-                docs = query.stream()
-                return [{"id": doc.id, **doc.to_dict()} for doc in docs]
-                
+                snapshots = list(query.stream())
             except Exception as index_error:
-                if "index" in str(index_error).lower():
-                    print(f"⚠️  Consulta requiere índice. Ejecutando consulta simplificada sin ordenar.")
-                    print(f"🔗 Para crear el índice: {str(index_error)}")
-                    
-                    # Consulta simplificada sin order_by
-                    simple_query = cert_ref.where(filter=FieldFilter("area", "==", area))
-                    if limit > 0:
-                        simple_query = simple_query.limit(limit)
-                    
-                    docs = simple_query.stream()
-                    return [{"id": doc.id, **doc.to_dict()} for doc in docs]
-                else:
-                    raise index_error
-        
+                if unordered_query is None or not self._is_missing_index(index_error):
+                    raise
+                snapshots = list(unordered_query.stream())
+
+            return self._page_result(collection, snapshots, page_size, fingerprint, cache_key, use_cache)
+
         except Exception as e:
             print(f"Error al obtener datos de la colección: {e}")
-            return []
+            return [], ""
 
-    def get_areas(self) -> dict:
-        """Obtiene el nombre del rol desde Firestore"""
-        if not self.areas:
-            try:
-                query = self.db.collection("areas")
-                docs = query.stream()
-                areas = {doc.id: doc.to_dict() for doc in docs}
-                resultados = [{"id": area_id, "name": area_data.get("name", "")} for area_id, area_data in areas.items()]
-                self.areas = resultados
-                return resultados
-            except Exception as e:
-                print(f"Error al obtener areas: {e}")
-                return "" 
-        else:   
-            print("Areas ya obtenidas.")
-            return self.areas
+    # Pasos de get_collection_page compartidos con la versión asíncrona
+    # (firestore_api_async), que solo cambia la ejecución de la consulta
+    def _page_lookup(self, collection, area, filters, order_by, direction, page_size, page_token, use_cache, fields) -> tuple:
+        """
+        Valida la colección y busca la página en el cache de consultas.
+
+        Returns:
+            tuple: (clave del cache, huella de la consulta, página cacheada o None)
+        """
+        if not collection:
+            raise ValueError("El nombre de la colección no puede estar vacío.")
+
+        cache_key = self._query_cache_key(collection, area, filters, order_by, direction, page_size, page_token, fields)
+        fingerprint = self._query_fingerprint(collection, area, filters, order_by, direction)
+        if use_cache:
+            cached = self.query_cache.get(cache_key)
+            if cached is not None:
+                print(f"⚡ Cache: {len(cached[0])} documentos de '{collection}' sin consultar Firestore")
+                return cache_key, fingerprint, (list(cached[0]), cached[1])
+        return cache_key, fingerprint, None
+
+    def _page_queries(self, db, collection, area, filters, order_by, direction, page_size, cursor, fields) -> tuple:
+        """
+        Consultas de una página desde el cursor: la ordenada por `order_by` y la misma sin
+        ordenar, para cuando falta el índice compuesto (None si no hay orden).
+        """
+        query = self._build_list_query(db, collection, area, filters, order_by, fields)
+        queries = [query.order_by(order_by, direction=direction), query] if order_by else [query]
+        if cursor is not None:
+            queries = [q.start_after(cursor) for q in queries]
+        if page_size > 0:
+            queries = [q.limit(page_size) for q in queries]
+        return queries[0], (queries[1] if len(queries) > 1 else None)
+
+    def _is_missing_index(self, error: Exception) -> bool:
+        """True si la consulta falló por un índice compuesto inexistente (y se puede reintentar sin ordenar)."""
+        if "index" not in str(error).lower():
+            return False
+        print("⚠️  Consulta requiere índice. Ejecutando consulta simplificada sin ordenar.")
+        print(f"🔗 Para crear el índice: {error}")
+        return True
+
+    def _page_result(self, collection, snapshots, page_size, fingerprint, cache_key, use_cache) -> Tuple[list, str]:
+        """Convierte los snapshots en documentos, registra el cursor de la página siguiente y cachea la página."""
+        docs = [{"id": doc.id, **doc.to_dict()} for doc in snapshots]
+
+        # Solo hay página siguiente si la actual vino completa
+        next_token = ""
+        if page_size > 0 and len(snapshots) == page_size:
+            next_token = self._register_page_cursor(collection, snapshots[-1], fingerprint)
+
+        if use_cache:
+            self.query_cache.set(cache_key, (docs, next_token))
+        return list(docs), next_token
+
+    def _build_list_query(self, db, collection: str, area, filters, order_by: str, fields):
+        """
+        Arma la consulta base (área, filtros y proyección) sin orden ni límite.
+        Recibe el cliente para poder usarse tanto con el cliente síncrono como con el asíncrono.
+        """
+        query = db.collection(collection)
+        if area is not None:
+            query = query.where(filter=FieldFilter("area", "==", area))
+
+        if filters:
+            for field, op, value in filters:
+                print(f"Aplicando filtro: {field} {op} {value}")
+                query = query.where(filter=FieldFilter(field, op, value))
+
+        if fields:
+            # El campo de orden debe venir en el snapshot para poder usarlo como cursor
+            projection = list(dict.fromkeys(list(fields) + ([order_by] if order_by else [])))
+            query = query.select(projection)
+        return query
+
+    def _query_fingerprint(self, collection, area, filters, order_by, direction) -> str:
+        """
+        Huella de los parámetros que definen el orden y el contenido de la consulta.
+        Un token solo es válido para la consulta que lo generó (el tamaño de página
+        y la proyección pueden cambiar entre páginas).
+        """
+        filters_key = tuple((f, op, repr(v)) for f, op, v in filters) if isinstance(filters, list) else ()
+        raw = repr((collection, area, filters_key, order_by, str(direction)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    def _register_page_cursor(self, collection: str, snapshot, fingerprint: str) -> str:
+        """Guarda el snapshot del último documento y devuelve el token opaco de la página siguiente."""
+        payload = json.dumps({"c": collection, "q": fingerprint, "id": snapshot.id}, separators=(",", ":"))
+        token = base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+        with self.cursor_lock:
+            self.page_cursors[token] = snapshot
+            self.page_cursors.move_to_end(token)
+            while len(self.page_cursors) > self.max_page_cursors:
+                self.page_cursors.popitem(last=False)
+        return token
+
+    def _resolve_page_token(self, collection: str, page_token: str, fingerprint: str):
+        """
+        Convierte un token de página en el snapshot usado por start_after.
+        Si el snapshot ya no está en memoria (p. ej. tras un reinicio) se relee el documento.
+        Devuelve None si el token no corresponde a esta consulta.
+        """
+        doc_id = self._page_token_doc_id(collection, page_token, fingerprint)
+        if not doc_id:
+            return None
+
+        with self.cursor_lock:
+            snapshot = self.page_cursors.get(page_token)
+        if snapshot is not None:
+            return snapshot
+
+        snapshot = self.db.collection(collection).document(doc_id).get()
+        return snapshot if snapshot.exists else None
+
+    def _page_token_doc_id(self, collection: str, page_token: str, fingerprint: str) -> str:
+        """Decodifica el token y devuelve el ID del último documento ("" si no es válido para la consulta)."""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(page_token.encode("ascii")).decode("utf-8"))
+        except Exception:
+            return ""
+
+        if payload.get("c") != collection or payload.get("q") != fingerprint or not payload.get("id"):
+            return ""
+        return payload["id"]
+
+    def _query_cache_key(self, collection, area, filters, order_by, direction, limit, page_token="", fields=None) -> tuple:
+        """Clave hashable para el cache de consultas."""
+        filters_key = tuple((f, op, repr(v)) for f, op, v in filters) if isinstance(filters, list) else ()
+        fields_key = tuple(fields) if fields else ()
+        return (collection, area, filters_key, order_by, str(direction), limit, page_token, fields_key)
+
+    def invalidate_query_cache(self, collection: str = None, area: str = None) -> int:
+        """
+        Descarta resultados cacheados tras una escritura.
+
+        Args:
+            collection (str): Colección modificada (None = todas).
+            area (str): Área del documento modificado. También se descartan las
+                consultas sin filtro de área (TODAS), que incluyen ese documento.
+
+        Returns:
+            int: Cantidad de entradas eliminadas.
+        """
+        def matches(key):
+            if collection is not None and key[0] != collection:
+                return False
+            return area is None or key[1] in (area, None)
+
+        removed = self.query_cache.invalidate(matches)
+        if removed:
+            print(f"🧹 Cache invalidado: {removed} consultas de '{collection or 'todas'}'")
+        return removed
+
+    def get_live_index(
+        self,
+        collection: str,
+        area: Union[str, None],
+        to_model: Callable[[dict], Any],
+        sort_key: Callable[[Any], tuple],
+        order_by: str = "",
+        direction=firestore.Query.DESCENDING,
+        limit: int = 0,
+        fields: List[str] = None
+    ) -> Union[LiveIndex, None]:
+        """
+        Devuelve el índice en vivo de (colección, área), creando el listener la primera vez.
+
+        El primer snapshot trae los documentos de la consulta; después solo llegan
+        los documentos que cambian, que se aplican sobre el índice sin reconsultar.
+        Si el listener falló, el índice se descarta y durante FIRESTORE_LIVE_INDEX_RETRY
+        segundos se devuelve None (los llamadores consultan Firestore directamente).
+
+        Returns:
+            LiveIndex: Índice compartido, o None si Firebase no está disponible o falló el listener.
+        """
+        if not self.firebase_initialized:
+            return None
+
+        key = (collection, area)
+        failed_index = None
+        with self.live_index_lock:
+            index = self.live_indexes.get(key)
+            if index is not None and not index.failed:
+                return index
+            if index is not None:
+                failed_index = self.live_indexes.pop(key)
+                self.live_index_failures[key] = time.monotonic()
+            failed_at = self.live_index_failures.get(key)
+            if failed_at is not None and time.monotonic() - failed_at < self.live_index_retry:
+                index = None
+            else:
+                index = self._start_live_index(key, to_model, sort_key, order_by, direction, limit, fields)
+
+        if failed_index is not None:
+            print(f"🧹 Índice en vivo {failed_index.name} descartado: {failed_index.error or 'el listener se detuvo'}")
+            failed_index.close()
+        return index
+
+    def _start_live_index(self, key: tuple, to_model, sort_key, order_by: str, direction, limit: int, fields) -> Union[LiveIndex, None]:
+        """Crea el listener del índice (con live_index_lock tomado)."""
+        collection, area = key
+        try:
+            query = self._build_list_query(self.db, collection, area, None, order_by, fields)
+            if order_by:
+                query = query.order_by(order_by, direction=direction)
+            if limit > 0:
+                query = query.limit(limit)
+            fingerprint = self._query_fingerprint(collection, area, None, order_by, direction)
+            index = LiveIndex(f"{collection}/{area or 'TODAS'}", query, to_model, sort_key, limit, fingerprint)
+            self.live_indexes[key] = index
+            self.live_index_failures.pop(key, None)
+            return index
+        except Exception as e:
+            print(f"❌ Error al iniciar el índice en vivo de '{collection}': {e}")
+            self.live_index_failures[key] = time.monotonic()
+            return None
+
+    def get_live_cots_index(self, area: Union[str, None]) -> Union[LiveIndex, None]:
+        """Índice en vivo de las cotizaciones más recientes del área (None = todas)."""
+        return self.get_live_index(
+            "cotizaciones",
+            area,
+            self._doc_to_cot,
+            _cot_sort_key,
+            order_by="issuedate_timestamp",
+            direction=firestore.Query.DESCENDING,
+            limit=self.live_index_limit,
+            fields=COT_LIST_FIELDS
+        )
+
+    def find_live_cot(self, cot_id: str) -> Union[Cot, None]:
+        """Busca una cotización en los índices en vivo ya iniciados (sin consultar Firestore)."""
+        if not cot_id:
+            return None
+        with self.live_index_lock:
+            indexes = [index for (collection, _), index in self.live_indexes.items() if collection == "cotizaciones"]
+        for index in indexes:
+            cot = index.get(cot_id) if index.ready and not index.failed else None
+            if cot is not None:
+                return cot
+        return None
+
+    def live_index_next_token(self, collection: str, index: LiveIndex) -> str:
+        """Token de página para continuar después del índice ("" si el índice contiene toda la consulta)."""
+        snapshot = index.last_snapshot
+        return self._register_page_cursor(collection, snapshot, index.query_fingerprint) if snapshot is not None else ""
+
+    def close_live_indexes(self):
+        """Detiene todos los listeners de índices en vivo."""
+        with self.live_index_lock:
+            indexes = list(self.live_indexes.values())
+            self.live_indexes.clear()
+            client_name_watch = self._drop_client_name_index()
+        for index in indexes:
+            index.close()
+        self._stop_client_name_watch(client_name_watch)
+
+    def _drop_client_name_index(self):
+        """Descarta el índice de clientes (con live_index_lock tomado) y devuelve su listener para detenerlo."""
+        client_name_watch, self.client_name_watch = self.client_name_watch, None
+        self.client_name_index = None
+        self.client_name_index_failed = False
+        self.client_name_index_ready.clear()
+        return client_name_watch
+
+    def _stop_client_name_watch(self, client_name_watch):
+        if client_name_watch is None:
+            return
+        try:
+            client_name_watch.unsubscribe()
+        except Exception as e:
+            print(f"Error al detener el índice de clientes: {e}")
+
+    def _client_name_index_failed(self) -> bool:
+        """True si el listener de 'clientes' falló o se detuvo (el índice ya no se actualiza)."""
+        watch = self.client_name_watch
+        return self.client_name_index_failed or (watch is not None and not getattr(watch, "is_active", True))
+
+    def get_client_name_index(self, timeout: float = 10.0) -> Union[ClientNameIndex, None]:
+        """
+        Índice de razones sociales de todos los clientes, compartido entre sesiones.
+
+        La primera llamada inicia un listener sobre 'clientes': el primer snapshot carga
+        el índice y los siguientes solo aplican los clientes agregados, modificados o
+        eliminados. Si el listener falla, el índice se descarta y la próxima llamada
+        inicia uno nuevo. Devuelve None si Firebase no está disponible, el listener
+        falló o la carga no llega en `timeout`.
+        """
+        if not self.firebase_initialized:
+            return None
+
+        failed_watch = None
+        with self.live_index_lock:
+            if self.client_name_index is not None and self._client_name_index_failed():
+                print("🧹 Índice de clientes descartado: el listener falló")
+                failed_watch = self._drop_client_name_index()
+
+            if self.client_name_index is None:
+                index = ClientNameIndex(normalize_company_name)
+
+                def on_snapshot(snapshot, changes, read_time):
+                    try:
+                        updated = []
+                        for change in changes:
+                            if change.type.name == "REMOVED":
+                                index.remove(change.document.id)
+                            else:
+                                data = change.document.to_dict() or {}
+                                updated.append((self._doc_to_client({"id": change.document.id, **data}), data.get("area", "")))
+                        index.add_many(updated)
+                        if self.client_name_index is index and not self.client_name_index_ready.is_set():
+                            print(f"✅ Índice de clientes cargado: {len(index)} razones sociales")
+                            self.client_name_index_ready.set()
+                    except Exception as e:
+                        # El índice quedó a medio actualizar: se descarta en la próxima llamada.
+                        # Se marca como listo para despertar a quien espera la carga.
+                        print(f"❌ Error al actualizar el índice de clientes: {e}")
+                        if self.client_name_index is index:
+                            self.client_name_index_failed = True
+                            self.client_name_index_ready.set()
+
+                # Asignado antes de iniciar el listener: el primer snapshot puede llegar
+                # antes de que on_snapshot devuelva y debe reconocer este índice
+                self.client_name_index = index
+                try:
+                    self.client_name_watch = self.db.collection("clientes").on_snapshot(on_snapshot)
+                except Exception as e:
+                    print(f"❌ Error al iniciar el índice de clientes: {e}")
+                    self._drop_client_name_index()
+            index = self.client_name_index
+
+        self._stop_client_name_watch(failed_watch)
+        if index is None:
+            return None
+
+        if not self.client_name_index_ready.wait(timeout):
+            print("⚠️  El índice de clientes no terminó de cargar a tiempo")
+            return None
+        if self.client_name_index is not index or self._client_name_index_failed():
+            print("⚠️  El índice de clientes no está disponible: el listener falló")
+            return None
+        return index
+
+    def _count_cache_key(self, collection, area, filters) -> tuple:
+        """Clave del conteo en el cache de consultas (mismo prefijo colección/área para invalidar)."""
+        filters_key = tuple((f, op, repr(v)) for f, op, v in filters) if isinstance(filters, list) else ()
+        return (collection, area, filters_key, "count")
+
+    def count_documents(
+        self,
+        collection: str,
+        area: Union[str, None] = None,
+        filters: List[Tuple[str, str, Any]] = None,
+        use_cache: bool = True
+    ) -> int:
+        """
+        Cuenta los documentos que cumplen (área, filtros) con una agregación count()
+        del servidor, sin descargar los documentos. El resultado se cachea brevemente.
+
+        Args:
+            collection (str): Nombre de la colección de Firestore.
+            area (str): Valor del campo 'area' para filtrar. None = todas las áreas.
+            filters (list): Lista de tuplas (campo, operador, valor).
+            use_cache (bool): Si es False se consulta Firestore aunque haya un valor cacheado.
+
+        Returns:
+            int: Cantidad de documentos, o 0 en caso de error.
+        """
+        if not self.firebase_initialized:
+            return 0
+
+        cache_key = self._count_cache_key(collection, area, filters)
+        if use_cache:
+            cached = self.query_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            query = self._build_list_query(self.db, collection, area, filters, "", None)
+            result = query.count(alias="total").get()
+            total = int(result[0][0].value)
+            self.query_cache.set(cache_key, total, ttl=self.count_cache_ttl)
+            print(f"🔢 {total} documentos en '{collection}'" + (f" para área: {area}" if area else ""))
+            return total
+        except Exception as e:
+            print(f"❌ Error al contar documentos de '{collection}': {e}")
+            return 0
+
+    def get_areas(self) -> list:
+        """Obtiene las áreas (id y nombre) desde el catálogo en memoria"""
+        if not self.firebase_initialized:
+            return []
+        try:
+            return [{"id": area_id, "name": name} for area_id, name in self._get_catalog("areas").items()]
+        except Exception as e:
+            print(f"Error al obtener areas: {e}")
+            return []
 
     def get_area_name(self, area_id: str) -> str:
-        """Obtiene el nombre del area desde Firestore"""
+        """Obtiene el nombre del area desde el catálogo en memoria (sin consultar Firestore)"""
+        if not self.firebase_initialized or not area_id:
+            return ""
         try:
-            doc = self.db.collection("areas").document(area_id).get()
-            return doc.to_dict().get("name", "") if doc.exists else ""
+            return self._get_catalog_name("areas", area_id)
         except Exception as e:
             print(f"Error al obtener nombre del area: {e}")
-            return "" 
+            return ""
 
     def get_clients(
         self,
@@ -1166,6 +1731,12 @@ class FirestoreAPI:
             return []
 
         try:
+            cache_key = self._query_cache_key("clientes", area, filter, order_by, firestore.Query.ASCENDING, limit)
+            client_docs = self.query_cache.get(cache_key)
+            if client_docs is not None:
+                print(f"⚡ Cache: {len(client_docs)} clientes sin consultar Firestore")
+                return [self._doc_to_client(data) for data in client_docs]
+
             clients_ref = self.db.collection('clientes')
             query = clients_ref
             
@@ -1225,21 +1796,9 @@ class FirestoreAPI:
                 else:
                     raise index_error
             
-            clients = []
-            for doc in docs:
-                data = doc.to_dict()
-                client = Client(
-                    id=doc.id,
-                    razonsocial=data.get('razonsocial', ''),
-                    cuit=data.get('cuit', ''),
-                    direccion=data.get('direccion', ''),
-                    phone=data.get('phone', ''),
-                    email_cotizacion=data.get('email_cotizacion', ''),
-                    active_fams=data.get('active_fams', 0),
-                    condiciones=data.get('condiciones', ''),
-                    consultora=data.get('consultora', ''),
-                )
-                clients.append(client)
+            client_docs = [{"id": doc.id, **doc.to_dict()} for doc in docs]
+            self.query_cache.set(cache_key, client_docs)
+            clients = [self._doc_to_client(data) for data in client_docs]
 
             # Si se hizo fallback sin filtro de área, filtrar manualmente por área
             if area and isinstance(filter, list) and filter:
@@ -1255,65 +1814,9 @@ class FirestoreAPI:
             traceback.print_exc()
             return []
 
-    def normalize_company_name(self, name: str) -> str:
-        """
-        Normaliza nombres de empresas eliminando puntuación y terminaciones de tipo de sociedad.
-        
-        Args:
-            name (str): Nombre de la empresa a normalizar
-            
-        Returns:
-            str: Nombre normalizado
-        """
-        if not name:
-            return ""
-            
-        import re
-        
-        # Convertir a mayúsculas y quitar espacios extra
-        normalized = name.upper().strip()
-        
-        # Eliminar puntuación común
-        normalized = re.sub(r'[.,;:\-_()[\]{}"]', ' ', normalized)
-        
-        # Reemplazar múltiples espacios con uno solo
-        normalized = re.sub(r'\s+', ' ', normalized).strip()
-        
-        # Lista de terminaciones de tipos de sociedad a eliminar
-        society_endings = [
-            # Formatos con puntos y sin puntos
-            'SOCIEDAD ANONIMA',
-            'S\\.?A\\.?$',  # SA, S.A., S.A
-            'S\\s+A$',  # S A
-            
-            'SOCIEDAD DE RESPONSABILIDAD LIMITADA', 
-            'S\\.?R\\.?L\\.?$',  # SRL, S.R.L., S.R.L
-            'S\\s+R\\s+L$',  # S R L
-            
-            'CENTRO INTEGRAL DE COMERCIALIZACION SOCIEDAD ANONIMA',
-            'CICSA',
-            
-            'S\\.?H\\.?$',  # SH, S.H.
-            'S\\s+H$',  # S H
-            
-            'S\\.?A\\.?S\\.?$',  # SAS, S.A.S.
-            
-            'LTD',
-            
-            'S\\.?A\\.?I\\.?C\\.?A\\.?I\\.?$',  # SAICAI, S.A.I.C.A.I.
-            'S\\.?A\\.?I\\.?C\\s+Y\\s+F\\.?$',  # SAICYF, S.A.I.C Y F., S.A.I.C.YF.
-            'SAICYF$',
-            'S\\.?A\\.?I\\.?C\\.?YF\\.?$'
-        ]
-        
-        # Eliminar cada tipo de terminación
-        for ending in society_endings:
-            # Usar regex para eliminar la terminación al final de la cadena
-            pattern = f'\\s*{ending}\\s*$'
-            normalized = re.sub(pattern, '', normalized, flags=re.IGNORECASE)
-            normalized = normalized.strip()
-        
-        return normalized
+    def _doc_to_client(self, data: dict) -> Client:
+        """Convierte un documento de 'clientes' (con su id) en Client."""
+        return firestore_to_client(data)
 
     def search_clients_by_similarity(
         self,
@@ -1336,58 +1839,12 @@ class FirestoreAPI:
             return []
         
         try:
-            # Obtener todos los clientes (sin límite para búsqueda)
-            print(f"🔍 DEBUG: Obteniendo clientes para similitud con área: {area}")
-            all_clients = self.get_clients(area=area, limit=1000)  # Límite alto para búsqueda
-            print(f"🔍 DEBUG: Obtenidos {len(all_clients)} clientes para comparar")
-            
-            if not all_clients:
+            index = self.get_client_name_index()
+            if index is None:
                 print(f"⚠️  No hay clientes disponibles para comparar")
                 return []
             
-            import difflib
-            
-            # Normalizar el término de búsqueda
-            razonsocial_normalized = self.normalize_company_name(razonsocial)
-            print(f"🔍 DEBUG: Nombre normalizado para búsqueda: '{razonsocial}' → '{razonsocial_normalized}'")
-            
-            similar_clients = []
-            
-            print(f"🔍 DEBUG: Buscando similitud para '{razonsocial_normalized}' (umbral: {similarity_threshold})")
-            
-            for client in all_clients:
-                if not client.razonsocial:
-                    continue
-                
-                # Normalizar nombre del cliente
-                client_name_normalized = self.normalize_company_name(client.razonsocial)
-                
-                if not client_name_normalized:
-                    continue
-                
-                # Calcular similitud usando SequenceMatcher con nombres normalizados
-                similarity = difflib.SequenceMatcher(None, razonsocial_normalized, client_name_normalized).ratio()
-                
-                # También buscar palabras clave con nombres normalizados
-                search_words = set(razonsocial_normalized.split())
-                client_words = set(client_name_normalized.split())
-                word_overlap = len(search_words.intersection(client_words))
-                word_similarity = word_overlap / max(len(search_words), len(client_words)) if search_words or client_words else 0
-                
-                # Combinar similitudes
-                final_similarity = max(similarity, word_similarity)
-                
-                # Debug para mostrar comparaciones prometedoras
-                if final_similarity > 0.3:  # Mostrar comparaciones prometedoras
-                    print(f"🔍 DEBUG: '{client.razonsocial}' → '{client_name_normalized}' -> similitud: {similarity:.3f}, palabras: {word_similarity:.3f}, final: {final_similarity:.3f}")
-                
-                if final_similarity >= similarity_threshold:
-                    similar_clients.append((client, final_similarity))
-            
-            # Ordenar por similitud (más similar primero)
-            similar_clients.sort(key=lambda x: x[1], reverse=True)
-            
-            result = [client for client, similarity in similar_clients]
+            result = [client for client, similarity in index.match(razonsocial, similarity_threshold, area=area)]
             print(f"🔍 Encontrados {len(result)} clientes similares a '{razonsocial}' con umbral {similarity_threshold}")
             
             return result
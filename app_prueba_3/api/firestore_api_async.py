@@ -0,0 +1,406 @@
+"""
+Variante asíncrona de FirestoreAPI sobre el cliente AsyncClient de Firestore.
+
+Las lecturas usadas desde los event handlers de Reflex (listas paginadas, lectura
+por ID, detalle y clientes) se hacen con el cliente asíncrono, así una consulta lenta
+no bloquea el event loop de las demás sesiones. El resto de los métodos de
+FirestoreAPI se exponen con el mismo nombre y se ejecutan en un hilo (asyncio.to_thread).
+
+Comparte con la instancia síncrona el cache de consultas, los cursores de página,
+los catálogos y los conversores de documentos.
+"""
+import asyncio
+from typing import Any, List, Tuple, Union
+from firebase_admin import firestore
+from .firestore_api import firestore_api, FirestoreAPI, COT_LIST_FIELDS
+from ..utils import Cot, Client
+
+try:
+    from firebase_admin import firestore_async
+except ImportError:  # firebase_admin < 6.0 no incluye el cliente asíncrono
+    firestore_async = None
+
+
+class AsyncFirestoreAPI:
+    def __init__(self, sync_api: FirestoreAPI):
+        self.sync_api = sync_api
+        self.db = None
+
+        if not sync_api.firebase_initialized:
+            print("⚠️  Firebase no inicializado. Cliente asíncrono deshabilitado.")
+        elif firestore_async is None:
+            print("⚠️  firebase_admin sin firestore_async. Las lecturas se ejecutarán en un hilo.")
+        else:
+            try:
+                self.db = firestore_async.client()
+                print("✅ Cliente asíncrono de Firestore inicializado")
+            except Exception as e:
+                print(f"❌ Error al inicializar el cliente asíncrono de Firestore: {e}")
+                self.db = None
+
+    @property
+    def firebase_initialized(self) -> bool:
+        return self.sync_api.firebase_initialized
+
+    def __getattr__(self, name: str):
+        """
+        Resto de la superficie de FirestoreAPI: los métodos se devuelven como
+        corrutinas que ejecutan la versión síncrona en un hilo.
+        """
+        attr = getattr(self.sync_api, name)
+        if not callable(attr):
+            return attr
+
+        async def run_in_thread(*args, **kwargs):
+            return await asyncio.to_thread(attr, *args, **kwargs)
+
+        run_in_thread.__name__ = name
+        run_in_thread.__doc__ = attr.__doc__
+        return run_in_thread
+
+    # Listas paginadas
+    async def get_collection_data(
+        self,
+        collection: str = "",
+        area: str = "HGGSLLi2VCJaBtK0w794",
+        order_by: str = "",
+        direction=firestore.Query.DESCENDING,
+        limit: int = 50,
+        filters: List[Tuple[str, str, Any]] = None,
+        page_token: str = ""
+    ) -> Union[list, None]:
+        """Versión asíncrona de FirestoreAPI.get_collection_data."""
+        docs, _ = await self.get_collection_page(
+            collection=collection,
+            area=area,
+            order_by=order_by,
+            direction=direction,
+            page_size=limit,
+            filters=filters,
+            page_token=page_token
+        )
+        return docs
+
+    async def get_collection_page(
+        self,
+        collection: str = "",
+        area: Union[str, None] = "HGGSLLi2VCJaBtK0w794",
+        order_by: str = "",
+        direction=firestore.Query.DESCENDING,
+        page_size: int = 50,
+        filters: List[Tuple[str, str, Any]] = None,
+        page_token: str = "",
+        use_cache: bool = True,
+        fields: List[str] = None
+    ) -> Tuple[list, str]:
+        """
+        Versión asíncrona de FirestoreAPI.get_collection_page.
+        Los tokens de página son intercambiables entre ambas versiones.
+        """
+        api = self.sync_api
+        if not api.firebase_initialized:
+            print("⚠️  Firebase no inicializado. Retornando lista vacía.")
+            return [], ""
+
+        if self.db is None:
+            return await asyncio.to_thread(
+                api.get_collection_page, collection, area, order_by, direction,
+                page_size, filters, page_token, use_cache, fields
+            )
+
+        try:
+            cache_key, fingerprint, cached = api._page_lookup(
+                collection, area, filters, order_by, direction, page_size, page_token, use_cache, fields
+            )
+            if cached is not None:
+                return cached
+
+            cursor = None
+            if page_token:
+                cursor = await self._resolve_page_token(collection, page_token, fingerprint)
+                if cursor is None:
+                    print("⚠️  Token de página inválido o expirado. Retornando lista vacía.")
+                    return [], ""
+
+            query, unordered_query = api._page_queries(
+                self.db, collection, area, filters, order_by, direction, page_size, cursor, fields
+            )
+            try:
+                snapshots = list(await query.get())
+            except Exception as index_error:
+                if unordered_query is None or not api._is_missing_index(index_error):
+                    raise
+                snapshots = list(await unordered_query.get())
+
+            return api._page_result(collection, snapshots, page_size, fingerprint, cache_key, use_cache)
+
+        except Exception as e:
+            print(f"Error al obtener datos de la colección: {e}")
+            return [], ""
+
+    async def _resolve_page_token(self, collection: str, page_token: str, fingerprint: str):
+        """Igual que FirestoreAPI._resolve_page_token, releyendo el documento con el cliente asíncrono."""
+        api = self.sync_api
+        doc_id = api._page_token_doc_id(collection, page_token, fingerprint)
+        if not doc_id:
+            return None
+
+        with api.cursor_lock:
+            snapshot = api.page_cursors.get(page_token)
+        if snapshot is not None:
+            return snapshot
+
+        snapshot = await self.db.collection(collection).document(doc_id).get()
+        return snapshot if snapshot.exists else None
+
+    async def count_documents(
+        self,
+        collection: str,
+        area: Union[str, None] = None,
+        filters: List[Tuple[str, str, Any]] = None,
+        use_cache: bool = True
+    ) -> int:
+        """Versión asíncrona de FirestoreAPI.count_documents (comparte el cache de conteos)."""
+        api = self.sync_api
+        if self.db is None:
+            return await asyncio.to_thread(api.count_documents, collection, area, filters, use_cache)
+
+        cache_key = api._count_cache_key(collection, area, filters)
+        if use_cache:
+            cached = api.query_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            query = api._build_list_query(self.db, collection, area, filters, "", None)
+            result = await query.count(alias="total").get()
+            total = int(result[0][0].value)
+            api.query_cache.set(cache_key, total, ttl=api.count_cache_ttl)
+            print(f"🔢 {total} documentos en '{collection}'" + (f" para área: {area}" if area else ""))
+            return total
+        except Exception as e:
+            print(f"❌ Error al contar documentos de '{collection}': {e}")
+            return 0
+
+    async def _get_typed_page(
+        self,
+        collection: str,
+        label: str,
+        to_model,
+        area,
+        order_by: str,
+        direction,
+        page_size: int,
+        filter,
+        page_token: str,
+        fields: List[str] = None,
+        use_cache: bool = True
+    ) -> Tuple[list, str]:
+        """Lee una página de `collection` y la convierte con `to_model` (Certs, Fam o Cot)."""
+        if not self.sync_api.firebase_initialized:
+            print("⚠️  Firebase no inicializado. Retornando lista vacía.")
+            return [], ""
+
+        try:
+            # Caso donde area es string vacío pero no None
+            if area is not None and not area:
+                print("📋 Área vacía, retornando lista vacía")
+                return [], ""
+
+            docs, next_token = await self.get_collection_page(
+                collection=collection,
+                area=area,
+                order_by=order_by,
+                direction=direction,
+                page_size=page_size,
+                filters=filter if isinstance(filter, list) else None,
+                page_token=page_token,
+                fields=fields,
+                use_cache=use_cache
+            )
+
+            if not docs:
+                print(f"📋 No se encontraron {label}" + (f" para el área: {area}" if area else " en toda la base de datos"))
+                return [], ""
+
+            resultados = [to_model(doc) for doc in docs]
+            print(f"✅ {len(resultados)} {label} obtenidos correctamente" + (f" para área: {area}" if area else " (TODAS las áreas)"))
+            return resultados, next_token
+
+        except Exception as e:
+            print(f"❌ Error al obtener {label}: {e}")
+            import traceback
+            traceback.print_exc()
+            return [], ""
+
+    async def get_certs(self, area: str = "HGGSLLi2VCJaBtK0w794", order_by: str = "issuedate", limit: int = 50, filter: str = "", page_token: str = "", use_cache: bool = True) -> list:
+        """Obtiene los certificados del usuario desde Firestore"""
+        return (await self.get_certs_page(area, order_by, limit, filter, page_token, use_cache=use_cache))[0]
+
+    async def get_certs_page(self, area: str = "HGGSLLi2VCJaBtK0w794", order_by: str = "issuedate", page_size: int = 50, filter: str = "", page_token: str = "", use_cache: bool = True) -> Tuple[list, str]:
+        """Versión asíncrona de FirestoreAPI.get_certs_page."""
+        return await self._get_typed_page(
+            "certificados", "certificados", self.sync_api._doc_to_cert,
+            area, order_by, firestore.Query.ASCENDING, page_size, filter, page_token,
+            use_cache=use_cache
+        )
+
+    async def get_fams(self, area: str = "HGGSLLi2VCJaBtK0w794", order_by: str = "razonsocial", limit: int = 50, filter: str = "", page_token: str = "", use_cache: bool = True) -> list:
+        """Obtiene las familias del usuario desde Firestore"""
+        return (await self.get_fams_page(area, order_by, limit, filter, page_token, use_cache=use_cache))[0]
+
+    async def get_fams_page(self, area: str = "HGGSLLi2VCJaBtK0w794", order_by: str = "razonsocial", page_size: int = 50, filter: str = "", page_token: str = "", use_cache: bool = True) -> Tuple[list, str]:
+        """Versión asíncrona de FirestoreAPI.get_fams_page."""
+        return await self._get_typed_page(
+            "familias", "familias", self.sync_api._doc_to_fam,
+            area, order_by, firestore.Query.ASCENDING, page_size, filter, page_token,
+            use_cache=use_cache
+        )
+
+    async def get_cots(self, area: str = "HGGSLLi2VCJaBtK0w794", order_by: str = "issuedate", limit: int = 50, filter: str = "", page_token: str = "", use_cache: bool = True) -> list:
+        """Obtiene las cotizaciones del usuario desde Firestore"""
+        return (await self.get_cots_page(area, order_by, limit, filter, page_token, use_cache=use_cache))[0]
+
+    async def get_cots_page(
+            self,
+            area: str = "HGGSLLi2VCJaBtK0w794",
+            order_by: str = "issuedate",
+            page_size: int = 50,
+            filter: str = "",
+            page_token: str = "",
+            fields: Union[List[str], None] = COT_LIST_FIELDS,
+            use_cache: bool = True
+        ) -> Tuple[list, str]:
+        """Versión asíncrona de FirestoreAPI.get_cots_page (más recientes primero)."""
+        return await self._get_typed_page(
+            "cotizaciones", "cotizaciones", self.sync_api._doc_to_cot,
+            area, order_by, firestore.Query.DESCENDING, page_size, filter, page_token, fields,
+            use_cache=use_cache
+        )
+
+    # Lecturas por ID
+    async def get_cot_by_id(self, cot_id: str) -> Union[Cot, None]:
+        """Versión asíncrona de FirestoreAPI.get_cot_by_id."""
+        if self.db is None:
+            return await asyncio.to_thread(self.sync_api.get_cot_by_id, cot_id)
+        if not cot_id:
+            return None
+
+        try:
+            doc = await self.db.collection("cotizaciones").document(cot_id).get()
+            if not doc.exists:
+                print(f"📋 No existe la cotización: {cot_id}")
+                return None
+            return self.sync_api._doc_to_cot({"id": doc.id, **doc.to_dict()})
+        except Exception as e:
+            print(f"❌ Error al obtener cotización {cot_id}: {e}")
+            return None
+
+    async def get_cots_by_ids(self, cot_ids: List[str]) -> List[Cot]:
+        """Versión asíncrona de FirestoreAPI.get_cots_by_ids."""
+        if self.db is None:
+            return await asyncio.to_thread(self.sync_api.get_cots_by_ids, cot_ids)
+        if not cot_ids:
+            return []
+
+        try:
+            unique_ids = list(dict.fromkeys(cid for cid in cot_ids if cid))
+            collection_ref = self.db.collection("cotizaciones")
+            refs = [collection_ref.document(cid) for cid in unique_ids]
+            found = {}
+            async for doc in self.db.get_all(refs):
+                if doc.exists:
+                    found[doc.id] = self.sync_api._doc_to_cot({"id": doc.id, **doc.to_dict()})
+            print(f"✅ {len(found)} de {len(unique_ids)} cotizaciones obtenidas por ID")
+            return [found[cid] for cid in unique_ids if cid in found]
+        except Exception as e:
+            print(f"❌ Error al obtener cotizaciones por ID: {e}")
+            return []
+
+    async def get_cotizacion_detalle(self, cotizacion_id: str) -> dict:
+        """Versión asíncrona de FirestoreAPI.get_cotizacion_detalle."""
+        if self.db is None:
+            return await asyncio.to_thread(self.sync_api.get_cotizacion_detalle, cotizacion_id)
+
+        try:
+            # Primero intentar leer el detalle dentro del documento de 'cotizaciones'
+            cot_doc = await self.db.collection("cotizaciones").document(cotizacion_id).get()
+            if cot_doc.exists:
+                cot_data = cot_doc.to_dict()
+                if "detalle" in cot_data:
+                    print(f"✅ Cotización detalle encontrada dentro de cotizaciones/{cotizacion_id}")
+                    return cot_data.get("detalle")
+
+            # Fallback: leer de la colección legacy 'cotizaciones_detalle'
+            doc = await self.db.collection("cotizaciones_detalle").document(cotizacion_id).get()
+            if doc.exists:
+                print(f"✅ Cotización detalle encontrada en cotizaciones_detalle/{cotizacion_id}")
+                return doc.to_dict()
+            print(f"📋 No existe cotización detalle para: {cotizacion_id}")
+            return None
+
+        except Exception as e:
+            print(f"❌ Error al obtener cotización detalle: {e}")
+            return None
+
+    async def cotizacion_detalle_exists(self, cotizacion_id: str) -> bool:
+        """Versión asíncrona de FirestoreAPI.cotizacion_detalle_exists."""
+        if self.db is None:
+            return await asyncio.to_thread(self.sync_api.cotizacion_detalle_exists, cotizacion_id)
+
+        try:
+            cot_doc = await self.db.collection("cotizaciones").document(cotizacion_id).get()
+            if cot_doc.exists and "detalle" in cot_doc.to_dict():
+                return True
+
+            doc = await self.db.collection("cotizaciones_detalle").document(cotizacion_id).get()
+            return doc.exists
+        except Exception as e:
+            print(f"❌ Error al verificar cotización detalle: {e}")
+            return False
+
+    async def get_clients(
+        self,
+        area: str = None,
+        order_by: str = "razonsocial",
+        limit: int = 100,
+        filter: Union[str, list] = ""
+    ) -> list[Client]:
+        """
+        Versión asíncrona de FirestoreAPI.get_clients. Si la consulta necesita un
+        índice que no existe, se delega en la versión síncrona (que tiene los fallbacks).
+        """
+        api = self.sync_api
+        if self.db is None:
+            return await asyncio.to_thread(api.get_clients, area, order_by, limit, filter)
+
+        try:
+            cache_key = api._query_cache_key("clientes", area, filter, order_by, firestore.Query.ASCENDING, limit)
+            client_docs = api.query_cache.get(cache_key)
+            if client_docs is None:
+                query = api._build_list_query(
+                    self.db, "clientes", area or None, filter if isinstance(filter, list) else None, order_by, None
+                )
+                if order_by:
+                    query = query.order_by(order_by, direction=firestore.Query.ASCENDING)
+                if limit > 0:
+                    query = query.limit(limit)
+                client_docs = [{"id": doc.id, **doc.to_dict()} for doc in await query.get()]
+                api.query_cache.set(cache_key, client_docs)
+            else:
+                print(f"⚡ Cache: {len(client_docs)} clientes sin consultar Firestore")
+
+            clients = [api._doc_to_client(data) for data in client_docs]
+            print(f"✅ {len(clients)} clientes obtenidos correctamente" + (f" (con filtro por área: {area})" if area else ""))
+            return clients
+
+        except Exception as e:
+            if "index" in str(e).lower():
+                print("⚠️  Consulta requiere índice. Usando la consulta síncrona con fallback.")
+                return await asyncio.to_thread(api.get_clients, area, order_by, limit, filter)
+            print(f"❌ Error al obtener clientes: {e}")
+            return []
+
+
+# Instancia global del API asíncrono
+firestore_api_async = AsyncFirestoreAPI(firestore_api)
@@ -1,30 +1,11 @@
 import io
 from typing import List, Dict
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-from google.oauth2 import service_account
 import pdfplumber
-
-# Configuración: ruta a tu service account
-SERVICE_ACCOUNT_FILE = 'app_prueba_3/serviceAccountKey.json'
-SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
-
-def get_drive_service():
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-    return build('drive', 'v3', credentials=creds)
+from .drive_client import drive_client
 
 def download_pdf_from_drive(file_id: str) -> bytes:
     """Descarga un archivo PDF de Google Drive por su ID (soporta unidades compartidas) y retorna los bytes."""
-    service = get_drive_service()
-    request = service.files().get_media(fileId=file_id, supportsAllDrives=True)
-    fh = io.BytesIO()
-    downloader = MediaIoBaseDownload(fh, request)
-    done = False
-    while not done:
-        status, done = downloader.next_chunk()
-    fh.seek(0)
-    return fh.read()
+    return drive_client.download_bytes(file_id)
 
 def extract_tables_from_pdf(pdf_bytes: bytes) -> List[Dict]:
     """Extrae tablas de un PDF (bytes) y retorna una lista de filas como diccionarios."""
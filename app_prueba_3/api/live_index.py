@@ -0,0 +1,151 @@
+"""
+Índice en memoria de una consulta de Firestore, sincronizado con on_snapshot.
+
+El listener recibe solo los cambios (ADDED / MODIFIED / REMOVED) y el índice los
+aplica sobre un diccionario id -> modelo y una lista ordenada, sin volver a
+ejecutar la consulta. Varias sesiones pueden compartir el mismo índice y esperar
+cambios de forma asíncrona con wait_for_change.
+
+Si el listener falla (falta un índice compuesto, permisos) el error no llega al
+callback: el Watch simplemente deja de estar activo. `failed` lo detecta para que
+quien comparte el índice lo descarte en lugar de esperar un snapshot que no llega.
+"""
+import asyncio
+import bisect
+import time
+from threading import Lock
+from typing import Callable, List, Union
+
+
+class LiveIndex:
+    def __init__(self, name: str, query, to_model: Callable[[dict], object], sort_key: Callable[[object], tuple], limit: int = 0,
+                 query_fingerprint: str = ""):
+        """
+        Args:
+            name (str): Nombre para los logs, p. ej. "cotizaciones/<area>".
+            query: Consulta de Firestore a escuchar (con orden y límite ya aplicados).
+            to_model: Convierte el documento (con su id) en el modelo.
+            sort_key: Clave de orden ascendente del modelo (negar valores para orden descendente).
+            limit (int): Límite aplicado a la consulta (0 = sin límite).
+            query_fingerprint (str): Huella de la consulta, para los tokens de página que continúan después del índice.
+        """
+        self.name = name
+        self.to_model = to_model
+        self.sort_key = sort_key
+        self.limit = limit
+        self.query_fingerprint = query_fingerprint
+        self.version = 0                 # Se incrementa con cada snapshot aplicado
+        self.ready = False               # True después del primer snapshot
+        self.error = None                # Motivo de la falla, si el índice dejó de actualizarse
+        self.last_snapshot = None        # Último documento de la consulta si vino completa (cursor)
+        self._models: dict = {}          # id -> modelo
+        self._keys: dict = {}            # id -> clave de orden
+        self._order: List[tuple] = []    # [(clave, id)] ordenado
+        self._lock = Lock()
+        self._waiters: set = set()       # {(loop, asyncio.Event)}
+        self._watch = query.on_snapshot(self._on_snapshot)
+        print(f"👂 Índice en vivo iniciado: {name}")
+
+    def _on_snapshot(self, snapshot, changes, read_time):
+        """Aplica los cambios recibidos (corre en el hilo del listener)."""
+        try:
+            with self._lock:
+                for change in changes:
+                    doc_id = change.document.id
+                    self._remove(doc_id)
+                    if change.type.name != "REMOVED":
+                        self._insert(doc_id, self.to_model({"id": doc_id, **(change.document.to_dict() or {})}))
+
+                full_page = self.limit > 0 and len(snapshot) >= self.limit
+                self.last_snapshot = snapshot[-1] if full_page else None
+                self.version += 1
+                self.ready = True
+                waiters = list(self._waiters)
+
+            if changes:
+                print(f"🔄 Índice en vivo {self.name}: {len(changes)} cambios (v{self.version})")
+            for loop, event in waiters:
+                loop.call_soon_threadsafe(event.set)
+        except Exception as e:
+            # El índice quedó a medio actualizar: marcarlo como fallido para que se descarte
+            self.error = str(e) or type(e).__name__
+            print(f"❌ Error al aplicar cambios en el índice {self.name}: {e}")
+            with self._lock:
+                waiters = list(self._waiters)
+            for loop, event in waiters:
+                loop.call_soon_threadsafe(event.set)
+
+    @property
+    def failed(self) -> bool:
+        """True si el listener falló o se detuvo (el índice ya no se actualiza)."""
+        return self.error is not None or not getattr(self._watch, "is_active", True)
+
+    def _insert(self, doc_id: str, model):
+        key = (self.sort_key(model), doc_id)
+        self._models[doc_id] = model
+        self._keys[doc_id] = key
+        bisect.insort(self._order, key)
+
+    def _remove(self, doc_id: str):
+        key = self._keys.pop(doc_id, None)
+        if key is None:
+            return
+        self._models.pop(doc_id, None)
+        pos = bisect.bisect_left(self._order, key)
+        if pos < len(self._order) and self._order[pos] == key:
+            del self._order[pos]
+
+    def items(self, start: int = 0, end: Union[int, None] = None) -> list:
+        """Modelos en orden, opcionalmente solo el rango [start:end]."""
+        with self._lock:
+            return [self._models[doc_id] for _, doc_id in self._order[start:end]]
+
+    def get(self, doc_id: str):
+        with self._lock:
+            return self._models.get(doc_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._order)
+
+    async def wait_for_change(self, version: int, timeout: Union[float, None] = None) -> int:
+        """Espera hasta que la versión sea distinta de `version` (o venza el timeout) y devuelve la actual."""
+        if self.version != version:
+            return self.version
+
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self.version != version:
+                return self.version
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+        return self.version
+
+    async def wait_ready(self, timeout: float = 10.0) -> bool:
+        """Espera el primer snapshot. Devuelve False si no llegó a tiempo o el listener falló."""
+        deadline = time.monotonic() + timeout
+        while not self.ready and not self.failed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.error = f"el primer snapshot no llegó en {timeout:.0f}s"
+                break
+            # Esperar por tramos cortos: la falla del listener no dispara ningún cambio
+            await self.wait_for_change(0, min(remaining, 0.5))
+        if self.failed:
+            print(f"⚠️  Índice en vivo {self.name} no disponible: {self.error or 'el listener se detuvo'}")
+            return False
+        return True
+
+    def close(self):
+        """Cancela el listener."""
+        try:
+            self._watch.unsubscribe()
+            print(f"🔇 Índice en vivo detenido: {self.name}")
+        except Exception as e:
+            print(f"Error al detener el índice {self.name}: {e}")
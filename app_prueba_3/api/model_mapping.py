@@ -0,0 +1,218 @@
+"""
+Mapeo declarativo documento -> modelo (Cot, Fam, Certs, Client).
+
+Cada modelo tiene una única especificación de campos con la clave de origen en
+Firestore y en Algolia y la conversión a aplicar. Las especificaciones se compilan
+una sola vez (al importar el módulo) en funciones Python generadas que leen cada
+clave una vez, normalizan el tipo y construyen el modelo sin revalidarlo.
+
+Conversiones disponibles:
+    str       None -> "", str se deja igual, el resto con str()
+    str_only  Solo acepta str; cualquier otro tipo -> ""
+    pad2/pad4 completar_con_ceros a 2 / 4 dígitos (None -> "")
+    float/int Número; None o valores no numéricos -> 0
+    date      timestamp_to_date (timestamps de Algolia a dd-mm-YYYY)
+    list      None -> [], el resto con list()
+"""
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Union
+from ..utils import Cot, Certs, Fam, Client, Model, completar_con_ceros
+
+
+class FieldSpec(NamedTuple):
+    """Un campo del modelo: clave en Firestore, clave en Algolia y conversión."""
+    attr: str
+    firestore: Union[str, None]           # None = no se lee desde Firestore
+    algolia: Union[str, None]             # None = no se lee desde Algolia
+    kind: str = "str"
+    algolia_kind: Union[str, None] = None  # Conversión distinta para Algolia (None = la misma)
+
+
+def timestamp_to_date(timestamp) -> str:
+    """Convierte un timestamp a fecha en formato DD-MM-YYYY"""
+    if not timestamp:
+        return ''
+
+    try:
+        # Si el timestamp es un string, convertirlo a int/float
+        if isinstance(timestamp, str):
+            timestamp = float(timestamp)
+
+        # Si el timestamp está en milisegundos, convertir a segundos
+        if timestamp > 1e12:  # Timestamp en milisegundos
+            timestamp = timestamp / 1000
+
+        # Convertir timestamp a datetime y formatear
+        dt = datetime.fromtimestamp(timestamp)
+        return dt.strftime('%d-%m-%Y')
+    except (ValueError, TypeError, OSError):
+        return str(timestamp) if timestamp else ''
+
+
+def _to_str(value) -> str:
+    if value is None:
+        return ""
+    return value if value.__class__ is str else str(value)
+
+
+def _to_str_only(value) -> str:
+    return value if isinstance(value, str) else ""
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value) if value is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_list(value) -> list:
+    return [] if value is None else list(value)
+
+
+CONVERTERS: Dict[str, Callable] = {
+    "str": _to_str,
+    "str_only": _to_str_only,
+    "pad2": lambda value: completar_con_ceros("" if value is None else value, 2),
+    "pad4": lambda value: completar_con_ceros("" if value is None else value, 4),
+    "float": _to_float,
+    "int": _to_int,
+    "date": timestamp_to_date,
+    "list": _to_list,
+}
+
+
+# Especificaciones por modelo
+COT_SPEC = [
+    FieldSpec("id", "id", "object_id"),
+    FieldSpec("area", "area", "area"),
+    FieldSpec("num", "number", "number", "pad4"),
+    FieldSpec("year", "year", "year", "pad2"),
+    FieldSpec("client", "razonsocial", "razonsocial"),
+    FieldSpec("client_id", "client", "client", "str_only", "str"),
+    FieldSpec("consultora", None, "consultora"),
+    FieldSpec("issuedate", "issuedate", "issuedate"),
+    FieldSpec("issuedate_timestamp", "issuedate_timestamp", "issuedate_timestamp", "float"),
+    FieldSpec("status", "estado", "estado"),
+    FieldSpec("aprueba", "aprueba", None),
+    FieldSpec("drive_file_id", "drive_file_id", "drive_file_id"),
+    FieldSpec("drive_file_id_name", "drive_file_id_name", "drive_file_id_name"),
+    FieldSpec("drive_aprobacion_id", "drive_aprobacion_id", "drive_aprobacion_id"),
+    FieldSpec("drive_aceptacion_id", "drive_aceptacion_id", "drive_aceptacion_id"),
+    FieldSpec("enviada_fecha", "enviada_fecha", "enviada_fecha", "str", "date"),
+    FieldSpec("facturada_fecha", "facturada_fecha", "facturada_fecha", "str", "date"),
+    FieldSpec("facturar", "facturar", "facturar"),
+    FieldSpec("nombre", "nombre", "nombre"),
+    FieldSpec("email", "mail", "email"),
+    FieldSpec("ot", "op", "ot"),
+    FieldSpec("rev", "rev", "rev"),
+    FieldSpec("resolucion", "resolucion", "resolucion"),
+    FieldSpec("cuenta", "cuenta", "cuenta"),
+]
+
+CERTS_SPEC = [
+    FieldSpec("id", "id", "object_id"),
+    FieldSpec("num", "number", "num", "pad4", "str"),
+    FieldSpec("year", "year", None, "pad2"),
+    FieldSpec("rev", "revisionnumber", None, "pad2"),
+    FieldSpec("assigmentdate", "assigmentdate", None),
+    FieldSpec("issuedate", "issuedate", "issuedate", "str", "date"),
+    FieldSpec("vencimiento", "vencimiento", None),
+    FieldSpec("area", "area", "area"),
+    FieldSpec("client", "client", "client"),
+    FieldSpec("client_id", "client_id", None),
+    FieldSpec("status", "status", "status"),
+    FieldSpec("family_id", "family", None),
+    FieldSpec("ensayos", "ensayos", None, "list"),
+    FieldSpec("drive_file_id", "drive_file_id", None),
+    FieldSpec("drive_file_id_signed", "drive_file_id_signed", None),
+]
+
+FAM_SPEC = [
+    FieldSpec("id", "id", "object_id"),
+    FieldSpec("area", "area", "area"),
+    FieldSpec("family", "family", "family"),
+    FieldSpec("product", "product", None),
+    FieldSpec("origen", "origen", None),
+    FieldSpec("expirationdate", "expirationdate", "expirationdate", "str", "date"),
+    FieldSpec("vigencia", "vigencia", None),
+    FieldSpec("client", "razonsocial", "razonsocial"),
+    FieldSpec("client_id", "client", None, "str_only"),
+    FieldSpec("system", "system", None),
+    FieldSpec("status", "status", None),
+    FieldSpec("rubro", "rubro", None),
+    FieldSpec("subrubro", "subrubro", None),
+]
+
+CLIENT_SPEC = [
+    FieldSpec("id", "id", "id"),
+    FieldSpec("razonsocial", "razonsocial", "razonsocial"),
+    FieldSpec("cuit", "cuit", "cuit"),
+    FieldSpec("direccion", "direccion", "direccion"),
+    FieldSpec("phone", "phone", "phone"),
+    FieldSpec("email_cotizacion", "email_cotizacion", "email_cotizacion"),
+    FieldSpec("active_fams", "active_fams", "active_fams", "int"),
+    FieldSpec("condiciones", "condiciones", "condiciones"),
+    FieldSpec("consultora", "consultora", "consultora"),
+]
+
+
+def compile_mapper(model, spec: list, source: str, factories: Dict[str, Callable] = None) -> Callable[[dict], object]:
+    """
+    Genera una función doc -> modelo para `source` ("firestore" o "algolia").
+
+    El cuerpo se arma como código Python (una expresión por campo) y se compila
+    una vez; los campos sin clave en esa fuente quedan con el default del modelo.
+    `factories` asigna valores fijos por atributo (se llama a la función en cada fila).
+    """
+    namespace = {"_construct": model.construct}
+    args = []
+    for attr, factory in (factories or {}).items():
+        namespace[f"_f_{attr}"] = factory
+        args.append(f"{attr}=_f_{attr}()")
+    for i, field in enumerate(spec):
+        key = getattr(field, source)
+        if key is None:
+            continue
+        kind = field.algolia_kind if source == "algolia" and field.algolia_kind else field.kind
+        namespace[f"_c{i}"] = CONVERTERS[kind]
+        args.append(f"{field.attr}=_c{i}(get({key!r}))")
+
+    name = f"{source}_to_{model.__name__.lower()}"
+    code = f"def {name}(doc):\n    get = doc.get\n    return _construct({', '.join(args)})\n"
+    exec(compile(code, f"<model_mapping {name}>", "exec"), namespace)
+    mapper = namespace[name]
+    mapper.__doc__ = f"Convierte un documento de {source} en {model.__name__} (generado desde la especificación)."
+    return mapper
+
+
+def algolia_record(model, spec: list) -> dict:
+    """
+    Registro de Algolia de `model` con las claves que leen los conversores algolia_to_*.
+    El id del documento se guarda como objectID.
+    """
+    record = {}
+    for field in spec:
+        if field.algolia is None:
+            continue
+        record["objectID" if field.algolia == "object_id" else field.algolia] = getattr(model, field.attr)
+    return record
+
+
+# Conversores compilados
+firestore_to_cot = compile_mapper(Cot, COT_SPEC, "firestore")
+firestore_to_certs = compile_mapper(Certs, CERTS_SPEC, "firestore")
+firestore_to_fam = compile_mapper(Fam, FAM_SPEC, "firestore", factories={"models": lambda: [Model()]})
+firestore_to_client = compile_mapper(Client, CLIENT_SPEC, "firestore")
+
+algolia_to_cot = compile_mapper(Cot, COT_SPEC, "algolia")
+algolia_to_certs = compile_mapper(Certs, CERTS_SPEC, "algolia")
+algolia_to_fam = compile_mapper(Fam, FAM_SPEC, "algolia")
+algolia_to_client = compile_mapper(Client, CLIENT_SPEC, "algolia")
@@ -0,0 +1,178 @@
+"""
+Índice invertido en memoria para la búsqueda local (fallback cuando Algolia no está disponible).
+
+Conserva la semántica de la búsqueda anterior (la consulta, en minúsculas, es
+subcadena de alguno de los campos) pero sin recorrer todos los objetos:
+  - cada fila se indexa por los trigramas de sus campos;
+  - una consulta de 3 o más caracteres interseca las listas de sus trigramas
+    (empezando por la más corta) y solo verifica la subcadena en los candidatos;
+  - las consultas de 1-2 caracteres se resuelven sobre el texto ya normalizado.
+
+Hay un índice por (colección, área), compartido entre sesiones, que se completa a
+medida que se cargan filas desde Firestore.
+"""
+import os
+import time
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Union
+from ..utils import COTS_SEARCH_FIELDS, FAMS_SEARCH_FIELDS, CERTS_SEARCH_FIELDS
+
+# Campos buscables por colección (los mismos que usa la búsqueda por recorrido en utils)
+SEARCH_FIELDS = {
+    "cotizaciones": COTS_SEARCH_FIELDS,
+    "certificados": CERTS_SEARCH_FIELDS,
+    "familias": FAMS_SEARCH_FIELDS,
+}
+
+# Separador entre campos: ningún trigrama que lo contenga puede coincidir con una consulta
+_FIELD_SEP = "\x00"
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, fields: List[str], key: Callable[[object], str] = lambda row: row.id):
+        self.fields = fields
+        self.key = key
+        self.complete_at = 0.0              # monotonic del último cargado completo (0 = parcial)
+        self._rows: Dict[int, object] = {}  # nro interno -> fila
+        self._texts: Dict[int, str] = {}    # nro interno -> campos en minúsculas unidos por _FIELD_SEP
+        self._ids: Dict[str, int] = {}      # clave de la fila -> nro interno
+        self._postings: Dict[str, set] = {}
+        self._next = 0
+        self._lock = Lock()
+
+    def _text(self, row) -> str:
+        return _FIELD_SEP.join(str(getattr(row, field, "")).lower() for field in self.fields)
+
+    def add_many(self, rows: Iterable[object]):
+        """Agrega o actualiza filas (por clave); solo se recalculan los trigramas de las que cambiaron."""
+        with self._lock:
+            for row in rows:
+                row_key = self.key(row)
+                if not row_key:
+                    continue
+                text = self._text(row)
+                doc = self._ids.get(row_key)
+                if doc is None:
+                    doc = self._next
+                    self._next += 1
+                    self._ids[row_key] = doc
+                elif self._texts[doc] == text:
+                    self._rows[doc] = row
+                    continue
+                else:
+                    self._unpost(doc)
+
+                self._rows[doc] = row
+                self._texts[doc] = text
+                for gram in _trigrams(text):
+                    self._postings.setdefault(gram, set()).add(doc)
+
+    def add(self, row):
+        self.add_many([row])
+
+    def remove(self, row_key: str):
+        with self._lock:
+            doc = self._ids.pop(row_key, None)
+            if doc is not None:
+                self._unpost(doc)
+                self._rows.pop(doc, None)
+                self._texts.pop(doc, None)
+
+    def _unpost(self, doc: int):
+        for gram in _trigrams(self._texts.get(doc, "")):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(doc)
+                if not posting:
+                    del self._postings[gram]
+
+    def replace_all(self, rows: Iterable[object]):
+        """
+        Reemplaza el contenido con una carga completa de la colección/área.
+
+        El índice nuevo se arma fuera del lock y se intercambia de una vez: una
+        búsqueda concurrente ve el contenido anterior o el nuevo, nunca uno a medias.
+        """
+        new_rows: Dict[int, object] = {}
+        new_texts: Dict[int, str] = {}
+        new_ids: Dict[str, int] = {}
+        for row in rows:
+            row_key = self.key(row)
+            if not row_key:
+                continue
+            doc = new_ids.setdefault(row_key, len(new_ids))
+            new_rows[doc] = row
+            new_texts[doc] = self._text(row)
+
+        new_postings: Dict[str, set] = {}
+        for doc, text in new_texts.items():
+            for gram in _trigrams(text):
+                new_postings.setdefault(gram, set()).add(doc)
+
+        with self._lock:
+            self._rows = new_rows
+            self._texts = new_texts
+            self._ids = new_ids
+            self._postings = new_postings
+            self._next = len(new_ids)
+            self.complete_at = time.monotonic()
+
+    def is_complete(self, max_age: float) -> bool:
+        """True si hubo una carga completa hace menos de `max_age` segundos."""
+        return self.complete_at > 0 and time.monotonic() - self.complete_at < max_age
+
+    def search(self, query: str) -> list:
+        """Filas donde `query` (sin distinguir mayúsculas) es subcadena de algún campo, en orden de carga."""
+        query = query.lower()
+        if _FIELD_SEP in query:
+            return []
+        with self._lock:
+            if len(query) < 3:
+                docs = [doc for doc, text in self._texts.items() if query in text]
+            else:
+                postings = []
+                for gram in _trigrams(query):
+                    posting = self._postings.get(gram)
+                    if not posting:
+                        return []
+                    postings.append(posting)
+                postings.sort(key=len)
+                candidates = set(postings[0])
+                for posting in postings[1:]:
+                    candidates &= posting
+                    if not candidates:
+                        return []
+                docs = [doc for doc in candidates if query in self._texts[doc]]
+            return [self._rows[doc] for doc in sorted(docs)]
+
+    def filter(self, rows: Iterable[object], query: str) -> list:
+        """Filtra `rows` (conservando su orden) a las que coinciden con `query` según el índice."""
+        rows = list(rows)
+        self.add_many(rows)
+        matches = {self.key(row) for row in self.search(query)}
+        return [row for row in rows if self.key(row) in matches]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+
+_indexes: Dict[tuple, SearchIndex] = {}
+_indexes_lock = Lock()
+
+# Segundos que una carga completa se considera vigente para buscar sin volver a Firestore
+SEARCH_INDEX_MAX_AGE = float(os.getenv("SEARCH_INDEX_MAX_AGE", "300"))
+
+
+def get_search_index(collection: str, area: Union[str, None]) -> SearchIndex:
+    """Índice compartido de (colección, área), creado vacío la primera vez."""
+    with _indexes_lock:
+        index = _indexes.get((collection, area))
+        if index is None:
+            index = SearchIndex(SEARCH_FIELDS[collection])
+            _indexes[(collection, area)] = index
+        return index
@@ -7,6 +7,7 @@ from .styles.style import *
 from .components.react_oauth_google import GoogleOAuthProvider, GoogleLogin
 from .views.authenticated import certificados_view, familias_view, cotizaciones_view, cotizacion_detalle_view, nueva_cotizacion_view
 from .backend.app_state import AppState
+from .api.algolia_sync import algolia_sync_lifespan
 
 from .components.components import table_certificados, table_familias
 
@@ -137,6 +138,8 @@ app = rx.App(
         scaling="100%",
     ),
 )
+# Mantener los índices de Algolia al día con los cambios de Firestore (solo con ALGOLIA_SYNC_ENABLED=true)
+app.register_lifespan_task(algolia_sync_lifespan)
 app.add_page(index, route="/")
 app.add_page(login_view, route="/login")
 app.add_page(certificados, route="/certificados", on_load=AppState.on_mount_certificados)
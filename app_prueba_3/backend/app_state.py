@@ -4,10 +4,14 @@ from google.auth.transport import requests
 import os, json
 from dotenv import load_dotenv
 from ..api.firestore_api import firestore_api
-from ..api.algolia_api import algolia_api
+from ..api.firestore_api_async import firestore_api_async
+from ..api.algolia_api import algolia_api, typeahead_label
 from ..api import cotizacion_extractor
+from ..api.extraction_worker import extraction_pool
 from ..api.algolia_utils import algolia_to_cot, algolia_to_certs, algolia_to_fam
-from ..utils import User, Fam, Certs, Cot, Client, buscar_fams, buscar_cots
+from ..utils import User, Fam, Certs, Cot, Client
+from ..api.search_index import get_search_index, SEARCH_INDEX_MAX_AGE
+from ..api.company_names import normalize_company_name
 from datetime import datetime
 import time
 import asyncio
@@ -20,6 +24,16 @@ CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 # Cola para almacenar los cambios detectados en Firestore
 firestore_queue = asyncio.Queue()
 
+# Espera desde la última tecla antes de buscar mientras se escribe
+SEARCH_DEBOUNCE_SECONDS = float(os.getenv("SEARCH_DEBOUNCE_MS", "300")) / 1000
+# Segundos sin actividad del cliente tras los que watch_live_cots termina (la pestaña pudo cerrarse);
+# la próxima actividad en la página (scroll, on_mount) la vuelve a iniciar
+LIVE_COTS_IDLE_SECONDS = float(os.getenv("LIVE_COTS_IDLE_SECONDS", "600"))
+# Búsqueda mientras se escribe pendiente de cada sesión: client_token -> Task
+_search_tasks: dict = {}
+# Extracción de PDF en curso de cada sesión: client_token -> Task
+_extraction_tasks: dict = {}
+
 
 class AppState(rx.State):
     def add_empresa_temporal(self):
@@ -40,71 +54,246 @@ class AppState(rx.State):
     cotizacion_detalle_pdf_error: str = ""
     cotizacion_detalle_pdf_familias: str = ""
     cotizacion_detalle_pdf_familias_validacion: str = ""
-    @rx.event
+    @rx.event(background=True)
     async def extraer_pdf_cotizacion_detalle(self):
-        """Extrae los datos del PDF de la cotización seleccionada y los guarda en el estado como string."""
-        from app_prueba_3.api.cotizacion_extractor import get_cotizacion_full_data_from_drive
+        """
+        Extrae los datos del PDF de la cotización seleccionada y los guarda en el estado como string.
+
+        La descarga y el procesamiento del PDF corren en el pool de procesos de extracción,
+        fuera del lock del estado: no bloquean a otras sesiones y se cancelan si el usuario
+        sale de la página (limpiar_cotizacion_detalle_cache). Las consultas a Firestore y
+        Algolia y el guardado también corren fuera del lock; este se toma solo para leer la
+        cotización seleccionada y para asignar los resultados si sigue siendo la misma.
+        """
         import json, re
-        
-        # Marcar como procesando - NO mostrar datos hasta completar
-        self.cotizacion_detalle_processing = True
-        
-        # Limpiar datos previos
-        self.cotizacion_detalle_pdf_metadata = ""
-        self.cotizacion_detalle_pdf_tablas = ""
-        self.cotizacion_detalle_pdf_condiciones = ""
-        self.cotizacion_detalle_pdf_error = ""
-        self.cotizacion_detalle_pdf_familias = ""
-        self.cotizacion_detalle_pdf_familias_validacion = ""
-        
+
+        task = asyncio.current_task()
+        async with self:
+            # Marcar como procesando - NO mostrar datos hasta completar
+            self.cotizacion_detalle_processing = True
+
+            # Limpiar datos previos
+            self.cotizacion_detalle_pdf_metadata = ""
+            self.cotizacion_detalle_pdf_tablas = ""
+            self.cotizacion_detalle_pdf_condiciones = ""
+            self.cotizacion_detalle_pdf_error = ""
+            self.cotizacion_detalle_pdf_familias = ""
+            self.cotizacion_detalle_pdf_familias_validacion = ""
+
+            cot_id = self.cotizacion_detalle.id
+            force = self.force_pdf_reprocess
+            # Resetear el flag después de usarlo
+            self.force_pdf_reprocess = False
+            file_id = self.cotizacion_detalle.drive_file_id
+            token = self.router.session.client_token
+            area_filter = self.user_data.current_area if self.user_data.current_area else ""
+            trabajos_data = list(self.cotizacion_detalle_trabajos or [])
+            productos_data = list(self.cotizacion_detalle_productos or [])
+
         # 1. VERIFICAR SI YA EXISTEN DATOS PROCESADOS EN FIRESTORE (solo si no es reprocesamiento forzado)
-        if self.cotizacion_detalle.id and not self.force_pdf_reprocess:
+        if cot_id and not force:
             try:
-                print(f"🔍 Verificando si existen datos procesados para cotización {self.cotizacion_detalle.id}...")
-                existing_data = firestore_api.get_cotizacion_detalle(self.cotizacion_detalle.id)
-                
+                print(f"🔍 Verificando si existen datos procesados para cotización {cot_id}...")
+                existing_data = await firestore_api_async.get_cotizacion_detalle(cot_id)
+
                 if existing_data and isinstance(existing_data, dict):
                     print(f"✅ Datos ya procesados encontrados en Firestore. Cargando desde base de datos...")
-                    
-                    # Cargar datos desde Firestore en lugar de procesar PDF
-                    await self._load_from_firestore_detalle(existing_data)
-                    
-                    # Marcar procesamiento como completo
-                    self.cotizacion_detalle_processing = False
+
+                    async with self:
+                        # Si mientras tanto se abrió otra cotización, sus datos los carga su propia extracción
+                        if self.cotizacion_detalle.id == cot_id:
+                            # Cargar datos desde Firestore en lugar de procesar PDF
+                            await self._load_from_firestore_detalle(existing_data)
+
+                            # Marcar procesamiento como completo
+                            self.cotizacion_detalle_processing = False
                     print("✅ Datos cargados desde Firestore sin procesar PDF")
                     return
                 else:
                     print(f"🔄 No existen datos procesados. Procediendo a procesar PDF...")
-                    
+
             except Exception as e_check:
                 print(f"⚠️  Error verificando datos existentes: {e_check}")
                 print(f"🔄 Continuando con procesamiento de PDF...")
-        elif self.force_pdf_reprocess:
+        elif force:
             print("🔥 REPROCESAMIENTO FORZADO: Saltando verificación de cache y reprocesando PDF...")
-            # Resetear el flag después de usarlo
-            self.force_pdf_reprocess = False
-        
-        file_id = self.cotizacion_detalle.drive_file_id
-        if file_id:
+
+        if not file_id:
+            return
+
+        previous = _extraction_tasks.get(token)
+        if previous is not None and previous is not task and not previous.done():
+            previous.cancel()
+        _extraction_tasks[token] = task
+        try:
+            # En un proceso del pool; el cache en disco evita repetir la descarga y el análisis de un PDF que no cambió
+            data = await extraction_pool.extract(file_id)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            async with self:
+                if self.cotizacion_detalle.drive_file_id == file_id:
+                    self.cotizacion_detalle_pdf_error = str(e)
+                    self.cotizacion_detalle_processing = False
+                    self.is_loading_cotizacion_detalle = False
+            return
+        finally:
+            if _extraction_tasks.get(token) is task:
+                del _extraction_tasks[token]
+
+        meta = data.get("metadata", {}) or {}
+        client_name = (meta.get("empresa") or "").strip()
+        familias_pdf = data.get("familias", []) or []
+
+        # 2. BUSCAR CLIENTE CON BÚSQUEDA INTELIGENTE
+        client_found = None
+        try:
+            if client_name:
+                print(f"🔍 DEBUG: Iniciando búsqueda inteligente de cliente: '{client_name}'")
+                client_found = await self._search_client_intelligent(client_name)
+        except Exception as e_client:
+            print(f"⚠️  Error al buscar cliente: {e_client}")
+            traceback.print_exc()
+
+        if client_found:
+            detalle_client = client_found
+            client_data = {
+                "id": client_found.id,
+                "razonsocial": client_found.razonsocial,
+                "consultora": getattr(client_found, 'consultora', ''),
+                "email_cotizacion": getattr(client_found, 'email_cotizacion', ''),
+                "area": getattr(client_found, 'area', '')
+            }
+        else:
+            # Si no se encuentra, crear cliente temporal con datos de la cotización
+            print(f"⚠️  DEBUG: Cliente no encontrado, creando temporal para '{client_name}'")
+            detalle_client = Client(
+                id="",  # Sin ID porque no está en Firestore
+                razonsocial=client_name,
+                consultora=meta.get("consultora", ""),
+                email_cotizacion=meta.get("mail_receptor", ""),
+            )
+            client_data = {
+                "id": "",
+                "razonsocial": detalle_client.razonsocial,
+                "consultora": detalle_client.consultora,
+                "email_cotizacion": detalle_client.email_cotizacion,
+                "area": ""
+            }
+
+        # 3. BUSCAR Y MAPEAR FAMILIAS
+        print(f"🔍 DEBUG: Familias extraídas del PDF: {len(familias_pdf)} encontradas")
+        print(f"🔍 DEBUG: Primeras 3 familias: {familias_pdf[:3] if familias_pdf else 'Ninguna'}")
+        familys_codigos = [(itm.get("code") or "").strip().upper() for itm in familias_pdf]
+        familys_productos = [(itm.get("description") or "").strip() for itm in familias_pdf]
+
+        # Si se encontró cliente, obtener sus familias para mapear
+        fams_cliente = []
+        if client_found:
+            try:
+                fams_cliente = await firestore_api_async.get_fams(
+                    area=area_filter or None,
+                    order_by="razonsocial",
+                    limit=500,
+                    filter=[("client_id", "==", client_found.id)]
+                )
+                print(f"🔍 DEBUG: Familias del cliente encontradas: {len(fams_cliente)}")
+            except Exception as e_fam:
+                print(f"⚠️  Error al obtener familias del cliente: {e_fam}")
+
+        # Mapear familias del PDF con familias del cliente
+        matched_fams, matched_ids = [], []
+        try:
+            if fams_cliente:
+                # Indexar familias por código y producto
+                fams_by_code = {}
+                fams_by_product = []
+
+                for fam in fams_cliente:
+                    code_norm = (fam.family or "").strip().upper()
+                    if code_norm:
+                        fams_by_code[code_norm] = fam
+                    if fam.product:
+                        fams_by_product.append(fam)
+
+                print(f"🔍 DEBUG: Familias indexadas por código: {list(fams_by_code.keys())}")
+                print(f"🔍 DEBUG: Familias con productos: {len(fams_by_product)}")
+
+                # Procesar cada familia del PDF
+                for item in familias_pdf:
+                    code = (item.get("code") or "").strip().upper()
+                    desc = (item.get("description") or "").strip().lower()
+                    fam_match = None
+
+                    print(f"🔍 DEBUG: Procesando item - Código: '{code}', Descripción: '{desc}'")
+
+                    # Buscar por código exacto
+                    if code and code in fams_by_code:
+                        fam_match = fams_by_code[code]
+                        print(f"✅ DEBUG: Match por código: {code}")
+                    else:
+                        # Buscar por descripción/producto
+                        for fam in fams_by_product:
+                            prod = (fam.product or "").strip().lower()
+                            if not prod:
+                                continue
+                            if desc and (desc in prod or prod in desc):
+                                fam_match = fam
+                                print(f"✅ DEBUG: Match por descripción: '{desc}' <-> '{prod}'")
+                                break
+
+                    if fam_match and fam_match.id not in matched_ids:
+                        matched_fams.append(fam_match)
+                        matched_ids.append(fam_match.id)
+                        print(f"✅ DEBUG: Familia agregada: {fam_match.family} - {fam_match.product}")
+
+            # Si no se encontraron familias mapeadas, crear familias temporales del PDF
+            if not matched_fams and familias_pdf:
+                print(f"⚠️  DEBUG: No hay familias del cliente, creando familias temporales del PDF")
+                for item in familias_pdf:
+                    temp_fam = Fam(
+                        id="",  # Sin ID porque no está en Firestore
+                        family=(item.get("code") or "").strip(),
+                        product=(item.get("description") or "").strip(),
+                        client=client_name,
+                        client_id=client_found.id if client_found else "",
+                        area=area_filter,
+                        status="TEMPORAL"  # Marcar como temporal
+                    )
+                    matched_fams.append(temp_fam)
+                    print(f"✅ DEBUG: Familia temporal creada: {temp_fam.family} - {temp_fam.product}")
+            print(f"🔍 DEBUG: RESULTADO FINAL - Familias mapeadas: {len(matched_fams)}")
+
+        except Exception as e_map:
+            print(f"⚠️  No se pudo mapear familias: {e_map}")
+            traceback.print_exc()
+
+        # 4. GUARDAR DATOS PROCESADOS EN FIRESTORE (corresponden a cot_id aunque se haya abierto otra cotización)
+        await self._save_cotizacion_detalle_to_firestore(
+            cot_id, data, client_data, matched_fams, trabajos_data, productos_data
+        )
+
+        async with self:
+            # Si mientras tanto se abrió otra cotización, el resultado ya no corresponde
+            if self.cotizacion_detalle.drive_file_id != file_id:
+                print(f"⏭️  Extracción de {file_id} descartada (la cotización detalle cambió)")
+                return
             try:
-                data = get_cotizacion_full_data_from_drive(file_id)
-                self.cotizacion_detalle_pdf_metadata = json.dumps(data.get("metadata", {}), ensure_ascii=False, indent=2)
+                self.cotizacion_detalle_pdf_metadata = json.dumps(meta, ensure_ascii=False, indent=2)
                 self.cotizacion_detalle_pdf_tablas = json.dumps(data.get("tablas", []), ensure_ascii=False, indent=2)
                 self.cotizacion_detalle_pdf_condiciones = str(data.get("condiciones", ""))
-                self.cotizacion_detalle_pdf_familias = json.dumps(data.get("familias", []), ensure_ascii=False, indent=2)
+                self.cotizacion_detalle_pdf_familias = json.dumps(familias_pdf, ensure_ascii=False, indent=2)
                 self.cotizacion_detalle_pdf_familias_validacion = json.dumps(data.get("familias_validacion", {}), ensure_ascii=False, indent=2)
-                
+
                 # Mapear metadata y familias al objeto Cot en memoria
-                meta = data.get("metadata", {}) or {}
                 numero_cot = str(meta.get("numero_cotizacion", ""))
                 digits = re.findall(r"\d+", numero_cot)
                 if digits:
                     joined = "".join(digits)
                     self.cotizacion_detalle.num = (joined[:4] if len(joined) >= 4 else joined).zfill(4)
                     self.cotizacion_detalle.year = joined[-2:] if len(joined) >= 2 else self.cotizacion_detalle.year
-                
+
                 # client y otros campos directos
-                client_name = (meta.get("empresa") or "").strip()
                 if client_name:
                     self.cotizacion_detalle.client = client_name
                 if meta.get("fecha"):
@@ -118,150 +307,20 @@ class AppState(rx.State):
                 if meta.get("revision"):
                     self.cotizacion_detalle.rev = str(meta.get("revision")).strip()
 
-                # 1. BUSCAR CLIENTE CON BÚSQUEDA INTELIGENTE
-                try:
-                    client_found = None
-                    
-                    if client_name:
-                        print(f"🔍 DEBUG: Iniciando búsqueda inteligente de cliente: '{client_name}'")
-                        client_found = await self._search_client_intelligent(client_name)
-                    
-                    # Si se encuentra cliente, usar sus datos
-                    if client_found:
-                        self.cotizacion_detalle_client = client_found
-                        self.cotizacion_detalle.client_id = client_found.id
-                        # Actualizar datos de cotización con datos del cliente
-                        self.cotizacion_detalle.client = client_found.razonsocial
-                        if client_found.consultora and not self.cotizacion_detalle.consultora:
-                            self.cotizacion_detalle.consultora = client_found.consultora
-                        print(f"✅ DEBUG: Cliente configurado: {client_found.razonsocial} (ID: {client_found.id})")
-                    else:
-                        # Si no se encuentra, crear cliente temporal con datos de la cotización
-                        print(f"⚠️  DEBUG: Cliente no encontrado, creando temporal para '{client_name}'")
-                        self.cotizacion_detalle_client = Client(
-                            id="",  # Sin ID porque no está en Firestore
-                            razonsocial=client_name,
-                            consultora=meta.get("consultora", ""),
-                            email_cotizacion=meta.get("mail_receptor", ""),
-                        )
-                        print(f"✅ DEBUG: Cliente temporal creado: {client_name}")
-                
-                except Exception as e_client:
-                    print(f"⚠️  Error al buscar cliente: {e_client}")
-                    import traceback
-                    traceback.print_exc()
-
-                # 2. BUSCAR Y MAPEAR FAMILIAS
-                try:
-                    familias_pdf = data.get("familias", []) or []
-                    print(f"🔍 DEBUG: Familias extraídas del PDF: {len(familias_pdf)} encontradas")
-                    print(f"🔍 DEBUG: Primeras 3 familias: {familias_pdf[:3] if familias_pdf else 'Ninguna'}")
-                    
-                    # Guardar códigos/productos extraídos
-                    self.cotizacion_detalle.familys_codigos = [
-                        (itm.get("code") or "").strip().upper() for itm in familias_pdf
-                    ]
-                    self.cotizacion_detalle.familys_productos = [
-                        (itm.get("description") or "").strip() for itm in familias_pdf
-                    ]
-                    
-                    print(f"🔍 DEBUG: Códigos extraídos: {self.cotizacion_detalle.familys_codigos}")
-                    print(f"🔍 DEBUG: Productos extraídos: {self.cotizacion_detalle.familys_productos}")
-
-                    # Si se encontró cliente, obtener sus familias para mapear
-                    fams_cliente = []
-                    if client_found:
-                        try:
-                            area_filter = self.user_data.current_area if self.user_data.current_area else None
-                            fams_cliente = firestore_api.get_fams(
-                                area=area_filter,
-                                order_by="razonsocial",
-                                limit=500,
-                                filter=[("client_id", "==", client_found.id)]
-                            )
-                            print(f"🔍 DEBUG: Familias del cliente encontradas: {len(fams_cliente)}")
-                        except Exception as e_fam:
-                            print(f"⚠️  Error al obtener familias del cliente: {e_fam}")
-                    
-                    # Mapear familias del PDF con familias del cliente
-                    matched_fams, matched_ids = [], []
-                    
-                    if fams_cliente:
-                        # Indexar familias por código y producto
-                        fams_by_code = {}
-                        fams_by_product = []
-                        
-                        for fam in fams_cliente:
-                            code_norm = (fam.family or "").strip().upper()
-                            if code_norm:
-                                fams_by_code[code_norm] = fam
-                            if fam.product:
-                                fams_by_product.append(fam)
-                        
-                        print(f"🔍 DEBUG: Familias indexadas por código: {list(fams_by_code.keys())}")
-                        print(f"🔍 DEBUG: Familias con productos: {len(fams_by_product)}")
-
-                        # Procesar cada familia del PDF
-                        for item in familias_pdf:
-                            code = (item.get("code") or "").strip().upper()
-                            desc = (item.get("description") or "").strip().lower()
-                            fam_match = None
-                            
-                            print(f"🔍 DEBUG: Procesando item - Código: '{code}', Descripción: '{desc}'")
-                            
-                            # Buscar por código exacto
-                            if code and code in fams_by_code:
-                                fam_match = fams_by_code[code]
-                                print(f"✅ DEBUG: Match por código: {code}")
-                            else:
-                                # Buscar por descripción/producto
-                                for fam in fams_by_product:
-                                    prod = (fam.product or "").strip().lower()
-                                    if not prod:
-                                        continue
-                                    if desc and (desc in prod or prod in desc):
-                                        fam_match = fam
-                                        print(f"✅ DEBUG: Match por descripción: '{desc}' <-> '{prod}'")
-                                        break
-                            
-                            if fam_match and fam_match.id not in matched_ids:
-                                matched_fams.append(fam_match)
-                                matched_ids.append(fam_match.id)
-                                print(f"✅ DEBUG: Familia agregada: {fam_match.family} - {fam_match.product}")
-
-                    # Si no se encontraron familias mapeadas, crear familias temporales del PDF
-                    if not matched_fams and familias_pdf:
-                        print(f"⚠️  DEBUG: No hay familias del cliente, creando familias temporales del PDF")
-                        area_filter = self.user_data.current_area if self.user_data.current_area else ""
-                        for item in familias_pdf:
-                            temp_fam = Fam(
-                                id="",  # Sin ID porque no está en Firestore
-                                family=(item.get("code") or "").strip(),
-                                product=(item.get("description") or "").strip(),
-                                client=client_name,
-                                client_id=client_found.id if client_found else "",
-                                area=area_filter or "",
-                                status="TEMPORAL"  # Marcar como temporal
-                            )
-                            matched_fams.append(temp_fam)
-                            print(f"✅ DEBUG: Familia temporal creada: {temp_fam.family} - {temp_fam.product}")
-
-                    self.cotizacion_detalle.familys = matched_fams
-                    self.cotizacion_detalle.familys_ids = matched_ids
-                    print(f"🔍 DEBUG: RESULTADO FINAL - Familias mapeadas: {len(matched_fams)}")
-                    
-                except Exception as e_map:
-                    print(f"⚠️  No se pudo mapear familias: {e_map}")
-                    import traceback
-                    print(f"🔍 DEBUG: Traceback completo:")
-                    traceback.print_exc()
-                    
-                # 4. GUARDAR DATOS PROCESADOS EN FIRESTORE
-                try:
-                    await self._save_cotizacion_detalle_to_firestore(data, client_found)
-                except Exception as e_save:
-                    print(f"⚠️  Error al guardar datos en Firestore: {e_save}")
-                    
+                self.cotizacion_detalle_client = detalle_client
+                if client_found:
+                    self.cotizacion_detalle.client_id = client_found.id
+                    # Actualizar datos de cotización con datos del cliente
+                    self.cotizacion_detalle.client = client_found.razonsocial
+                    if client_found.consultora and not self.cotizacion_detalle.consultora:
+                        self.cotizacion_detalle.consultora = client_found.consultora
+                    print(f"✅ DEBUG: Cliente configurado: {client_found.razonsocial} (ID: {client_found.id})")
+
+                self.cotizacion_detalle.familys_codigos = familys_codigos
+                self.cotizacion_detalle.familys_productos = familys_productos
+                self.cotizacion_detalle.familys = matched_fams
+                self.cotizacion_detalle.familys_ids = matched_ids
+
             except Exception as e:
                 self.cotizacion_detalle_pdf_error = str(e)
             finally:
@@ -295,6 +354,12 @@ class AppState(rx.State):
         """Limpia el caché de la cotización detalle cuando se sale de la página."""
         print("🧹 Limpiando cache de cotización detalle...")
         
+        # Cancelar la extracción de PDF en curso de esta sesión (termina su proceso)
+        task = _extraction_tasks.pop(self.router.session.client_token, None)
+        if task is not None and not task.done():
+            task.cancel()
+            self.cotizacion_detalle_processing = False
+        
         # Limpiar campos de estado
         self.cotizacion_detalle_pdf_metadata = ""
         self.cotizacion_detalle_pdf_tablas = ""
@@ -360,6 +425,12 @@ class AppState(rx.State):
 
     cots: list[Cot] = []            # Lista para almacenar las cotizaciones
     cots_show: list[Cot] = []       # Lista para mostrar las cotizaciones
+    _cots_by_id: dict[str, Cot] = {}  # Índice id -> Cot de las filas cargadas en la lista (solo backend)
+    _live_cots_generation: int = 0  # Identifica la tarea watch_live_cots vigente
+    _live_cots_version: int = 0     # Versión del índice en vivo aplicada a self.cots
+    _live_cots_size: int = 0        # Cantidad de filas de self.cots que provienen del índice en vivo
+    _live_cots_watching: bool = False  # True mientras corre la tarea watch_live_cots
+    _live_cots_seen: float = 0.0    # Última actividad del cliente en la página (time.time())
     
     # Cotización de detalle para la vista individual
     cotizacion_detalle: Cot = Cot()
@@ -384,8 +455,10 @@ class AppState(rx.State):
     cotizacion_detalle_trabajos: list = []
     cotizacion_detalle_productos: list = []
 
-    # Campo de texto de búsqueda temporal (no ejecuta búsqueda automáticamente)
+    # Campo de texto de búsqueda (la búsqueda se ejecuta con debounce mientras se escribe)
     search_text: str = ""
+    search_suggestions: list[str] = []  # Sugerencias (perfil typeahead de Algolia) para el texto escrito
+    _search_generation: int = 0  # Se incrementa con cada búsqueda pedida; solo aplica la última
     
     # --- Campos temporales para crear nueva cotización (UI form) ---
     new_cot_num: str = ""
@@ -548,6 +621,8 @@ class AppState(rx.State):
             return
         
         try:
+            # El número del formulario es solo una vista previa: se reserva con
+            # allocate_cotizacion_number al escribir el documento, no antes
             # Here would go the actual creation logic
             # For now, just show success
             self.new_cot_status = "success"
@@ -561,13 +636,16 @@ class AppState(rx.State):
 
     async def reset_new_cot_form(self):
         """Reset the new cotization form."""
-        # Get proximo numero de cotizacion (función sincrónica)
+        year_str = str(datetime.now().year)[-2:]
+        # Próximo número de cotización: vista previa desde el contador del área (se reserva al enviar)
         try:
-            next_num = cotizacion_extractor.get_next_cotizacion_number(datetime.now().year, self.cots)
+            if self.user_data.current_area:
+                next_num = (await firestore_api_async.get_next_cotizacion_number(self.user_data.current_area, year_str))["number"]
+            else:
+                next_num = cotizacion_extractor.get_next_cotizacion_number(datetime.now().year, self.cots)
         except Exception:
             # Fallback en caso de error
             next_num = "0001"
-        year_str = str(datetime.now().year)[-2:]
 
 
         # Get trabajos from current user area (función sincrónica)
@@ -601,12 +679,16 @@ class AppState(rx.State):
     total_certs: int = 0
     total_fams: int = 0
     is_loading_more: bool = False
+    page_size: int = 30             # Documentos leídos por página al paginar en Firestore
+    cots_next_token: str = ""       # Token de la siguiente página de cotizaciones en Firestore
+    certs_next_token: str = ""      # Token de la siguiente página de certificados en Firestore
+    fams_next_token: str = ""       # Token de la siguiente página de familias en Firestore
     scroll_threshold: float = 0.8  # Disparar carga cuando llegue al 80% del scroll
 
     @rx.var
     def cots_page_info(self) -> str:
         """Información de paginación para cotizaciones."""
-        total_pages = (len(self.cots) + 29) // 30 if self.cots else 0  # 30 items per page
+        total_pages = (max(len(self.cots), self.total_cots) + 29) // 30  # 30 items per page
         current_page = self.cots_page + 1
         return f"Página {current_page} de {total_pages}"
     
@@ -617,9 +699,9 @@ class AppState(rx.State):
     
     @rx.var
     def cots_has_next_page(self) -> bool:
-        """Si hay página siguiente de cotizaciones."""
+        """Si hay página siguiente de cotizaciones (cargada o pendiente en Firestore)."""
         total_pages = (len(self.cots) + 29) // 30 if self.cots else 0
-        return (self.cots_page + 1) < total_pages
+        return (self.cots_page + 1) < total_pages or bool(self.cots_next_token)
 
     @rx.var
     def cots_current_page_display(self) -> int:
@@ -628,8 +710,8 @@ class AppState(rx.State):
 
     @rx.var
     def cots_total_pages(self) -> int:
-        """Total de páginas de cotizaciones."""
-        return (len(self.cots) + 29) // 30 if self.cots else 0
+        """Total de páginas de cotizaciones (según el conteo de Firestore si es mayor a lo cargado)."""
+        return (max(len(self.cots), self.total_cots) + 29) // 30
 
     values: dict = {
         "collection": "",
@@ -679,9 +761,13 @@ class AppState(rx.State):
     
     # Métodos de paginación para cotizaciones
     @rx.event
-    def next_cots_page(self):
+    async def next_cots_page(self):
         """Ir a la siguiente página de cotizaciones."""
         total_pages = (len(self.cots) + 29) // 30 if self.cots else 0
+        # Si ya se mostraron todas las cargadas, leer la siguiente página desde Firestore
+        if (self.cots_page + 1) >= total_pages and self.cots_next_token:
+            await self._fetch_next_cots_page()
+            total_pages = (len(self.cots) + 29) // 30 if self.cots else 0
         if (self.cots_page + 1) < total_pages:
             self.cots_page += 1
             start_idx = self.cots_page * 30
@@ -750,6 +836,7 @@ class AppState(rx.State):
                     yield AppState.get_fams()
                 elif page == "cotizaciones":
                     yield AppState.get_cots()
+                    yield AppState.watch_live_cots()
             finally:
                 self.is_loading_data = False
         else:
@@ -916,6 +1003,13 @@ class AppState(rx.State):
         self.fams_show = []
         self.cots = []
         self.cots_show = []
+        self._cots_by_id = {}
+        self.cots_next_token = ""
+        self.certs_next_token = ""
+        self.fams_next_token = ""
+        self.total_cots = 0
+        self.total_certs = 0
+        self.total_fams = 0
         
         # Resetear página actual para forzar recarga
         self.current_page = ""
@@ -1085,6 +1179,11 @@ class AppState(rx.State):
         import time
         if self.session_internal:
             self.set_last_activity(time.time())
+        if self.current_page == "cotizaciones" and self.is_authenticated:
+            self._live_cots_seen = time.time()
+            # La sincronización en vivo terminó por inactividad: retomarla
+            if not self._live_cots_watching:
+                return AppState.watch_live_cots()
     
     @rx.event
     async def check_user_areas(self):
@@ -1147,6 +1246,13 @@ class AppState(rx.State):
             self.fams_show = []
             self.cots = []
             self.cots_show = []
+            self._cots_by_id = {}
+            self.cots_next_token = ""
+            self.certs_next_token = ""
+            self.fams_next_token = ""
+            self.total_cots = 0
+            self.total_certs = 0
+            self.total_fams = 0
             
             # Limpiar también los valores de búsqueda para evitar conflictos
             self.values["search_value"] = ""
@@ -1165,6 +1271,7 @@ class AppState(rx.State):
                 elif "/cotizaciones" in current_page:
                     print("🔄 Iniciando carga de cotizaciones...")
                     yield AppState.get_cots()
+                    yield AppState.watch_live_cots()
                 else:
                     print(f"⚠️  Página no reconocida: {current_page}")
                     
@@ -1177,6 +1284,7 @@ class AppState(rx.State):
                     yield AppState.get_fams()
                 elif self.current_page == "cotizaciones":
                     yield AppState.get_cots()
+                    yield AppState.watch_live_cots()
                 
         except Exception as e:
             print(f"❌ Error al establecer el area: {e}")
@@ -1242,32 +1350,22 @@ class AppState(rx.State):
                 self.cotizacion_detalle = Cot()
                 return
             
-            # Buscar primero en la lista actual
-            cotizacion_encontrada = None
-            for cot in self.cots:
-                if cot.id == cot_id:
-                    cotizacion_encontrada = cot
-                    break
-            
-            # Si no se encontró en la lista actual, buscar en la lista mostrada
-            if not cotizacion_encontrada:
-                for cot in self.cots_show:
-                    if cot.id == cot_id:
-                        cotizacion_encontrada = cot
-                        break
+            # Buscar primero en los índices en vivo (sincronizados con Firestore, sin lecturas)
+            # y luego en las filas cargadas en la lista (búsqueda, páginas siguientes)
+            cotizacion_encontrada = firestore_api.find_live_cot(cot_id) or self._cots_by_id.get(cot_id)
             
-            # Si aún no se encontró, buscar en Firestore
+            # Si no está cargada (link directo o recarga), leer el documento desde Firestore
             if not cotizacion_encontrada:
                 print(f"⚡ Cotización no encontrada en listas actuales, buscando en Firestore...")
-                # Aquí podrías implementar una búsqueda específica en Firestore
-                # Por ahora, usaremos una cotización vacía con el ID
-                cotizacion_encontrada = Cot(id=cot_id)
+                found = await firestore_api_async.get_cots_by_ids([cot_id])
+                cotizacion_encontrada = found[0] if found else Cot(id=cot_id)
             
             self.cotizacion_detalle = cotizacion_encontrada
             print(f"✅ Cotización detalle cargada: {cotizacion_encontrada.num}-{cotizacion_encontrada.year} (ID: {cot_id})")
             
-            # Extraer PDF si hay archivo asociado
-            await self.extraer_pdf_cotizacion_detalle()
+            # Extraer PDF si hay archivo asociado (evento en segundo plano: no bloquea la sesión)
+            self.cotizacion_detalle_processing = True
+            yield AppState.extraer_pdf_cotizacion_detalle
             
             # ASEGURAR que loading esté desactivado al final (por si no se procesó PDF o falló)
             if self.is_loading_cotizacion_detalle:
@@ -1505,9 +1603,20 @@ class AppState(rx.State):
                 else:
                     print(f"📋 Cargando certificados para área: {area_filter}")
                 
-                certs_data = firestore_api.get_certs(area=area_filter, order_by="issuedate", limit=100, filter=filter)
+            # La consulta se hace fuera del lock del estado para no frenar otros eventos
+            (certs_data, next_token), total = await asyncio.gather(
+                firestore_api_async.get_certs_page(
+                    area=area_filter, order_by="issuedate", page_size=100, filter=filter
+                ),
+                firestore_api_async.count_documents("certificados", area=area_filter),
+            )
+
+            async with self:
+                self.certs_next_token = next_token
+                self.total_certs = total
                 self.certs = certs_data
                 self.certs_show = self.certs
+                self._local_index("certificados").add_many(certs_data)
                 
                 if self.certs:
                     print(f"✅ {len(certs_data)} certificados obtenidos correctamente")
@@ -1530,6 +1639,7 @@ class AppState(rx.State):
             # Si hay búsqueda, intentar usar Algolia primero
             if has_search:
                 print(f"� Buscando certificados con Algolia: '{self.values['search_value']}'")
+                self.certs_next_token = ""  # La búsqueda pagina con Algolia, no con cursores
                 
                 # Preparar filtros para Algolia
                 filters = {}
@@ -1548,25 +1658,9 @@ class AppState(rx.State):
                     self.certs = [algolia_to_certs(dict(hit)) for hit in algolia_results["hits"]]
                     print(f"✅ Algolia encontró {len(self.certs)} certificados")
                 else:
-                    # Fallback a búsqueda en Firestore si Algolia falla o no encuentra resultados
-                    print("⚠️  Algolia no disponible o sin resultados, usando Firestore...")
-                    if self.values.get("client", "") != "": 
-                        filter_conditions = [("client", "==", self.values["client"])]
-                    else:
-                        filter_conditions = ""
-                    
-                    self.certs = firestore_api.get_certs(
-                        area=self.user_data.current_area,  # None si es TODOS
-                        order_by="issuedate", 
-                        limit=search_limit,
-                        filter=filter_conditions
-                    )
-                    
-                    # Filtrar localmente como fallback
-                    if self.values.get("search_value", ""):
-                        self.certs = [c for c in self.certs
-                                     if any(self.values["search_value"].lower() in str(getattr(c, field, "")).lower() 
-                                           for field in ["client", "num", "year", "status"])]
+                    # Fallback al índice local si Algolia falla o no encuentra resultados
+                    print("⚠️  Algolia no disponible o sin resultados, buscando en el índice local...")
+                    self.certs = await self._search_local("certificados", "client")
                         
             elif not self.certs:
                 # Cargar datos iniciales desde Firestore
@@ -1576,10 +1670,10 @@ class AppState(rx.State):
                 else:
                     filter_conditions = ""
                 
-                self.certs = firestore_api.get_certs(
+                self.certs, self.certs_next_token = await firestore_api_async.get_certs_page(
                     area=self.user_data.current_area,  # None si es TODOS
                     order_by="issuedate", 
-                    limit=search_limit,
+                    page_size=search_limit,
                     filter=filter_conditions
                 )
             else:
@@ -1587,13 +1681,18 @@ class AppState(rx.State):
                 if self.values.get("client", "") != "": 
                     filter_conditions = [("client", "==", self.values["client"])]
                     # Recargar datos con filtro de cliente
-                    certs_data = firestore_api.get_certs(
+                    certs_data, self.certs_next_token = await firestore_api_async.get_certs_page(
                         area = self.user_data.current_area, 
                         order_by = "issuedate", 
-                        limit = self.values.get("limit", 100) if self.values.get("limit", 100) > 0 else search_limit,
+                        page_size = self.values.get("limit", 100) if self.values.get("limit", 100) > 0 else search_limit,
                         filter = filter_conditions
                     )
                     self.certs = certs_data
+
+            if has_search:
+                self.total_certs = algolia_results.get("nbHits", len(self.certs)) if algolia_results else len(self.certs)
+            else:
+                self.total_certs = await self._count_total("certificados", "client")
                 
             # Ordenar por fecha si se especifica
             if self.values.get("order_by", "") == "fecha":
@@ -1607,9 +1706,7 @@ class AppState(rx.State):
             if not has_search or not algolia_api.enabled:
                 if self.values.get("search_value", "") != "" and not algolia_results:
                     print(f"🔍 Filtrando {len(self.certs)} certificados localmente por: '{self.values['search_value']}'")
-                    self.certs_show = [c for c in self.certs_show 
-                                     if any(self.values["search_value"].lower() in str(getattr(c, field, "")).lower() 
-                                           for field in ["client", "num", "year", "status"])]
+                    self.certs_show = self._local_index("certificados").filter(self.certs_show, self.values["search_value"])
                     print(f"✅ Se encontraron {len(self.certs_show)} certificados que coinciden")
             
             # Limitar resultados mostrados (pero después del filtro)
@@ -1638,12 +1735,21 @@ class AppState(rx.State):
                 else:
                     print(f"📋 Cargando familias para área: {area_filter}")
 
-                self.fams = firestore_api.get_fams(
+            # La consulta se hace fuera del lock del estado para no frenar otros eventos
+            (fams_data, next_token), total = await asyncio.gather(
+                firestore_api_async.get_fams_page(
                     area=area_filter, 
                     order_by="razonsocial",
-                    limit=100,
+                    page_size=100,
                     filter=""
-                )  
+                ),
+                firestore_api_async.count_documents("familias", area=area_filter),
+            )
+
+            async with self:
+                self.fams, self.fams_next_token = fams_data, next_token
+                self.total_fams = total
+                self._local_index("familias").add_many(fams_data)
                 
                 if self.fams:
                     self.fams_show = self.fams[:30]  # Mostrar solo las primeras 30 familias
@@ -1658,8 +1764,80 @@ class AppState(rx.State):
             traceback.print_exc()
 
     def set_search_text(self, value: str):
-        """Actualiza el texto de búsqueda sin ejecutar la búsqueda."""
+        """Actualiza el texto de búsqueda y programa la búsqueda (con debounce)."""
         self.search_text = value
+        self._search_generation += 1
+        return AppState.search_as_you_type(self._search_generation)
+
+    def _supersede_search(self):
+        """Invalida la búsqueda mientras se escribe pendiente de la sesión y cancela su consulta en curso."""
+        self._search_generation += 1
+        task = _search_tasks.pop(self.router.session.client_token, None)
+        if task is not None and not task.done():
+            task.cancel()
+
+    @rx.event(background=True)
+    async def search_as_you_type(self, generation: int):
+        """
+        Búsqueda mientras se escribe: espera SEARCH_DEBOUNCE_SECONDS sin nuevas teclas,
+        consulta Algolia fuera del lock (cancelable si llega otra tecla) y solo aplica
+        el resultado si `generation` sigue siendo la última búsqueda pedida.
+        """
+        task = asyncio.current_task()
+        async with self:
+            token = self.router.session.client_token
+        previous = _search_tasks.get(token)
+        if previous is not None and previous is not task and not previous.done():
+            previous.cancel()
+        _search_tasks[token] = task
+
+        try:
+            await asyncio.sleep(SEARCH_DEBOUNCE_SECONDS)
+            async with self:
+                if generation != self._search_generation:
+                    return
+                search_value = self.search_text.strip() if self.search_text else ""
+                page = self.current_page
+                area = self.user_data.current_area
+                filters = {"client": self.values["client"]} if self.values.get("client", "") else {}
+
+            # Sugerencias (perfil typeahead: pocos hits con atributos mínimos) y, en paralelo, la misma
+            # consulta que hará update_*_show, que queda en el cache de Algolia
+            suggestions = []
+            search = {
+                "certificaciones": ("certificados", algolia_api.search_certs),
+                "familias": ("familias", algolia_api.search_fams),
+                "cotizaciones": ("cotizaciones", algolia_api.search_cots),
+            }.get(page)
+            if search_value and search:
+                index_name, search_fn = search
+                typeahead, _ = await asyncio.gather(
+                    search_fn(search_value, area=area, filters=filters, view="typeahead"),
+                    search_fn(search_value, area=area, filters=filters),
+                )
+                for hit in (typeahead or {}).get("hits", []):
+                    label = typeahead_label(index_name, dict(hit))
+                    if label and label not in suggestions:
+                        suggestions.append(label)
+
+            # Desde acá no se cancela: el resultado se aplica completo o no se aplica
+            if _search_tasks.get(token) is task:
+                del _search_tasks[token]
+            async with self:
+                if generation != self._search_generation:
+                    print(f"⏭️  Búsqueda '{search_value}' descartada (hay una más reciente)")
+                    return
+                await self.update_activity()
+                self.search_suggestions = suggestions
+                if search_value:
+                    await self.filter_values(search_value)
+                else:
+                    await self.clear_search()
+        except asyncio.CancelledError:
+            print("⏭️  Búsqueda mientras se escribe cancelada")
+        finally:
+            if _search_tasks.get(token) is task:
+                del _search_tasks[token]
 
     @rx.event
     async def handle_search_key(self, key: str):
@@ -1667,9 +1845,19 @@ class AppState(rx.State):
         if key == "Enter":
             await self.execute_search()
 
+    @rx.event
+    async def select_search_suggestion(self, value: str):
+        """Busca el texto de la sugerencia elegida."""
+        self.search_text = value
+        await self.execute_search()
+
     @rx.event
     async def execute_search(self):
         """Ejecuta la búsqueda usando el texto almacenado en search_text."""
+        # La búsqueda explícita reemplaza a la que esté pendiente mientras se escribe
+        self._supersede_search()
+        self.search_suggestions = []
+        
         # Actualizar actividad del usuario
         await self.update_activity()
         
@@ -1689,9 +1877,11 @@ class AppState(rx.State):
         """Limpia la búsqueda y restaura todos los datos."""
         try:
             print("🧹 Limpiando búsqueda y restaurando datos completos")
+            self._supersede_search()
             
             # Limpiar el texto de búsqueda
             self.search_text = ""
+            self.search_suggestions = []
             self.values["search_value"] = ""
             
             # Recargar datos completos según la página actual
@@ -1748,6 +1938,7 @@ class AppState(rx.State):
             # Si hay búsqueda, intentar usar Algolia primero
             if has_search:
                 print(f"🔍 Buscando familias con Algolia: '{self.values['search_value']}'")
+                self.fams_next_token = ""  # La búsqueda pagina con Algolia, no con cursores
                 
                 # Preparar filtros para Algolia
                 filters = {}
@@ -1766,57 +1957,45 @@ class AppState(rx.State):
                     self.fams = [algolia_to_fam(dict(hit)) for hit in algolia_results["hits"]]
                     print(f"✅ Algolia encontró {len(self.fams)} familias")
                 else:
-                    # Fallback a búsqueda en Firestore si Algolia falla o no encuentra resultados
-                    print("⚠️  Algolia no disponible o sin resultados, usando Firestore...")
-                    if self.values.get("client", "") != "": 
-                        self.fams = firestore_api.get_fams(
-                            area=self.user_data.current_area,  # None si es TODOS
-                            order_by="razonsocial", 
-                            limit=search_limit,
-                            filter=[("razonsocial", "==", self.values["client"])]
-                        )
-                    else:
-                        self.fams = firestore_api.get_fams(
-                            area=self.user_data.current_area,  # None si es TODOS
-                            order_by="razonsocial", 
-                            limit=search_limit,
-                            filter=""
-                        )
-                    
-                    # Filtrar localmente como fallback
-                    if self.values.get("search_value", ""):
-                        self.fams = buscar_fams(self.fams, self.values["search_value"])
+                    # Fallback al índice local si Algolia falla o no encuentra resultados
+                    print("⚠️  Algolia no disponible o sin resultados, buscando en el índice local...")
+                    self.fams = await self._search_local("familias", "client")
                         
             elif not self.fams:
                 # Cargar datos iniciales desde Firestore
                 print(f"🔄 Cargando familias iniciales (límite: {search_limit})...")
                 if self.values.get("client", "") != "": 
-                    self.fams = firestore_api.get_fams(
+                    self.fams, self.fams_next_token = await firestore_api_async.get_fams_page(
                         area=self.user_data.current_area,  # None si es TODOS
                         order_by="razonsocial", 
-                        limit=search_limit,
+                        page_size=search_limit,
                         filter=[("razonsocial", "==", self.values["client"])]
                     )
                 else:
-                    self.fams = firestore_api.get_fams(
+                    self.fams, self.fams_next_token = await firestore_api_async.get_fams_page(
                         area=self.user_data.current_area,  # None si es TODOS
                         order_by="razonsocial", 
-                        limit=search_limit,
+                        page_size=search_limit,
                         filter=""
                     )
             else:
                 # Si no hay búsqueda y ya tenemos datos, usar existentes pero actualizarlos si es necesario
                 #Filtrar por cliente
                 if self.values.get("client", "") != "": 
-                    self.fams = firestore_api.get_fams(
+                    self.fams, self.fams_next_token = await firestore_api_async.get_fams_page(
                         area = self.user_data.current_area, 
                         order_by = "razonsocial", 
-                        limit = self.values["limit"] if self.values["limit"]>0 else 0,
+                        page_size = self.values["limit"] if self.values["limit"]>0 else 0,
                         filter = [("razonsocial", "==", self.values["client"])]
                     )
                 else:
                     # Usar datos existentes si no hay filtros específicos
                     pass
+
+            if has_search:
+                self.total_fams = algolia_results.get("nbHits", len(self.fams)) if algolia_results else len(self.fams)
+            else:
+                self.total_fams = await self._count_total("familias", "razonsocial")
             
             # Ordenar las familias por fecha de vencimiento
             if self.values["sorted_value"] == "expirationdate":
@@ -1833,7 +2012,7 @@ class AppState(rx.State):
             if not has_search or not algolia_api.enabled:
                 if self.values.get("search_value", "") != "" and not algolia_results:
                     print(f"🔍 Filtrando {len(self.fams)} familias localmente por: '{self.values['search_value']}'")
-                    self.fams_show = buscar_fams(self.fams_show, self.values["search_value"])
+                    self.fams_show = self._local_index("familias").filter(self.fams_show, self.values["search_value"])
                     print(f"✅ Se encontraron {len(self.fams_show)} familias que coinciden")
 
             # Limitar resultados mostrados (pero después del filtro)
@@ -1862,29 +2041,60 @@ class AppState(rx.State):
                 else:
                     print(f"📋 Cargando cotizaciones para área: {area_filter}")
                 
-                self.cots = firestore_api.get_cots(
-                    area=area_filter, 
-                    order_by="issuedate_timestamp",  # Usar timestamp para mejor ordenamiento
-                    limit=100,
-                    filter=""
-                )  
+                page_query = self._next_cots_page_query() if append_mode else None
+
+            if append_mode:
+                # Modo scroll infinito: continuar desde el token de la página anterior (consulta fuera del lock)
+                if not page_query["page_token"]:
+                    return
+                new_cots, next_token = await firestore_api_async.get_cots_page(**page_query)
+                async with self:
+                    # Descartar la página si mientras tanto se recargó la lista
+                    if self.cots_next_token != page_query["page_token"]:
+                        return
+                    new_cots = self._add_cots_page(new_cots, next_token)
+                    print(f"📄 Modo scroll infinito: agregando {len(new_cots)} cotizaciones")
+                    self.cots_show.extend(new_cots)
+                return
+
+            # Preferir el índice en vivo del área (compartido entre sesiones y sincronizado por on_snapshot)
+            index = await asyncio.to_thread(firestore_api.get_live_cots_index, area_filter)
+            if index is not None and await index.wait_ready():
+                cots_data = index.items()
+                next_token = firestore_api.live_index_next_token("cotizaciones", index)
+                total = await firestore_api_async.count_documents("cotizaciones", area=area_filter)
+                live_version, live_size = index.version, len(cots_data)
+            else:
+                # La consulta se hace fuera del lock del estado para no frenar otros eventos
+                (cots_data, next_token), total = await asyncio.gather(
+                    firestore_api_async.get_cots_page(
+                        area=area_filter, 
+                        order_by="issuedate_timestamp",  # Usar timestamp para mejor ordenamiento
+                        page_size=100,
+                        filter=""
+                    ),
+                    firestore_api_async.count_documents("cotizaciones", area=area_filter),
+                )
+                live_version, live_size = 0, 0
+
+            async with self:
+                self.cots, self.cots_next_token = cots_data, next_token
+                self.total_cots = total
+                self._local_index("cotizaciones").add_many(cots_data)
+                self._live_cots_version, self._live_cots_size = live_version, live_size
                 
                 if self.cots:
                     # Ordenar por número de cotización (año descendente, número descendente)
                     self.cots = sorted(self.cots, key=lambda cot: (int(cot.year) if cot.year.isdigit() else 0, int(cot.num) if cot.num.isdigit() else 0), reverse=True)
                     
-                    if append_mode:
-                        # Modo scroll infinito: agregar a los existentes
-                        print(f"📄 Modo scroll infinito: agregando {len(self.cots)} cotizaciones")
-                        self.cots_show.extend(self.cots)
-                    else:
-                        # Modo paginación: reiniciar y mostrar primera página
-                        self.cots_page = 0
-                        self.cots_show = self.cots[:30]  # Mostrar solo las primeras 30 cotizaciones
-                        print(f"✅ {len(self.cots)} cotizaciones obtenidas correctamente y ordenadas por número, mostrando {len(self.cots_show)}")
+                    self._index_cots(self.cots, reset=True)
+                    
+                    # Modo paginación: reiniciar y mostrar primera página
+                    self.cots_page = 0
+                    self.cots_show = self.cots[:30]  # Mostrar solo las primeras 30 cotizaciones
+                    print(f"✅ {len(self.cots)} cotizaciones obtenidas correctamente y ordenadas por número, mostrando {len(self.cots_show)}")
                 else:
-                    if not append_mode:
-                        self.cots_show = []
+                    self.cots_show = []
                     print("⚠️  No se encontraron cotizaciones")
 
         except Exception as e:
@@ -1892,6 +2102,72 @@ class AppState(rx.State):
             import traceback
             traceback.print_exc()
 
+    @rx.event(background=True)
+    async def watch_live_cots(self):
+        """
+        Aplica a cots/cots_show los cambios del índice en vivo del área actual mientras se está en la página.
+
+        Termina al salir de la página, al iniciarse otra tarea o tras LIVE_COTS_IDLE_SECONDS sin
+        actividad del cliente (una pestaña cerrada no avisa); update_activity y on_mount la reinician.
+        """
+        async with self:
+            self._live_cots_generation += 1
+            generation = self._live_cots_generation
+            version = self._live_cots_version
+            area_filter = self.user_data.current_area if self.user_data.current_area else None
+            self._live_cots_watching = True
+            self._live_cots_seen = time.time()
+
+        index = await asyncio.to_thread(firestore_api.get_live_cots_index, area_filter)
+        if index is None or not await index.wait_ready():
+            print("⚠️  Índice en vivo de cotizaciones no disponible")
+            async with self:
+                if generation == self._live_cots_generation:
+                    self._live_cots_watching = False
+            return
+
+        while True:
+            new_version = await index.wait_for_change(version, timeout=30)
+            async with self:
+                # Terminar si se inició otra tarea (cambio de área); no tocar el flag de la tarea nueva
+                if generation != self._live_cots_generation:
+                    return
+                reason = ""
+                if index.failed:
+                    reason = "el índice en vivo dejó de actualizarse"
+                elif self.current_page != "cotizaciones" or not self.is_authenticated:
+                    reason = "se salió de la página"
+                elif time.time() - self._live_cots_seen > LIVE_COTS_IDLE_SECONDS:
+                    reason = f"{LIVE_COTS_IDLE_SECONDS:.0f}s sin actividad del cliente"
+                if reason:
+                    self._live_cots_watching = False
+                    print(f"🔇 Sincronización en vivo de cotizaciones finalizada: {reason}")
+                    return
+                if new_version == version:
+                    continue
+                version = new_version
+
+                # No pisar resultados de búsqueda, filtro por cliente u orden elegido por el usuario
+                if self.values.get("search_value", "") or self.values.get("client", "") or self.values.get("sorted_value", ""):
+                    continue
+                self._apply_live_cots(index)
+
+    def _apply_live_cots(self, index):
+        """Reemplaza la parte de self.cots que viene del índice en vivo y rearma las filas mostradas."""
+        live = index.items()
+        live_ids = {cot.id for cot in live}
+        # Conservar las páginas leídas más allá del índice (scroll / página siguiente)
+        extras = [cot for cot in self.cots[self._live_cots_size:] if cot.id not in live_ids]
+        self.cots = live + extras
+        self._live_cots_size = len(live)
+        self._live_cots_version = index.version
+        self._index_cots(self.cots, reset=True)
+        self._local_index("cotizaciones").add_many(live)
+
+        start = self.cots_page * 30
+        self.cots_show = self.cots[start:start + max(len(self.cots_show), 30)]
+        print(f"🔄 Cotizaciones actualizadas en vivo: {len(live)} en el índice")
+
     @rx.event
     async def update_cots_show(self):
         """Actualiza cotizaciones a mostrar."""
@@ -1903,6 +2179,7 @@ class AppState(rx.State):
             # Si hay búsqueda, intentar usar Algolia primero
             if has_search:
                 print(f"🔍 Buscando cotizaciones con Algolia: '{self.values['search_value']}'")
+                self.cots_next_token = ""  # La búsqueda pagina con Algolia, no con cursores
                 
                 # Preparar filtros para Algolia
                 filters = {}
@@ -1921,60 +2198,52 @@ class AppState(rx.State):
                     self.cots = [algolia_to_cot(dict(hit)) for hit in algolia_results["hits"]]
                     print(f"✅ Algolia encontró {len(self.cots)} cotizaciones")
                 else:
-                    # Fallback a búsqueda en Firestore si Algolia falla o no encuentra resultados
-                    print("⚠️  Algolia no disponible o sin resultados, usando Firestore...")
+                    # Fallback al índice local si Algolia falla o no encuentra resultados
+                    print("⚠️  Algolia no disponible o sin resultados, buscando en el índice local...")
                     algolia_results = []  # Definir variable para evitar error
-                    if self.values.get("client", "") != "": 
-                        self.cots = firestore_api.get_cots(
-                            area=self.user_data.current_area,  # None si es TODOS
-                            order_by="issuedate_timestamp",
-                            limit=search_limit,
-                            filter=[("client", "==", self.values["client"])]
-                        )
-                    else:
-                        self.cots = firestore_api.get_cots(
-                            area=self.user_data.current_area,  # None si es TODOS
-                            order_by="issuedate_timestamp",
-                            limit=search_limit,
-                            filter=""
-                        )
-                    
-                    # Filtrar localmente como fallback
-                    if self.values.get("search_value", ""):
-                        self.cots = buscar_cots(self.cots, self.values["search_value"])
+                    self.cots = await self._search_local("cotizaciones", "client_id")
                         
             elif not self.cots:
                 # Cargar datos iniciales desde Firestore
                 print(f"🔄 Cargando cotizaciones iniciales (límite: {search_limit})...")
                 
                 if self.values.get("client", "") != "": 
-                    self.cots = firestore_api.get_cots(
+                    self.cots, self.cots_next_token = await firestore_api_async.get_cots_page(
                         area=self.user_data.current_area,  # None si es TODOS
                         order_by="issuedate_timestamp",
-                        limit=search_limit,
+                        page_size=search_limit,
                         filter=[("client", "==", self.values["client"])]
                     )
                 else:
-                    self.cots = firestore_api.get_cots(
+                    self.cots, self.cots_next_token = await firestore_api_async.get_cots_page(
                         area=self.user_data.current_area,  # None si es TODOS
                         order_by="issuedate_timestamp",
-                        limit=search_limit,
+                        page_size=search_limit,
                         filter=""
                     )
             else:
                 # Si no hay búsqueda y ya tenemos datos, usar existentes pero actualizarlos si es necesario
                 #Filtrar por cliente
                 if self.values.get("client", "") != "": 
-                    self.cots = firestore_api.get_cots(
+                    self.cots, self.cots_next_token = await firestore_api_async.get_cots_page(
                         area=self.user_data.current_area,  # None si es TODOS
                         order_by="issuedate_timestamp",  # Usar timestamp
-                        limit=self.values["limit"] if self.values["limit"]>0 else 0,
+                        page_size=self.values["limit"] if self.values["limit"]>0 else 0,
                         filter=[("client", "==", self.values["client"])]
                     )
                 else:
                     # Usar datos existentes si no hay filtros específicos
                     pass
             
+            self._index_cots(self.cots, reset=True)
+            # Al volver a la lista sin filtros, el índice en vivo reemplaza estas filas completas
+            self._live_cots_size = len(self.cots)
+
+            if has_search:
+                self.total_cots = algolia_results.get("nbHits", len(self.cots)) if algolia_results else len(self.cots)
+            else:
+                self.total_cots = await self._count_total("cotizaciones", "client")
+
             # Ordenar las cotizaciones por número (año descendente, número descendente)
             if self.values["sorted_value"] == "issuedate":
                 self.cots_show = sorted(
@@ -1992,7 +2261,7 @@ class AppState(rx.State):
             if not has_search or not algolia_api.enabled:
                 if self.values.get("search_value", "") != "" and not algolia_results:
                     print(f"🔍 Filtrando {len(self.cots)} cotizaciones localmente por: '{self.values['search_value']}'")
-                    self.cots_show = buscar_cots(self.cots_show, self.values["search_value"])
+                    self.cots_show = self._local_index("cotizaciones").filter(self.cots_show, self.values["search_value"])
                     print(f"✅ Se encontraron {len(self.cots_show)} cotizaciones que coinciden")
             
             # Limitar resultados mostrados (pero después del filtro)
@@ -2045,7 +2314,16 @@ class AppState(rx.State):
                 else:
                     print("📄 No hay más certificados para cargar")
             else:
-                print("⚠️  Carga de más datos sin búsqueda no implementada aún")
+                # Sin búsqueda: mostrar las filas ya cargadas y seguir en Firestore con el token de página
+                shown = len(self.certs_show)
+                if shown >= len(self.certs):
+                    await self._fetch_next_certs_page()
+                new_certs = self.certs[shown:shown + self.page_size]
+                if new_certs:
+                    self.certs_show.extend(new_certs)
+                    print(f"✅ Se cargaron {len(new_certs)} certificados más (total: {len(self.certs_show)})")
+                else:
+                    print("📄 No hay más certificados para cargar")
                 
         except Exception as e:
             print(f"❌ Error al cargar más certificados: {e}")
@@ -2091,7 +2369,16 @@ class AppState(rx.State):
                 else:
                     print("📄 No hay más familias para cargar")
             else:
-                print("⚠️  Carga de más datos sin búsqueda no implementada aún")
+                # Sin búsqueda: mostrar las filas ya cargadas y seguir en Firestore con el token de página
+                shown = len(self.fams_show)
+                if shown >= len(self.fams):
+                    await self._fetch_next_fams_page()
+                new_fams = self.fams[shown:shown + self.page_size]
+                if new_fams:
+                    self.fams_show.extend(new_fams)
+                    print(f"✅ Se cargaron {len(new_fams)} familias más (total: {len(self.fams_show)})")
+                else:
+                    print("📄 No hay más familias para cargar")
                 
         except Exception as e:
             print(f"❌ Error al cargar más familias: {e}")
@@ -2131,13 +2418,23 @@ class AppState(rx.State):
                     # Convertir y agregar nuevos resultados
                     new_cots = [algolia_to_cot(dict(hit)) for hit in algolia_results['hits']]
                     self.cots_show.extend(new_cots)
+                    self._index_cots(new_cots)
                     self.cots_page += 1
                     self.total_cots = algolia_results.get('nbHits', 0)
                     print(f"✅ Se cargaron {len(new_cots)} cotizaciones más (total: {len(self.cots_show)})")
                 else:
                     print("📄 No hay más cotizaciones para cargar")
             else:
-                print("⚠️  Carga de más datos sin búsqueda no implementada aún")
+                # Sin búsqueda: mostrar las filas ya cargadas y seguir en Firestore con el token de página
+                shown = len(self.cots_show)
+                if shown >= len(self.cots):
+                    await self._fetch_next_cots_page()
+                new_cots = self.cots[shown:shown + self.page_size]
+                if new_cots:
+                    self.cots_show.extend(new_cots)
+                    print(f"✅ Se cargaron {len(new_cots)} cotizaciones más (total: {len(self.cots_show)})")
+                else:
+                    print("📄 No hay más cotizaciones para cargar")
                 
         except Exception as e:
             print(f"❌ Error al cargar más cotizaciones: {e}")
@@ -2150,8 +2447,8 @@ class AppState(rx.State):
         if self.is_loading_more:
             return
             
-        # Solo cargar más si hay una búsqueda activa
-        if not self.values.get("search_value", ""):
+        # Sin búsqueda activa, solo cargar si quedan filas o páginas en Firestore
+        if not self.values.get("search_value", "") and not self._has_more_rows():
             return
             
         # Determinar qué tipo de datos cargar según la página actual
@@ -2162,6 +2459,123 @@ class AppState(rx.State):
         elif self.current_page == "cotizaciones":
             await self.load_more_cots()
 
+    def _has_more_rows(self) -> bool:
+        """Indica si la página actual tiene filas sin mostrar o más páginas en Firestore."""
+        if self.current_page == "certificaciones":
+            return len(self.certs_show) < len(self.certs) or bool(self.certs_next_token)
+        elif self.current_page == "familias":
+            return len(self.fams_show) < len(self.fams) or bool(self.fams_next_token)
+        elif self.current_page == "cotizaciones":
+            return len(self.cots_show) < len(self.cots) or bool(self.cots_next_token)
+        return False
+
+    def _local_index(self, collection: str):
+        """Índice de búsqueda local de la colección para el área actual."""
+        return get_search_index(collection, self.user_data.current_area if self.user_data.current_area else None)
+
+    async def _search_local(self, collection: str, client_attr: str) -> list:
+        """
+        Búsqueda sin Algolia sobre el índice invertido local del área.
+        Solo se lee la colección completa desde Firestore si el índice no tiene una carga completa reciente;
+        esa lectura no pasa por el cache de consultas (el índice ya guarda las filas).
+        """
+        index = self._local_index(collection)
+        if not index.is_complete(SEARCH_INDEX_MAX_AGE):
+            area = self.user_data.current_area if self.user_data.current_area else None
+            print(f"🔄 Cargando '{collection}' completo en el índice local...")
+            if collection == "certificados":
+                rows = await firestore_api_async.get_certs(area=area, order_by="issuedate", limit=0, filter="", use_cache=False)
+            elif collection == "familias":
+                rows = await firestore_api_async.get_fams(area=area, order_by="razonsocial", limit=0, filter="", use_cache=False)
+            else:
+                rows = await firestore_api_async.get_cots(area=area, order_by="issuedate_timestamp", limit=0, filter="", use_cache=False)
+            index.replace_all(rows)
+
+        results = index.search(self.values["search_value"])
+        if self.values.get("client", ""):
+            results = [row for row in results if getattr(row, client_attr, "") == self.values["client"]]
+        print(f"✅ Índice local: {len(results)} de {len(index)} {collection} coinciden")
+        return results
+
+    async def _count_total(self, collection: str, client_field: str) -> int:
+        """Cantidad real de documentos (count en Firestore) para el área y el cliente filtrados."""
+        filters = [(client_field, "==", self.values["client"])] if self.values.get("client", "") else None
+        return await firestore_api_async.count_documents(
+            collection,
+            area=self.user_data.current_area if self.user_data.current_area else None,
+            filters=filters
+        )
+
+    async def _fetch_next_certs_page(self) -> list:
+        """Lee la siguiente página de certificados desde Firestore usando el token guardado."""
+        if not self.certs_next_token:
+            return []
+        new_certs, self.certs_next_token = await firestore_api_async.get_certs_page(
+            area=self.user_data.current_area if self.user_data.current_area else None,
+            order_by="issuedate",
+            page_size=self.page_size,
+            filter=[("client", "==", self.values["client"])] if self.values.get("client", "") else "",
+            page_token=self.certs_next_token
+        )
+        self.certs.extend(new_certs)
+        self._local_index("certificados").add_many(new_certs)
+        return new_certs
+
+    async def _fetch_next_fams_page(self) -> list:
+        """Lee la siguiente página de familias desde Firestore usando el token guardado."""
+        if not self.fams_next_token:
+            return []
+        new_fams, self.fams_next_token = await firestore_api_async.get_fams_page(
+            area=self.user_data.current_area if self.user_data.current_area else None,
+            order_by="razonsocial",
+            page_size=self.page_size,
+            filter=[("razonsocial", "==", self.values["client"])] if self.values.get("client", "") else "",
+            page_token=self.fams_next_token
+        )
+        self.fams.extend(new_fams)
+        self._local_index("familias").add_many(new_fams)
+        return new_fams
+
+    async def _fetch_next_cots_page(self) -> list:
+        """Lee la siguiente página de cotizaciones desde Firestore usando el token guardado."""
+        page_query = self._next_cots_page_query()
+        if not page_query["page_token"]:
+            return []
+        new_cots, next_token = await firestore_api_async.get_cots_page(**page_query)
+        return self._add_cots_page(new_cots, next_token)
+
+    def _next_cots_page_query(self) -> dict:
+        """Argumentos de get_cots_page para la página siguiente a la ya cargada."""
+        return {
+            "area": self.user_data.current_area if self.user_data.current_area else None,
+            "order_by": "issuedate_timestamp",
+            "page_size": self.page_size,
+            "filter": [("client", "==", self.values["client"])] if self.values.get("client", "") else "",
+            "page_token": self.cots_next_token,
+        }
+
+    def _add_cots_page(self, new_cots: list, next_token: str) -> list:
+        """Agrega una página leída a self.cots y guarda el token de la siguiente."""
+        self.cots_next_token = next_token
+        # Ordenar la página nueva igual que la primera (año y número descendentes)
+        new_cots = sorted(new_cots, key=lambda cot: (int(cot.year) if cot.year.isdigit() else 0, int(cot.num) if cot.num.isdigit() else 0), reverse=True)
+        self.cots.extend(new_cots)
+        self._index_cots(new_cots)
+        self._local_index("cotizaciones").add_many(new_cots)
+        return new_cots
+
+    def _index_cots(self, cots: list, reset: bool = False):
+        """
+        Agrega cotizaciones al índice id -> Cot usado por la vista de detalle.
+        Con reset=True el índice se rearma: solo contiene las filas de la lista actual,
+        así no crece sin límite y las filas reemplazadas (p. ej. por el índice en vivo) no quedan viejas.
+        """
+        if reset:
+            self._cots_by_id = {}
+        for cot in cots:
+            if cot.id:
+                self._cots_by_id[cot.id] = cot
+
     # Variable para controlar throttling de scroll
     last_scroll_time: float = 0
     scroll_position: int = 0
@@ -2178,8 +2592,8 @@ class AppState(rx.State):
             
         self.last_scroll_time = current_time
         
-        # Solo cargar más si hay una búsqueda activa
-        if not self.values.get("search_value", ""):
+        # Sin búsqueda activa, solo cargar si quedan filas o páginas en Firestore
+        if not self.values.get("search_value", "") and not self._has_more_rows():
             return
         
         if self.is_loading_more:
@@ -2232,57 +2646,6 @@ class AppState(rx.State):
         except Exception as e:
             print(f"Error al colocar datos en la cola: {e}")
 
-    def _normalize_company_name(self, name: str) -> str:
-        """
-        Normaliza nombres de empresa eliminando tipos de sociedad y caracteres especiales
-        """
-        if not name:
-            return ""
-        
-        # Convertir a mayúsculas y quitar acentos
-        normalized = name.upper().strip()
-        # Normalizar acentos
-        import unicodedata
-        normalized = unicodedata.normalize('NFD', normalized)
-        normalized = ''.join(char for char in normalized if unicodedata.category(char) != 'Mn')
-        
-        # Lista de tipos de sociedad comunes a eliminar
-        company_types = [
-            "S.A.", "SA", "S.A", "SOCIEDAD ANONIMA", "SOCIEDAD ANÓNIMA", "SOCIEDAD ANÓNIMA",
-            "S.R.L.", "SRL", "S.R.L", "SOCIEDAD RESPONSABILIDAD LIMITADA", "SOCIEDAD DE RESPONSABILIDAD LIMITADA",
-            "S.L.", "SL", "SOCIEDAD LIMITADA",
-            "S.C.", "SC", "SOCIEDAD COLECTIVA", 
-            "LTDA", "LTDA.", "LIMITADA",
-            "CIA", "CIA.", "COMPAÑIA", "COMPAÑÍA", "COMPANIA",
-            "INC", "INC.", "INCORPORATED",
-            "LLC", "LLC.", "LIMITED LIABILITY COMPANY",
-            "LTD", "LTD.", "LIMITED",
-            "CORP", "CORP.", "CORPORATION",
-            "CO.", "COMPANY",  # Solo CO. con punto, no CO solo
-        ]
-        
-        # Eliminar tipos de sociedad (al final o precedidos por espacio)
-        for company_type in company_types:
-            # Al final de la cadena
-            if normalized.endswith(" " + company_type):
-                normalized = normalized[:-len(" " + company_type)]
-            elif normalized.endswith(company_type) and company_type != "CO":  # Evitar eliminar CO solo
-                normalized = normalized[:-len(company_type)]
-            
-            # En medio o al principio (precedido por espacio)
-            normalized = normalized.replace(" " + company_type + " ", " ")
-            if normalized.startswith(company_type + " ") and company_type != "CO":
-                normalized = normalized[len(company_type + " "):]
-        
-        # Eliminar puntos, comas y otros caracteres especiales
-        import re
-        normalized = re.sub(r'[.,;:\-_()[\]{}]', ' ', normalized)
-        
-        # Eliminar espacios múltiples y strip
-        normalized = ' '.join(normalized.split())
-        
-        return normalized.strip()
-
     async def _search_client_intelligent(self, client_name: str):
         """
         Búsqueda inteligente de cliente:
@@ -2295,51 +2658,34 @@ class AppState(rx.State):
             
         try:
             # Normalizar el nombre de búsqueda
-            normalized_search = self._normalize_company_name(client_name)
+            normalized_search = normalize_company_name(client_name)
             print(f"🔍 DEBUG: Búsqueda normalizada: '{client_name}' → '{normalized_search}'")
             
             # 1. INTENTAR BÚSQUEDA EN ALGOLIA PRIMERO
             try:
                 print(f"🔍 DEBUG: Buscando en Algolia sin filtro de área...")
-                algolia_results = await algolia_api.search_clients(
-                    query=normalized_search,
-                    page=0,
-                    hits_per_page=10,
-                    area="",  # Sin filtro de área
-                    filters=None
-                )
+                algolia_results = await algolia_api.multi_search({
+                    "clientes": {"query": normalized_search, "hits_per_page": 10},  # Sin filtro de área
+                })
+                algolia_clients = algolia_results.get("clientes", {}).get("hits", [])
                 
-                if algolia_results and algolia_results.get("hits"):
+                if algolia_clients:
                     # Buscar coincidencia exacta o muy similar en resultados de Algolia
-                    for hit in algolia_results["hits"]:
-                        # Convertir hit a diccionario si es necesario
-                        hit_dict = hit.to_dict() if hasattr(hit, 'to_dict') else hit
-                        hit_name = hit_dict.get("razonsocial", "")
-                        hit_normalized = self._normalize_company_name(hit_name)
+                    for hit_client in algolia_clients:
+                        hit_normalized = normalize_company_name(hit_client.razonsocial)
                         
                         # Verificar coincidencia exacta normalizada
                         if hit_normalized == normalized_search:
-                            print(f"✅ DEBUG: Cliente encontrado exacto en Algolia: '{hit_name}' (normalizado: '{hit_normalized}')")
-                            # Convertir hit de Algolia a objeto Client
-                            from ..utils import Client
-                            return Client(
-                                id=hit_dict.get("objectID", ""),
-                                razonsocial=hit_name,
-                                consultora=hit_dict.get("consultora", ""),
-                                email_cotizacion=hit_dict.get("email_cotizacion", ""),
-                                area=hit_dict.get("area", "")
-                            )
+                            print(f"✅ DEBUG: Cliente encontrado exacto en Algolia: '{hit_client.razonsocial}' (normalizado: '{hit_normalized}')")
+                            return hit_client
                     
                     # Si no hay coincidencia exacta, buscar similitud alta
                     import difflib
                     best_match = None
                     best_similarity = 0.0
                     
-                    for hit in algolia_results["hits"]:
-                        # Convertir hit a diccionario si es necesario
-                        hit_dict = hit.to_dict() if hasattr(hit, 'to_dict') else hit
-                        hit_name = hit_dict.get("razonsocial", "")
-                        hit_normalized = self._normalize_company_name(hit_name)
+                    for hit_client in algolia_clients:
+                        hit_normalized = normalize_company_name(hit_client.razonsocial)
                         
                         if not hit_normalized:
                             continue
@@ -2348,19 +2694,12 @@ class AppState(rx.State):
                         
                         if similarity > best_similarity and similarity >= 0.8:  # Alta similitud
                             best_similarity = similarity
-                            best_match = hit_dict
-                            print(f"🔍 DEBUG: Candidato Algolia: '{hit_name}' → similitud: {similarity:.3f}")
+                            best_match = hit_client
+                            print(f"🔍 DEBUG: Candidato Algolia: '{hit_client.razonsocial}' → similitud: {similarity:.3f}")
                     
                     if best_match:
-                        print(f"✅ DEBUG: Cliente encontrado por similitud en Algolia: '{best_match.get('razonsocial')}' (similitud: {best_similarity:.3f})")
-                        from ..utils import Client
-                        return Client(
-                            id=best_match.get("objectID", ""),
-                            razonsocial=best_match.get("razonsocial", ""),
-                            consultora=best_match.get("consultora", ""),
-                            email_cotizacion=best_match.get("email_cotizacion", ""),
-                            area=best_match.get("area", "")
-                        )
+                        print(f"✅ DEBUG: Cliente encontrado por similitud en Algolia: '{best_match.razonsocial}' (similitud: {best_similarity:.3f})")
+                        return best_match
                 
                 print(f"⚠️  DEBUG: No se encontró cliente en Algolia para '{normalized_search}'")
                     
@@ -2371,43 +2710,13 @@ class AppState(rx.State):
             try:
                 print(f"🔍 DEBUG: Buscando en Firestore sin filtro de área...")
                 
-                # Búsqueda exacta normalizada en Firestore
-                all_clients = firestore_api.get_clients(area=None, limit=500)  # Sin filtro de área
-                print(f"🔍 DEBUG: Obtenidos {len(all_clients)} clientes de Firestore para comparar")
-                
-                if all_clients:
-                    # Buscar coincidencia exacta normalizada
-                    for client in all_clients:
-                        if not client.razonsocial:
-                            continue
-                            
-                        client_normalized = self._normalize_company_name(client.razonsocial)
-                        if client_normalized == normalized_search:
-                            print(f"✅ DEBUG: Cliente encontrado exacto en Firestore: '{client.razonsocial}' (normalizado: '{client_normalized}')")
-                            return client
-                    
-                    # Si no hay coincidencia exacta, buscar por similitud alta
-                    import difflib
-                    best_client = None
-                    best_similarity = 0.0
-                    
-                    for client in all_clients:
-                        if not client.razonsocial:
-                            continue
-                            
-                        client_normalized = self._normalize_company_name(client.razonsocial)
-                        if not client_normalized:
-                            continue
-                            
-                        similarity = difflib.SequenceMatcher(None, normalized_search, client_normalized).ratio()
-                        
-                        if similarity > best_similarity and similarity >= 0.8:  # Alta similitud
-                            best_similarity = similarity
-                            best_client = client
-                            print(f"🔍 DEBUG: Candidato Firestore: '{client.razonsocial}' → similitud: {similarity:.3f}")
-                    
-                    if best_client:
-                        print(f"✅ DEBUG: Cliente encontrado por similitud en Firestore: '{best_client.razonsocial}' (similitud: {best_similarity:.3f})")
+                # Índice de razones sociales (exacta normalizada y luego similitud alta, sin filtro de área)
+                index = await asyncio.to_thread(firestore_api.get_client_name_index)
+                if index is not None:
+                    matches = index.match(client_name, similarity_threshold=0.8, word_similarity=False, limit=1)
+                    if matches:
+                        best_client, best_similarity = matches[0]
+                        print(f"✅ DEBUG: Cliente encontrado en Firestore: '{best_client.razonsocial}' (similitud: {best_similarity:.3f})")
                         return best_client
                 
                 print(f"⚠️  DEBUG: No se encontró cliente en Firestore para '{normalized_search}'")
@@ -2425,86 +2734,49 @@ class AppState(rx.State):
             traceback.print_exc()
             return None
     
-    async def _save_cotizacion_detalle_to_firestore(self, extracted_data: dict, client_found):
+    async def _save_cotizacion_detalle_to_firestore(self, cotizacion_id: str, extracted_data: dict, client_data: dict,
+                                                    familias: list, trabajos: list, productos: list):
         """
-        Guarda los datos procesados de la cotización en Firestore usando save_cotizacion_detalle
+        Guarda los datos procesados de la cotización en Firestore usando save_cotizacion_detalle.
+        No lee el estado (se llama fuera del lock) y la escritura corre en un hilo.
         """
-        if not self.cotizacion_detalle.id:
+        if not cotizacion_id:
             print("⚠️  No se puede guardar: ID de cotización no disponible")
             return
             
         try:
-            print(f"💾 Guardando datos procesados de cotización {self.cotizacion_detalle.id}...")
-            
-            # Preparar datos del cliente
-            client_data = {}
-            if client_found:
-                client_data = {
-                    "id": client_found.id,
-                    "razonsocial": client_found.razonsocial,
-                    "consultora": getattr(client_found, 'consultora', ''),
-                    "email_cotizacion": getattr(client_found, 'email_cotizacion', ''),
-                    "area": getattr(client_found, 'area', '')
-                }
-            else:
-                # Cliente temporal creado desde PDF
-                if hasattr(self, 'cotizacion_detalle_client') and self.cotizacion_detalle_client:
-                    client_data = {
-                        "id": "",
-                        "razonsocial": self.cotizacion_detalle_client.razonsocial,
-                        "consultora": getattr(self.cotizacion_detalle_client, 'consultora', ''),
-                        "email_cotizacion": getattr(self.cotizacion_detalle_client, 'email_cotizacion', ''),
-                        "area": ""
-                    }
+            print(f"💾 Guardando datos procesados de cotización {cotizacion_id}...")
             
             # Preparar lista de familias
             familias_data = []
-            if hasattr(self.cotizacion_detalle, 'familys') and self.cotizacion_detalle.familys:
-                for fam in self.cotizacion_detalle.familys:
-                    if hasattr(fam, '__dict__'):
-                        familias_data.append({
-                            "id": getattr(fam, 'id', ''),
-                            "family": getattr(fam, 'family', ''),
-                            "product": getattr(fam, 'product', ''),
-                            "client": getattr(fam, 'client', ''),
-                            "client_id": getattr(fam, 'client_id', ''),
-                            "area": getattr(fam, 'area', ''),
-                            "status": getattr(fam, 'status', '')
-                        })
-            
-            # Preparar lista de trabajos
-            trabajos_data = []
-            if hasattr(self, 'cotizacion_detalle_trabajos') and self.cotizacion_detalle_trabajos:
-                trabajos_data = self.cotizacion_detalle_trabajos
-            
-            # Preparar lista de productos (si existe)
-            productos_data = []
-            if hasattr(self, 'cotizacion_detalle_productos') and self.cotizacion_detalle_productos:
-                productos_data = self.cotizacion_detalle_productos
-            
-            # Preparar metadata
-            metadata = extracted_data.get("metadata", {})
-            
-            # Preparar tablas
-            tablas = extracted_data.get("tablas", [])
-            
-            # Preparar condiciones
-            condiciones = extracted_data.get("condiciones", "")
+            for fam in familias or []:
+                if hasattr(fam, '__dict__'):
+                    familias_data.append({
+                        "id": getattr(fam, 'id', ''),
+                        "family": getattr(fam, 'family', ''),
+                        "product": getattr(fam, 'product', ''),
+                        "client": getattr(fam, 'client', ''),
+                        "client_id": getattr(fam, 'client_id', ''),
+                        "area": getattr(fam, 'area', ''),
+                        "status": getattr(fam, 'status', '')
+                    })
             
             # Llamar a la función de firestore_api para guardar
-            success = firestore_api.save_cotizacion_detalle(
-                cotizacion_id=self.cotizacion_detalle.id,
+            success = await asyncio.to_thread(
+                firestore_api.save_cotizacion_detalle,
+                cotizacion_id=cotizacion_id,
                 client_data=client_data,
                 familias=familias_data,
-                trabajos=trabajos_data,
-                productos=productos_data,
-                metadata=metadata,
-                tables=tablas,
-                condiciones=condiciones
+                trabajos=trabajos or [],
+                productos=productos or [],
+                metadata=extracted_data.get("metadata", {}),
+                tables=extracted_data.get("tablas", []),
+                condiciones=extracted_data.get("condiciones", ""),
+                extractor_version=cotizacion_extractor.EXTRACTOR_VERSION
             )
             
             if success:
-                print(f"✅ Datos procesados guardados exitosamente en cotizaciones/{self.cotizacion_detalle.id}/detalle")
+                print(f"✅ Datos procesados guardados exitosamente en cotizaciones/{cotizacion_id}/detalle")
             else:
                 print(f"❌ Error al guardar datos procesados")
                 
@@ -183,6 +183,34 @@ def table_link_cell(content, url, compact_mode=True):
 
 def search_bar_component(placeholder, search_term, on_change, on_search):
     """Componente reutilizable para la barra de búsqueda"""
+    return rx.vstack(
+        search_input_component(placeholder, search_term, on_change, on_search),
+        # Sugerencias mientras se escribe: al elegir una se busca ese texto
+        rx.cond(
+            AppState.search_suggestions,
+            rx.hstack(
+                rx.foreach(
+                    AppState.search_suggestions,
+                    lambda suggestion: rx.badge(
+                        suggestion,
+                        on_click=AppState.select_search_suggestion(suggestion),
+                        variant="soft",
+                        color_scheme="gray",
+                        cursor="pointer",
+                    ),
+                ),
+                wrap="wrap",
+                spacing="1",
+                max_width="400px",
+            ),
+            rx.fragment(),
+        ),
+        spacing="1",
+        margin_bottom="20px",
+    )
+
+def search_input_component(placeholder, search_term, on_change, on_search):
+    """Campo de búsqueda y botón Buscar"""
     return rx.hstack(
         rx.input(
             placeholder=placeholder,
@@ -217,7 +245,6 @@ def search_bar_component(placeholder, search_term, on_change, on_search):
         ),
         widhth="50%",
         spacing="2",
-        margin_bottom="20px",
     )
 
 def select_rol():
@@ -112,11 +112,16 @@ def completar_con_ceros(cadena, longitud):
     return str(cadena).zfill(longitud)
 
 
+# Campos sobre los que se busca localmente (recorrido en buscar_* e índice en api/search_index)
+FAMS_SEARCH_FIELDS = ["client", "product", "family", "origen"]
+COTS_SEARCH_FIELDS = ["client", "num", "year", "status", "id", "ot", "nombre", "email"]
+CERTS_SEARCH_FIELDS = ["client", "num", "year", "status"]
+
 def buscar_fams(fams, query: str):
     query = query.lower()
     return [
         f for f in fams
-        if any(query in getattr(f, campo, "").lower() for campo in ["client", "product", "family", "origen"])
+        if any(query in getattr(f, campo, "").lower() for campo in FAMS_SEARCH_FIELDS)
     ]
 
 def buscar_cots(cots, query: str):
@@ -124,7 +129,7 @@ def buscar_cots(cots, query: str):
     return [
         cotizacion for cotizacion in cots
         if any(query_lower in str(getattr(cotizacion, field, '')).lower() 
-               for field in ["client", "num", "year", "status", "id", "ot", "nombre", "email"])
+               for field in COTS_SEARCH_FIELDS)
     ]
 
 def format_date(date_str: str) -> str:
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""Extract the PDF detail of every quote that does not have an up-to-date one.
+
+Streams `cotizaciones` ordered by document id (reading only `drive_file_id`,
+`area` and the version fields of `detalle`) and picks the quotes that have a
+Drive file and either no `detalle` or one written by an older
+EXTRACTOR_VERSION (--missing-only skips the latter). PDFs are extracted in
+parallel by the same process pool the app uses (bounded workers, per-PDF
+timeout and memory limit, shared on-disk extraction cache). Client and
+familia matching mirror the quote detail page. Results are written with
+FirestoreAPI.save_cotizacion_detalles in batches of --write-batch, which also
+indexes them in Algolia.
+
+Progress is checkpointed after every written batch (last quote id plus the
+quotes that failed), so an interrupted run continues where it stopped with
+--resume. Failed quotes are skipped on resume unless --retry-failed is given.
+
+Usage:
+  source .venv/bin/activate
+  python scripts/backfill_cotizacion_detalle.py --workers 4
+  python scripts/backfill_cotizacion_detalle.py --resume
+  python scripts/backfill_cotizacion_detalle.py --missing-only --limit 200 --dry-run
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_prueba_3.api.cotizacion_extractor import EXTRACTOR_VERSION  # noqa: E402
+from app_prueba_3.api.extraction_worker import ExtractionPool  # noqa: E402
+
+# firestore_api is imported inside main(): the extraction workers are spawned
+# processes that re-import this script, and they must not initialize Firebase.
+
+SELECT_FIELDS = ["drive_file_id", "area", "detalle.version", "detalle.extractor_version"]
+
+
+def load_checkpoint(path: Path) -> dict:
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return {}
+
+
+def save_checkpoint(path: Path, checkpoint: dict):
+    # Write-then-rename so a crash never leaves a truncated checkpoint
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(checkpoint, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def needs_detalle(data: dict, missing_only: bool) -> bool:
+    if not data.get("drive_file_id"):
+        return False
+    detalle = data.get("detalle")
+    if not detalle:
+        return True
+    return not missing_only and (detalle.get("extractor_version") or 0) < EXTRACTOR_VERSION
+
+
+def read_page(db, start_after_id: str, page_size: int) -> list:
+    """One page of quotes (only SELECT_FIELDS) ordered by id, starting after `start_after_id`."""
+    query = db.collection("cotizaciones").select(SELECT_FIELDS).order_by("__name__").limit(page_size)
+    if start_after_id:
+        query = query.start_after({"__name__": start_after_id})
+    return list(query.get())
+
+
+async def stream_candidates(db, start_after_id: str, page_size: int, missing_only: bool):
+    """Yield (id, data) of the quotes that need a detalle, ordered by id, starting after `start_after_id`.
+
+    Pages are read in a thread so the extractions in flight keep being collected meanwhile.
+    """
+    last_id = start_after_id
+    while True:
+        docs = await asyncio.to_thread(read_page, db, last_id, page_size)
+        for doc in docs:
+            data = doc.to_dict() or {}
+            if needs_detalle(data, missing_only):
+                yield doc.id, data
+        if len(docs) < page_size:
+            return
+        last_id = docs[-1].id
+
+
+def match_familias(familias_pdf: list, fams_cliente: list, client_name: str, client, area: str) -> list:
+    """Same matching as the quote detail page: by code, then by product description, else temporary familias."""
+    fams_by_code = {}
+    fams_by_product = []
+    for fam in fams_cliente:
+        code_norm = (fam.family or "").strip().upper()
+        if code_norm:
+            fams_by_code[code_norm] = fam
+        if fam.product:
+            fams_by_product.append(fam)
+
+    matched, matched_ids = [], set()
+    for item in familias_pdf:
+        code = (item.get("code") or "").strip().upper()
+        desc = (item.get("description") or "").strip().lower()
+        fam_match = fams_by_code.get(code) if code else None
+        if fam_match is None:
+            for fam in fams_by_product:
+                prod = (fam.product or "").strip().lower()
+                if prod and desc and (desc in prod or prod in desc):
+                    fam_match = fam
+                    break
+        if fam_match is not None and fam_match.id not in matched_ids:
+            matched_ids.add(fam_match.id)
+            matched.append({
+                "id": fam_match.id,
+                "family": fam_match.family,
+                "product": fam_match.product,
+                "client": fam_match.client,
+                "client_id": fam_match.client_id,
+                "area": fam_match.area,
+                "status": fam_match.status,
+            })
+
+    if not matched:
+        matched = [{
+            "id": "",
+            "family": (item.get("code") or "").strip(),
+            "product": (item.get("description") or "").strip(),
+            "client": client_name,
+            "client_id": client.id if client else "",
+            "area": area or "",
+            "status": "TEMPORAL",
+        } for item in familias_pdf]
+    return matched
+
+
+def build_detalle(firestore_api, cot_id: str, cot: dict, data: dict, client_index, fams_cache: dict) -> dict:
+    """Arguments for save_cotizacion_detalle from one extraction result."""
+    meta = data.get("metadata", {}) or {}
+    client_name = (meta.get("empresa") or "").strip()
+
+    client = None
+    if client_name and client_index is not None:
+        matches = client_index.match(client_name, similarity_threshold=0.8, word_similarity=False, limit=1)
+        client = matches[0][0] if matches else None
+
+    if client:
+        client_data = {
+            "id": client.id,
+            "razonsocial": client.razonsocial,
+            "consultora": getattr(client, "consultora", ""),
+            "email_cotizacion": getattr(client, "email_cotizacion", ""),
+            "area": getattr(client, "area", ""),
+        }
+        if client.id not in fams_cache:
+            fams_cache[client.id] = firestore_api.get_fams(
+                area=None, order_by="razonsocial", limit=500, filter=[("client_id", "==", client.id)]
+            )
+        fams_cliente = fams_cache[client.id]
+    else:
+        client_data = {
+            "id": "",
+            "razonsocial": client_name,
+            "consultora": meta.get("consultora", "") or "",
+            "email_cotizacion": meta.get("mail_receptor", "") or "",
+            "area": "",
+        }
+        fams_cliente = []
+
+    return {
+        "cotizacion_id": cot_id,
+        "client_data": client_data,
+        "familias": match_familias(data.get("familias", []) or [], fams_cliente, client_name, client, cot.get("area", "")),
+        "trabajos": [],
+        "productos": [],
+        "metadata": meta,
+        "tables": data.get("tablas", []),
+        "condiciones": data.get("condiciones", ""),
+        "extractor_version": EXTRACTOR_VERSION,
+    }
+
+
+async def backfill(args, firestore_api, checkpoint: dict, checkpoint_path: Path):
+    pool = ExtractionPool(max_workers=args.workers, timeout=args.timeout, memory_mb=args.memory_mb)
+    client_index = await asyncio.to_thread(firestore_api.get_client_name_index)
+    if client_index is None:
+        print("⚠️  Client index unavailable; quotes will be saved with unmatched clients.")
+    fams_cache = {}
+    failed = checkpoint.setdefault("failed", {})
+    stats = {"queued": 0, "written": 0, "failed": 0}
+    started = time.perf_counter()
+
+    async def process(cot_id: str, cot: dict) -> dict:
+        data = await pool.extract(cot["drive_file_id"])
+        return await asyncio.to_thread(build_detalle, firestore_api, cot_id, cot, data, client_index, fams_cache)
+
+    in_flight = deque()  # (id, task), in enumeration order
+    buffer = []
+    # Quotes written by this version no longer match, so retrying failures rescans from the start
+    cursor = "" if args.retry_failed else checkpoint.get("last_id", "")
+
+    async def flush():
+        nonlocal buffer
+        if buffer and not args.dry_run:
+            written = await asyncio.to_thread(firestore_api.save_cotizacion_detalles, buffer, args.write_batch)
+            if written < len(buffer):
+                raise RuntimeError(f"only {written} of {len(buffer)} quotes were written")
+            stats["written"] += written
+        buffer = []
+        checkpoint["last_id"] = cursor
+        if not args.dry_run:
+            save_checkpoint(checkpoint_path, checkpoint)
+        elapsed = time.perf_counter() - started
+        print(f"  {stats['written']} written, {stats['failed']} failed, {len(in_flight)} in flight "
+              f"({elapsed:.0f}s, {stats['written'] / max(elapsed, 1e-9):.2f} quotes/s)")
+
+    async def complete_oldest():
+        nonlocal cursor
+        cot_id, task = in_flight.popleft()
+        try:
+            buffer.append(await task)
+            failed.pop(cot_id, None)
+        except Exception as e:
+            stats["failed"] += 1
+            failed[cot_id] = str(e) or type(e).__name__
+            print(f"❌ {cot_id}: {failed[cot_id]}")
+            # Record the failure right away; the cursor only advances with the next flush
+            if not args.dry_run:
+                save_checkpoint(checkpoint_path, checkpoint)
+        cursor = cot_id
+        if len(buffer) >= args.write_batch:
+            await flush()
+
+    try:
+        async for cot_id, cot in stream_candidates(firestore_api.db, cursor, args.page_size, args.missing_only):
+            if cot_id in failed and not args.retry_failed:
+                continue
+            if args.limit and stats["queued"] >= args.limit:
+                break
+            stats["queued"] += 1
+            if args.dry_run:
+                print(f"  {cot_id}: {cot['drive_file_id']}")
+                continue
+            in_flight.append((cot_id, asyncio.create_task(process(cot_id, cot))))
+            # Keep every worker busy without reading the whole archive into memory
+            while len(in_flight) >= args.workers * 2 or (in_flight and in_flight[0][1].done()):
+                await complete_oldest()
+        while in_flight:
+            await complete_oldest()
+        await flush()
+    finally:
+        for _, task in in_flight:
+            task.cancel()
+        pool.shutdown()
+        firestore_api.close_live_indexes()
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4, help="PDFs extracted in parallel")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds allowed per PDF")
+    parser.add_argument("--memory-mb", type=int, default=2048, help="Memory limit per extraction process")
+    parser.add_argument("--write-batch", type=int, default=50, help="Quotes per Firestore write batch")
+    parser.add_argument("--page-size", type=int, default=300, help="Quotes per Firestore read")
+    parser.add_argument("--missing-only", action="store_true",
+                        help="Only quotes without any detalle (skip the ones from older extractor versions)")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many quotes (0 = no limit)")
+    parser.add_argument("--checkpoint", default=".cotizacion_detalle_backfill.json", help="Checkpoint file path")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint instead of starting over")
+    parser.add_argument("--retry-failed", action="store_true", help="On resume, retry the quotes that failed before")
+    parser.add_argument("--dry-run", action="store_true", help="List the quotes that would be extracted")
+    args = parser.parse_args()
+
+    from app_prueba_3.api.firestore_api import firestore_api
+
+    if not firestore_api.firebase_initialized:
+        print("Firebase is not initialized; check the service account configuration.")
+        sys.exit(1)
+
+    checkpoint_path = Path(args.checkpoint)
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else {}
+    if checkpoint.get("extractor_version", EXTRACTOR_VERSION) != EXTRACTOR_VERSION:
+        print("Checkpoint was written by another extractor version; starting over.")
+        checkpoint = {}
+    checkpoint["extractor_version"] = EXTRACTOR_VERSION
+    if checkpoint.get("last_id"):
+        print(f"Resuming after {checkpoint['last_id']} ({len(checkpoint.get('failed', {}))} failed so far)")
+
+    started = time.perf_counter()
+    try:
+        stats = asyncio.run(backfill(args, firestore_api, checkpoint, checkpoint_path))
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; run again with --resume to continue from {checkpoint.get('last_id') or 'the start'}.")
+        sys.exit(130)
+    except Exception as e:
+        print(f"❌ {e}")
+        print(f"Run again with --resume to continue from {checkpoint.get('last_id') or 'the start'}.")
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - started
+    if args.dry_run:
+        print(f"{stats['queued']} quotes need a detalle (dry run)")
+        return
+    print(f"✅ {stats['written']} quotes written, {stats['failed']} failed in {elapsed:.1f}s")
+    if checkpoint.get("failed"):
+        print(f"{len(checkpoint['failed'])} quotes failed; see {checkpoint_path} and run with --resume --retry-failed.")
+    elif checkpoint_path.exists():
+        checkpoint_path.unlink()
+        print("Backfill complete; checkpoint removed.")
+
+
+if __name__ == "__main__":
+    main()
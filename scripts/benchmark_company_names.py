@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Benchmark company-name normalization (shared normalizer vs. the previous one).
+
+Normalizes a client list with the previous per-call implementation (one
+uncompiled re.sub per society suffix) and with app_prueba_3/api/company_names.py
+(compiled patterns, combined suffix check, memoization), checks that both give
+the same output for every name and prints names/second for each.
+
+Names come from, in order of preference:
+  --names-file   a text file with one razón social per line
+  --firestore    the 'clientes' collection (needs the Firebase credentials)
+  otherwise      a synthetic list
+
+Usage:
+  source .venv/bin/activate
+  python scripts/benchmark_company_names.py --firestore --repeat 5
+  python scripts/benchmark_company_names.py --names-file clientes.txt
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_prueba_3.api.company_names import (  # noqa: E402
+    normalize_company_name,
+    normalize_many,
+    clear_cache,
+)
+
+
+def legacy_normalize_company_name(name: str) -> str:
+    if not name:
+        return ""
+
+    normalized = name.upper().strip()
+    normalized = re.sub(r'[.,;:\-_()[\]{}"]', ' ', normalized)
+    normalized = re.sub(r'\s+', ' ', normalized).strip()
+
+    society_endings = [
+        'SOCIEDAD ANONIMA',
+        'S\\.?A\\.?$',
+        'S\\s+A$',
+        'SOCIEDAD DE RESPONSABILIDAD LIMITADA',
+        'S\\.?R\\.?L\\.?$',
+        'S\\s+R\\s+L$',
+        'CENTRO INTEGRAL DE COMERCIALIZACION SOCIEDAD ANONIMA',
+        'CICSA',
+        'S\\.?H\\.?$',
+        'S\\s+H$',
+        'S\\.?A\\.?S\\.?$',
+        'LTD',
+        'S\\.?A\\.?I\\.?C\\.?A\\.?I\\.?$',
+        'S\\.?A\\.?I\\.?C\\s+Y\\s+F\\.?$',
+        'SAICYF$',
+        'S\\.?A\\.?I\\.?C\\.?YF\\.?$'
+    ]
+
+    for ending in society_endings:
+        pattern = f'\\s*{ending}\\s*$'
+        normalized = re.sub(pattern, '', normalized, flags=re.IGNORECASE)
+        normalized = normalized.strip()
+
+    return normalized
+
+
+def synthetic_names(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    words = ["Acme", "Industrias", "Metalúrgica", "del Sur", "Norte", "Luminarias", "Electro",
+             "Tecno", "Argentina", "Plast", "Química", "Grupo", "Servicios", "Hnos.", "(Rosario)"]
+    suffixes = ["S.A.", "SA", "S. A.", "S.R.L.", "SRL", "S A", "SAS", "S.H.", "SAICYF", "S.A.I.C. y F.",
+                "Sociedad Anónima", "LTD", "", "", ""]
+    # Un cliente aparece varias veces (cotizaciones, familias, hits de Algolia)
+    unique = [f"{' '.join(rng.sample(words, rng.randint(1, 3)))} {i} {rng.choice(suffixes)}"
+              for i in range(max(1, count // 4))]
+    return [rng.choice(unique) for _ in range(count)]
+
+
+def firestore_names() -> list:
+    from app_prueba_3.api.firestore_api import firestore_api
+    return [client.razonsocial for client in firestore_api.get_clients(limit=0)]
+
+
+def bench(name: str, fn, names: list, repeat: int, before=None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn(names)
+        best = min(best, time.perf_counter() - start)
+    print(f"  {name:<18} {best * 1000:8.1f} ms   {len(names) / best:12,.0f} names/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names-file", help="Text file with one company name per line")
+    parser.add_argument("--firestore", action="store_true", help="Read the names from the 'clientes' collection")
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic names when no source is given")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per implementation (best time is reported)")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    if args.names_file:
+        names = Path(args.names_file).read_text(encoding="utf-8").splitlines()
+    elif args.firestore:
+        names = firestore_names()
+    else:
+        names = synthetic_names(args.rows, args.seed)
+
+    clear_cache()
+    batched = normalize_many(names)
+    mismatches = [n for n, b in zip(names, batched)
+                  if legacy_normalize_company_name(n) != normalize_company_name(n) or normalize_company_name(n) != b]
+    if mismatches:
+        sample = mismatches[0]
+        print(f"❌ {len(mismatches)} names differ, e.g. {sample!r}: "
+              f"{legacy_normalize_company_name(sample)!r} != {normalize_company_name(sample)!r}")
+        sys.exit(1)
+    print(f"{len(names)} names ({len(set(names))} distinct), identical output")
+
+    t_legacy = bench("legacy", lambda ns: [legacy_normalize_company_name(n) for n in ns], names, args.repeat)
+    t_cold = bench("shared (cold)", lambda ns: [normalize_company_name(n) for n in ns], names, args.repeat, before=clear_cache)
+    t_warm = bench("shared (memo)", lambda ns: [normalize_company_name(n) for n in ns], names, args.repeat)
+    t_many = bench("normalize_many", normalize_many, names, args.repeat, before=clear_cache)
+    print(f"  speedup cold {t_legacy / t_cold:6.1f}x   memo {t_legacy / t_warm:6.1f}x   batch {t_legacy / t_many:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Benchmark document -> model conversion (compiled mappers vs. hand-built models).
+
+Builds N synthetic Firestore/Algolia documents and converts them with the
+previous hand-written constructors (pydantic-validated) and with the mappers
+compiled from app_prueba_3/api/model_mapping.py. Checks that both produce the
+same models and prints rows/second for each.
+
+Usage:
+  source .venv/bin/activate
+  python scripts/benchmark_model_mappers.py --rows 10000 --repeat 5
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_prueba_3.utils import Cot, Fam, Model, Client, completar_con_ceros  # noqa: E402
+from app_prueba_3.api.model_mapping import (  # noqa: E402
+    firestore_to_cot,
+    firestore_to_fam,
+    firestore_to_client,
+    algolia_to_cot,
+    timestamp_to_date,
+)
+
+
+def legacy_firestore_to_cot(cot: dict) -> Cot:
+    return Cot(
+        id=cot.get("id", ""),
+        area=cot.get("area", ""),
+        num=completar_con_ceros(cot.get("number", ""), 4),
+        year=completar_con_ceros(cot.get("year", ""), 2),
+        client=cot.get("razonsocial", ""),
+        client_id=cot["client"] if "client" in cot and cot["client"] is not None and isinstance(cot["client"], str) else "",
+        issuedate=cot.get("issuedate", ""),
+        issuedate_timestamp=cot.get("issuedate_timestamp", 0.0),
+        status=cot.get("estado", "") if cot.get("estado") is not None else "",
+        aprueba=cot.get("aprueba", "") if cot.get("aprueba") is not None else "",
+        drive_file_id=cot.get("drive_file_id", "") if cot.get("drive_file_id") is not None else "",
+        drive_file_id_name=cot.get("drive_file_id_name", "") if cot.get("drive_file_id_name") is not None else "",
+        drive_aprobacion_id=cot.get("drive_aprobacion_id", "") if cot.get("drive_aprobacion_id") is not None else "",
+        drive_aceptacion_id=cot.get("drive_aceptacion_id", "") if cot.get("drive_aceptacion_id") is not None else "",
+        enviada_fecha=cot.get("enviada_fecha", "") if cot.get("enviada_fecha") is not None else "",
+        facturada_fecha=cot.get("facturada_fecha", "") if cot.get("facturada_fecha") is not None else "",
+        facturar=cot.get("facturar", "") if cot.get("facturar") is not None else "",
+        nombre=cot.get("nombre", "") if cot.get("nombre") is not None else "",
+        email=cot.get("mail", "") if cot.get("mail") is not None else "",
+        ot=cot.get("op", "") if cot.get("op") is not None else "",
+        rev=cot.get("rev", "") if cot.get("rev") is not None else "",
+        resolucion=cot.get("resolucion", "") if cot.get("resolucion") is not None else "",
+        cuenta=cot.get("cuenta", "") if cot.get("cuenta") is not None else "",
+    )
+
+
+def legacy_firestore_to_fam(fam: dict) -> Fam:
+    return Fam(
+        id=fam.get("id", ""),
+        area=fam.get("area", ""),
+        family=fam.get("family", ""),
+        product=fam.get("product", ""),
+        origen=fam.get("origen", ""),
+        expirationdate=fam.get("expirationdate", ""),
+        vigencia=fam.get("vigencia", ""),
+        client=fam.get("razonsocial", ""),
+        client_id=fam["client"] if "client" in fam and fam["client"] is not None and isinstance(fam["client"], str) else "",
+        system=fam.get("system", "") if fam.get("system") is not None else "",
+        status=fam.get("status", "") if fam.get("status") is not None else "",
+        models=[Model()],
+        rubro=fam["rubro"] if "rubro" in fam and fam["rubro"] is not None else "",
+        subrubro=fam["subrubro"] if "subrubro" in fam and fam["subrubro"] is not None else ""
+    )
+
+
+def legacy_firestore_to_client(data: dict) -> Client:
+    return Client(
+        id=data.get('id', ''),
+        razonsocial=data.get('razonsocial', ''),
+        cuit=data.get('cuit', ''),
+        direccion=data.get('direccion', ''),
+        phone=data.get('phone', ''),
+        email_cotizacion=data.get('email_cotizacion', ''),
+        active_fams=data.get('active_fams', 0),
+        condiciones=data.get('condiciones', ''),
+        consultora=data.get('consultora', ''),
+    )
+
+
+def legacy_algolia_to_cot(hit: dict) -> Cot:
+    return Cot(
+        id=hit.get('object_id', ''),
+        num=completar_con_ceros(hit.get('number', ''), 4),
+        year=completar_con_ceros(hit.get('year', ''), 2),
+        client=hit.get('razonsocial', ''),
+        client_id=hit.get('client', ''),
+        consultora=hit.get('consultora', ''),
+        issuedate=hit.get('issuedate', ''),
+        issuedate_timestamp=hit.get('issuedate_timestamp', 0),
+        status=hit.get('estado', ''),
+        area=hit.get('area', ''),
+        drive_file_id=hit.get('drive_file_id', ''),
+        drive_file_id_name=hit.get('drive_file_id_name', ''),
+        drive_aprobacion_id=hit.get('drive_aprobacion_id', ''),
+        drive_aceptacion_id=hit.get('drive_aceptacion_id', ''),
+        enviada_fecha=timestamp_to_date(hit.get('enviada_fecha', '')),
+        facturada_fecha=timestamp_to_date(hit.get('facturada_fecha', '')),
+        facturar=hit.get('facturar', ''),
+        nombre=hit.get('nombre', ''),
+        email=hit.get('email', ''),
+        ot=hit.get('ot', ''),
+        rev=hit.get('rev', ''),
+        resolucion=hit.get('resolucion', ''),
+        cuenta=hit.get('cuenta', '')
+    )
+
+
+def make_cot_doc(i: int, rng: random.Random) -> dict:
+    return {
+        "id": f"cot{i:06d}",
+        "area": rng.choice(["HGGSLLi2VCJaBtK0w794", "A2", "A3"]),
+        "number": rng.randint(1, 9999),
+        "year": rng.randint(20, 25),
+        "razonsocial": f"EMPRESA {i % 500} S.A.",
+        "client": f"client{i % 500}",
+        "issuedate": "2024-05-01",
+        "issuedate_timestamp": 1714521600.0 + i,
+        "estado": rng.choice(["enviada", "aprobada", None]),
+        "aprueba": None,
+        "drive_file_id": f"drive{i}",
+        "enviada_fecha": "2024-05-02",
+        "facturar": "",
+        "nombre": "Juan Pérez",
+        "mail": "compras@example.com",
+        "op": str(i),
+        "rev": "0",
+        "detalle": {"tablas": [["x"] * 8] * 20},
+    }
+
+
+def make_fam_doc(i: int, rng: random.Random) -> dict:
+    return {
+        "id": f"fam{i:06d}",
+        "area": "HGGSLLi2VCJaBtK0w794",
+        "family": f"F-{i}",
+        "product": "Luminaria LED",
+        "origen": rng.choice(["China", "Argentina"]),
+        "expirationdate": "2026-01-01",
+        "vigencia": "1 año",
+        "razonsocial": f"EMPRESA {i % 500} S.A.",
+        "client": f"client{i % 500}",
+        "system": None,
+        "status": "activa",
+        "rubro": None,
+        "subrubro": "Iluminación",
+    }
+
+
+def make_client_doc(i: int, rng: random.Random) -> dict:
+    return {
+        "id": f"client{i:06d}",
+        "razonsocial": f"EMPRESA {i} S.A.",
+        "cuit": f"30-{i:08d}-1",
+        "direccion": "Av. Siempre Viva 742",
+        "phone": "011-5555-5555",
+        "email_cotizacion": "compras@example.com",
+        "active_fams": rng.randint(0, 40),
+        "condiciones": "",
+        "consultora": "",
+    }
+
+
+def make_cot_hit(i: int, rng: random.Random) -> dict:
+    doc = make_cot_doc(i, rng)
+    doc["object_id"] = doc.pop("id")
+    doc["estado"] = doc["estado"] or ""
+    doc.pop("aprueba")
+    doc["email"] = doc.pop("mail")
+    doc["ot"] = doc.pop("op")
+    doc["enviada_fecha"] = 1714608000000
+    doc.pop("detalle")
+    return doc
+
+
+def bench(name: str, fn, docs: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in docs:
+            fn(doc)
+        best = min(best, time.perf_counter() - start)
+    rate = len(docs) / best
+    print(f"  {name:<10} {best * 1000:8.1f} ms   {rate:12,.0f} rows/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000, help="Documents per model")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per converter (best time is reported)")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = [
+        ("Cot (Firestore)", make_cot_doc, legacy_firestore_to_cot, firestore_to_cot),
+        ("Fam (Firestore)", make_fam_doc, legacy_firestore_to_fam, firestore_to_fam),
+        ("Client (Firestore)", make_client_doc, legacy_firestore_to_client, firestore_to_client),
+        ("Cot (Algolia)", make_cot_hit, legacy_algolia_to_cot, algolia_to_cot),
+    ]
+
+    for title, make_doc, legacy, compiled in cases:
+        docs = [make_doc(i, rng) for i in range(args.rows)]
+
+        mismatches = [d for d in docs if legacy(d).dict() != compiled(d).dict()]
+        if mismatches:
+            print(f"❌ {title}: {len(mismatches)} documents differ, e.g. {mismatches[0]}")
+            sys.exit(1)
+
+        print(f"{title}: {len(docs)} documents, identical output")
+        t_legacy = bench("legacy", legacy, docs, args.repeat)
+        t_compiled = bench("compiled", compiled, docs, args.repeat)
+        print(f"  speedup    {t_legacy / t_compiled:8.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
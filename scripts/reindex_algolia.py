@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Rebuild the Algolia indexes from Firestore.
+
+Streams `cotizaciones`, `certificados`, `familias` and `clientes` ordered by
+document id, converts every document with the firestore_to_* mappers and the
+*_to_algolia converters and sends the records in batches. Up to --concurrency
+batches are in flight at once, and each one waits for its Algolia task to be
+published before counting as done.
+
+Progress is checkpointed after every completed batch (last document id per
+collection), so an interrupted run continues where it stopped with --resume.
+
+With --swap each collection is written into `<index>_reindex_tmp` (deleted
+first when the collection starts from scratch, then given the live index
+settings, synonyms and rules) and then moved over the live index in one
+atomic operation. The result is an exact mirror of Firestore, including
+deletions. Without --swap records are upserted into the
+live index and records of deleted documents are left in place.
+
+Usage:
+  source .venv/bin/activate
+  python scripts/reindex_algolia.py --swap
+  python scripts/reindex_algolia.py --collections cotizaciones clientes --resume
+  python scripts/reindex_algolia.py --dry-run
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_prueba_3.api.firestore_api import firestore_api  # noqa: E402
+from app_prueba_3.api.algolia_api import algolia_api  # noqa: E402
+from app_prueba_3.api.algolia_utils import ALGOLIA_COLLECTIONS as COLLECTIONS  # noqa: E402
+
+TMP_SUFFIX = "_reindex_tmp"
+
+
+def load_checkpoint(path: Path) -> dict:
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return {}
+
+
+def save_checkpoint(path: Path, checkpoint: dict):
+    # Write-then-rename so a crash never leaves a truncated checkpoint
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(checkpoint, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def stream_documents(db, collection: str, start_after_id: str, page_size: int):
+    """Yield the documents of `collection` ordered by id, starting after `start_after_id`."""
+    last_id = start_after_id
+    while True:
+        query = db.collection(collection).order_by("__name__").limit(page_size)
+        if last_id:
+            query = query.start_after({"__name__": last_id})
+        docs = query.get()
+        for doc in docs:
+            yield doc
+        if len(docs) < page_size:
+            return
+        last_id = docs[-1].id
+
+
+def send_batch(client, index_name: str, records: list) -> int:
+    """Send one batch and block until Algolia has published it."""
+    response = client.batch(
+        index_name=index_name,
+        batch_write_params={"requests": [{"action": "addObject", "body": record} for record in records]},
+    )
+    client.wait_for_task(index_name=index_name, task_id=response.task_id)
+    return len(records)
+
+
+def reindex_collection(collection: str, state: dict, args, client, checkpoint: dict, checkpoint_path: Path):
+    to_model, to_record = COLLECTIONS[collection]
+    target = state["target"]
+    started = time.perf_counter()
+
+    if args.swap and not state["last_id"] and not args.dry_run:
+        # A scoped copy keeps the destination's records: drop what an aborted run left behind
+        print(f"  deleting '{target}' left by a previous run, if any")
+        response = client.delete_index(index_name=target)
+        client.wait_for_task(index_name=target, task_id=response.task_id)
+        print(f"  copying settings, synonyms and rules of '{collection}' into '{target}'")
+        response = client.operation_index(
+            collection,
+            {"operation": "copy", "destination": target, "scope": ["settings", "synonyms", "rules"]},
+        )
+        client.wait_for_task(index_name=collection, task_id=response.task_id)
+
+    def complete_oldest():
+        future, last_id = pending.popleft()
+        state["count"] += future.result()
+        state["last_id"] = last_id
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    pending = deque()  # (future, last document id of the batch), in submission order
+    batch, last_id = [], state["last_id"]
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for doc in stream_documents(firestore_api.db, collection, state["last_id"], args.page_size):
+            batch.append(to_record(to_model({"id": doc.id, **(doc.to_dict() or {})})))
+            last_id = doc.id
+            if len(batch) < args.batch_size:
+                continue
+
+            if args.dry_run:
+                state["count"] += len(batch)
+            else:
+                pending.append((pool.submit(send_batch, client, target, batch), last_id))
+                # Bounded concurrency; the checkpoint only advances over a contiguous prefix of finished batches
+                while len(pending) >= args.concurrency or (pending and pending[0][0].done()):
+                    complete_oldest()
+            batch = []
+
+        if batch:
+            if args.dry_run:
+                state["count"] += len(batch)
+            else:
+                pending.append((pool.submit(send_batch, client, target, batch), last_id))
+        while pending:
+            complete_oldest()
+
+    if args.swap and not args.dry_run:
+        print(f"  moving '{target}' over '{collection}'")
+        response = client.operation_index(target, {"operation": "move", "destination": collection})
+        client.wait_for_task(index_name=target, task_id=response.task_id)
+
+    state["done"] = True
+    if not args.dry_run:
+        save_checkpoint(checkpoint_path, checkpoint)
+        algolia_api.invalidate_search_cache(collection)
+    elapsed = time.perf_counter() - started
+    print(f"✅ {collection}: {state['count']} records in {elapsed:.1f}s" + (" (dry run)" if args.dry_run else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--collections", nargs="+", choices=list(COLLECTIONS), default=list(COLLECTIONS),
+                        help="Collections to reindex (default: all)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Records per Algolia batch (max 1000)")
+    parser.add_argument("--page-size", type=int, default=500, help="Documents per Firestore read")
+    parser.add_argument("--concurrency", type=int, default=4, help="Algolia batches in flight at once")
+    parser.add_argument("--swap", action="store_true", help="Build into a temporary index and move it over the live one")
+    parser.add_argument("--checkpoint", default=".algolia_reindex_checkpoint.json", help="Checkpoint file path")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint instead of starting over")
+    parser.add_argument("--dry-run", action="store_true", help="Read and convert documents without writing to Algolia")
+    args = parser.parse_args()
+
+    if not firestore_api.firebase_initialized:
+        print("Firebase is not initialized; check the service account configuration.")
+        sys.exit(1)
+    if not algolia_api.enabled and not args.dry_run:
+        print("Algolia is not configured; set ALGOLIA_APP_ID and ALGOLIA_API_KEY.")
+        sys.exit(1)
+
+    checkpoint_path = Path(args.checkpoint)
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else {}
+    client = None if args.dry_run else algolia_api.get_admin_client()
+
+    for collection in args.collections:
+        target = collection + TMP_SUFFIX if args.swap else collection
+        state = checkpoint.get(collection)
+        if state is None or state.get("target") != target:
+            # No progress for this collection, or it was started with a different --swap setting
+            state = {"target": target, "last_id": "", "count": 0, "done": False}
+            checkpoint[collection] = state
+        if state["done"]:
+            print(f"⏭️  {collection}: already reindexed ({state['count']} records)")
+            continue
+
+        print(f"🔄 {collection} -> '{target}'" + (f", resuming after {state['last_id']}" if state["last_id"] else ""))
+        try:
+            reindex_collection(collection, state, args, client, checkpoint, checkpoint_path)
+        except KeyboardInterrupt:
+            print(f"\nInterrupted; run again with --resume to continue from {state['last_id'] or 'the start'}.")
+            sys.exit(130)
+        except Exception as e:
+            print(f"❌ {collection}: {e}")
+            print(f"Run again with --resume to continue from {state['last_id'] or 'the start'}.")
+            sys.exit(1)
+
+    if not args.dry_run and checkpoint_path.exists():
+        checkpoint_path.unlink()
+        print("Reindex complete; checkpoint removed.")
+
+
+if __name__ == "__main__":
+    main()
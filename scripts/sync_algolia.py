@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Keep the Algolia indexes in sync with Firestore as a single dedicated process.
+
+Runs the same AlgoliaSyncWorker the backend can run (see
+app_prueba_3/api/algolia_sync.py): one on_snapshot listener per indexed
+collection, changes batched every ALGOLIA_SYNC_WINDOW seconds. Starting the
+listeners reads every document of those collections once, so run exactly one
+instance, and leave ALGOLIA_SYNC_ENABLED=false in the backend processes.
+
+Run scripts/reindex_algolia.py first for the initial load. After every
+successful send the read time of the last snapshot is saved to
+ALGOLIA_SYNC_CHECKPOINT; on the next start, documents written since then are
+sent again, so writes made while this process was down are not lost (deleted
+documents still need a reindex with --swap). Listeners that stop are restarted.
+
+Usage:
+  source .venv/bin/activate
+  python scripts/sync_algolia.py
+  python scripts/sync_algolia.py --window 5
+"""
+import argparse
+import signal
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app_prueba_3.api.algolia_sync import AlgoliaSyncWorker, ALGOLIA_SYNC_WINDOW  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--window", type=float, default=ALGOLIA_SYNC_WINDOW,
+                        help="Seconds to batch changes before sending them to Algolia")
+    args = parser.parse_args()
+
+    worker = AlgoliaSyncWorker(window=args.window)
+    if not worker.start():
+        sys.exit(1)
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    try:
+        while not stop.wait(1):
+            pass
+    finally:
+        # Stops the listeners and sends the changes still pending
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
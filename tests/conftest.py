@@ -0,0 +1,26 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Los tests importan el paquete desde la raíz del repositorio (igual que scripts/)
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope="session")
+def load_script():
+    """Carga un script de scripts/ como módulo (p. ej. las implementaciones anteriores de los benchmarks)."""
+    loaded = {}
+
+    def load(name: str):
+        if name not in loaded:
+            spec = importlib.util.spec_from_file_location(f"scripts_{name}", ROOT / "scripts" / f"{name}.py")
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            loaded[name] = module
+        return loaded[name]
+
+    return load
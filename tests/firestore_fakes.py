@@ -0,0 +1,110 @@
+"""
+Dobles mínimos del cliente de Firestore para probar FirestoreAPI sin credenciales.
+
+Solo cubren lo que usan las consultas de lista y el contador de cotizaciones:
+where con '==', order_by, select, start_after, limit, get/stream y documentos.
+"""
+
+
+class MissingIndex(Exception):
+    def __init__(self):
+        super().__init__("400 The query requires an index. You can create it here: https://...")
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocumentRef:
+    def __init__(self, db, collection, doc_id):
+        self.db, self.collection, self.id = db, collection, doc_id
+
+    def get(self, transaction=None):
+        self.db.reads += 1
+        return FakeSnapshot(self.id, self.db.data.get(self.collection, {}).get(self.id))
+
+
+class FakeQuery:
+    def __init__(self, db, collection, filters=(), order=None, after=None, limit=0):
+        self.db, self.collection = db, collection
+        self.filters, self.order, self.after, self._limit = filters, order, after, limit
+
+    def _copy(self, **changes):
+        values = dict(filters=self.filters, order=self.order, after=self.after, limit=self._limit)
+        values.update(changes)
+        return FakeQuery(self.db, self.collection, **values)
+
+    def where(self, filter):
+        return self._copy(filters=self.filters + ((filter.field_path, filter.value),))
+
+    def order_by(self, field, direction=None):
+        return self._copy(order=(field, str(direction).upper().endswith("DESCENDING")))
+
+    def select(self, fields):
+        return self
+
+    def start_after(self, snapshot):
+        return self._copy(after=snapshot.id)
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def document(self, doc_id):
+        return FakeDocumentRef(self.db, self.collection, doc_id)
+
+    def get(self, transaction=None):
+        if self.order is not None and self.order[0] in self.db.unindexed:
+            raise MissingIndex()
+        self.db.queries += 1
+        rows = sorted(self.db.data.get(self.collection, {}).items())
+        rows = [(doc_id, data) for doc_id, data in rows if all(data.get(f) == v for f, v in self.filters)]
+        if self.order is not None:
+            field, descending = self.order
+            rows.sort(key=lambda row: row[1].get(field), reverse=descending)
+        if self.after is not None:
+            position = [doc_id for doc_id, _ in rows].index(self.after)
+            rows = rows[position + 1:]
+        if self._limit:
+            rows = rows[:self._limit]
+        return [FakeSnapshot(doc_id, data) for doc_id, data in rows]
+
+    stream = get
+
+
+class FakeTransaction:
+    def __init__(self, db):
+        self.db = db
+
+    def set(self, ref, data):
+        self.db.data.setdefault(ref.collection, {})[ref.id] = dict(data)
+
+
+class FakeDB:
+    def __init__(self, data=None, unindexed=()):
+        self.data = data or {}           # colección -> id -> documento
+        self.unindexed = set(unindexed)  # campos cuyo order_by falla por falta de índice
+        self.queries = 0
+        self.reads = 0
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+
+def make_api(monkeypatch, firestore_api_module, db):
+    """FirestoreAPI sin credenciales (aunque haya un .env) conectada a `db`."""
+    monkeypatch.setattr(firestore_api_module, "load_dotenv", lambda: None)
+    monkeypatch.delenv("FIREBASE_PROJECT_ID", raising=False)
+    api = firestore_api_module.FirestoreAPI()
+    api.db = db
+    api.firebase_initialized = True
+    return api
+
@@ -0,0 +1,79 @@
+from app_prueba_3.api.client_index import ClientNameIndex
+from app_prueba_3.api.company_names import normalize_company_name
+from app_prueba_3.utils import Client
+
+
+def client(client_id, razonsocial):
+    return Client(id=client_id, razonsocial=razonsocial)
+
+
+def ids(matches):
+    return [c.id for c, _ in matches]
+
+
+def make_index(**kwargs):
+    index = ClientNameIndex(normalize_company_name, **kwargs)
+    index.add_many([
+        (client("1", "Acme S.A."), "A1"),
+        (client("2", "Luminarias del Sur SRL"), "A1"),
+        (client("3", "Luminarias del Norte S.A."), "A2"),
+        (client("4", "Electro Norte SAS"), "A2"),
+    ])
+    return index
+
+
+def test_exact_normalized_name_scores_one():
+    index = make_index()
+    matches = index.match("ACME sociedad anonima")
+    assert matches[0][0].id == "1"
+    assert matches[0][1] == 1.0
+
+
+def test_similar_names_sorted_by_similarity():
+    index = make_index()
+    matches = index.match("Luminarias del Sud", similarity_threshold=0.5)
+    assert ids(matches)[:2] == ["2", "3"]
+    assert matches[0][1] >= matches[1][1]
+    assert index.match("Luminarias del Sud", similarity_threshold=0.5, limit=1)[0][0].id == "2"
+
+
+def test_area_restricts_candidates():
+    index = make_index()
+    assert ids(index.match("Luminarias", similarity_threshold=0.3, area="A2")) == ["3"]
+    assert index.match("Acme", area="A2") == []
+
+
+def test_threshold_and_empty_query():
+    index = make_index()
+    assert index.match("Zeta Química", similarity_threshold=0.8) == []
+    assert index.match("") == []
+    assert index.match("S.A.") == []
+
+
+def test_updates_and_removals():
+    index = make_index()
+    index.add_many([(client("1", "Omega SRL"), "A1")])
+    assert index.match("Acme", similarity_threshold=0.9) == []
+    assert ids(index.match("Omega")) == ["1"]
+
+    # Cambio de área sin cambio de nombre
+    index.add_many([(client("1", "Omega SRL"), "A2")])
+    assert ids(index.match("Omega", area="A2")) == ["1"]
+    assert index.match("Omega", area="A1") == []
+
+    index.remove("1")
+    assert index.match("Omega") == []
+    assert len(index) == 3
+
+
+def test_clients_without_id_are_ignored():
+    index = ClientNameIndex(normalize_company_name)
+    index.add_many([(client("", "Sin ID S.A."), "A1")])
+    assert len(index) == 0
+
+
+def test_finds_match_when_common_words_are_too_frequent():
+    index = ClientNameIndex(normalize_company_name, max_candidates=5)
+    index.add_many([(client(str(i), f"Industrias Genericas {i}"), "A1") for i in range(50)])
+    index.add_many([(client("target", "Industrias Zapala"), "A1")])
+    assert index.match("Industrias Zapala S.A.", limit=1)[0][0].id == "target"
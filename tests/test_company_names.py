@@ -0,0 +1,50 @@
+import pytest
+
+from app_prueba_3.api.company_names import clear_cache, normalize_company_name, normalize_many
+
+EXAMPLES = [
+    ("Acme S.A.", "ACME"),
+    ("acme sa", "ACME"),
+    ("ACME S. A.", "ACME"),
+    ("Luminarias del Sur S.R.L.", "LUMINARIAS DEL SUR"),
+    ("Tecno SRL", "TECNO"),
+    ("Grupo Norte SAS", "GRUPO NORTE"),
+    ("Hnos. Pérez S.H.", "HNOS PÉREZ"),
+    ("Metalúrgica (Rosario) SAICYF", "METALÚRGICA ROSARIO"),
+    ("Plast SAICYF", "PLAST"),
+    ("Electro Sociedad Anonima", "ELECTRO"),
+    ("  Química   Argentina  ", "QUÍMICA ARGENTINA"),
+    ("SA", ""),
+    ("Casa Central", "CASA CENTRAL"),
+    ("", ""),
+]
+
+
+@pytest.fixture(scope="module")
+def legacy(load_script):
+    return load_script("benchmark_company_names").legacy_normalize_company_name
+
+
+@pytest.mark.parametrize("name, expected", EXAMPLES)
+def test_normalize_company_name(name, expected):
+    assert normalize_company_name(name) == expected
+
+
+def test_matches_previous_implementation(legacy, load_script):
+    names = load_script("benchmark_company_names").synthetic_names(2000, seed=3)
+    names += [name for name, _ in EXAMPLES] + ["Ltd LTD", "Cicsa Norte CICSA", "Acme S.A. S.R.L.", "İNDUSTRİA SAİCAİ"]
+    clear_cache()
+    for name in names:
+        assert normalize_company_name(name) == legacy(name), name
+
+
+def test_normalize_many_matches_one_by_one(load_script):
+    names = load_script("benchmark_company_names").synthetic_names(500, seed=5)
+    names += ["", None, "Acme S.A.", "Acme S.A."]
+    assert normalize_many(names) == [normalize_company_name(name) for name in names]
+
+
+def test_normalize_many_with_separator_in_a_name():
+    names = ["Acme\x00 S.A.", "Tecno SRL"]
+    assert normalize_many(names) == [normalize_company_name(name) for name in names]
+    assert normalize_many([]) == []
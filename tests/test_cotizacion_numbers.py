@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("firebase_admin")
+
+from app_prueba_3.api import firestore_api as firestore_api_module  # noqa: E402
+from firestore_fakes import FakeDB, make_api  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def run_transactions_inline(monkeypatch):
+    # La transacción real reintenta contra el servidor; aquí la función se ejecuta una vez
+    monkeypatch.setattr(firestore_api_module.firestore, "transactional", lambda fn: fn)
+
+
+def cotizaciones():
+    return {
+        "c1": {"area": "A1", "year": "25", "number": "0003"},
+        "c2": {"area": "A1", "year": "25", "number": "0010"},
+        "c3": {"area": "A1", "year": "24", "number": "0090"},
+        "c4": {"area": "A2", "year": "25", "number": "0050"},
+    }
+
+
+def counter(db, key):
+    return db.data.get("contadores_cotizacion", {}).get(key)
+
+
+@pytest.mark.parametrize("unindexed", [(), ("number",)])
+def test_first_allocation_seeds_from_existing_numbers(monkeypatch, unindexed):
+    db = FakeDB({"cotizaciones": cotizaciones()}, unindexed=unindexed)
+    api = make_api(monkeypatch, firestore_api_module, db)
+
+    assert api.allocate_cotizacion_number("A1", "25") == {"number": "0011", "year": "25", "formatted": "0011/25"}
+    assert counter(db, "A1_25")["last_number"] == 11
+
+
+def test_later_allocations_only_read_the_counter(monkeypatch):
+    db = FakeDB({"cotizaciones": cotizaciones()})
+    api = make_api(monkeypatch, firestore_api_module, db)
+    api.allocate_cotizacion_number("A1", "25")
+
+    queries = db.queries
+    assert api.allocate_cotizacion_number("A1", "25")["formatted"] == "0012/25"
+    assert api.allocate_cotizacion_number("A1", "25")["formatted"] == "0013/25"
+    assert db.queries == queries
+
+
+def test_counters_are_per_area_and_year(monkeypatch):
+    db = FakeDB({"cotizaciones": cotizaciones()})
+    api = make_api(monkeypatch, firestore_api_module, db)
+    assert api.allocate_cotizacion_number("A2", "25")["number"] == "0051"
+    assert api.allocate_cotizacion_number("A1", "24")["number"] == "0091"
+    assert api.allocate_cotizacion_number("A3", "25")["number"] == "0001"
+
+
+def test_seed_ignores_non_numeric_numbers(monkeypatch):
+    db = FakeDB({"cotizaciones": {"c1": {"area": "A1", "year": "25", "number": "s/n"},
+                                  "c2": {"area": "A1", "year": "25", "number": "0004"}}},
+                unindexed={"number"})
+    api = make_api(monkeypatch, firestore_api_module, db)
+    assert api.allocate_cotizacion_number("A1", "25")["number"] == "0005"
+
+
+def test_next_number_does_not_reserve(monkeypatch):
+    db = FakeDB({"cotizaciones": cotizaciones()})
+    api = make_api(monkeypatch, firestore_api_module, db)
+    assert api.get_next_cotizacion_number("A1", "25")["formatted"] == "0011/25"
+    assert counter(db, "A1_25") is None
+    assert api.allocate_cotizacion_number("A1", "25")["formatted"] == "0011/25"
+    assert api.get_next_cotizacion_number("A1", "25")["formatted"] == "0012/25"
+
+
+def test_allocation_fails_without_firebase(monkeypatch):
+    api = make_api(monkeypatch, firestore_api_module, FakeDB())
+    api.firebase_initialized = False
+    assert api.allocate_cotizacion_number("A1", "25") is None
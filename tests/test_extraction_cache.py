@@ -0,0 +1,72 @@
+import io
+import os
+
+import pytest
+
+# extraction_cache importa los extractores y el cliente de Drive
+pytest.importorskip("pdfplumber")
+pytest.importorskip("googleapiclient")
+
+from app_prueba_3.api import extraction_cache as extraction_cache_module  # noqa: E402
+from app_prueba_3.api.extraction_cache import ExtractionCache  # noqa: E402
+
+
+def set_age(path, seconds_ago):
+    stamp = 1_700_000_000 - seconds_ago
+    os.utime(path, (stamp, stamp))
+
+
+def test_content_key_prefers_md5():
+    assert ExtractionCache.content_key("f1", {"md5Checksum": "abc"}) == "abc"
+    by_date = ExtractionCache.content_key("f1", {"modifiedTime": "2024-01-01", "size": "10"})
+    assert by_date == ExtractionCache.content_key("f1", {"modifiedTime": "2024-01-01", "size": "10"})
+    assert by_date != ExtractionCache.content_key("f1", {"modifiedTime": "2024-01-02", "size": "10"})
+
+
+def test_round_trip_of_results_and_pdfs(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=1_000_000)
+    assert cache.get_result("k") is None
+    assert cache.get_pdf_path("k") is None
+
+    cache.put_result("k", {"metadata": {"empresa": "ACME"}})
+    cache.put_pdf("k", io.BytesIO(b"%PDF-1.4 ..."))
+    assert cache.get_result("k") == {"metadata": {"empresa": "ACME"}}
+    assert cache.get_pdf_path("k").read_bytes() == b"%PDF-1.4 ..."
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_evicts_least_recently_used_files(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=250)
+    cache.put_pdf("old", b"x" * 100)
+    set_age(cache._pdf_path("old"), 30)
+    cache.put_pdf("mid", b"x" * 100)
+    set_age(cache._pdf_path("mid"), 20)
+    cache.put_pdf("new", b"x" * 100)
+    # put_pdf ya desalojó para quedar por debajo del límite
+    assert sorted(p.stem for p in (tmp_path / "pdfs").iterdir()) == ["mid", "new"]
+
+    set_age(cache._pdf_path("mid"), 10)
+    set_age(cache._pdf_path("new"), 20)
+    cache.get_pdf_path("new")  # usarlo lo vuelve el más reciente
+    cache.put_pdf("newest", b"x" * 100)
+    assert sorted(p.stem for p in (tmp_path / "pdfs").iterdir()) == ["new", "newest"]
+
+
+def test_evict_is_noop_under_limit(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=1000)
+    cache.put_result("a", {"x": 1})
+    assert cache.evict() == 0
+    assert cache.get_result("a") == {"x": 1}
+
+
+def test_cached_result_skips_download(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path), max_bytes=1_000_000)
+    monkeypatch.setattr(extraction_cache_module.cotizacion_extractor, "get_drive_file_metadata",
+                        lambda file_id: {"md5Checksum": "md5-" + file_id})
+    cache.put_result("md5-f1", {"tablas": []})
+
+    def fail(*args, **kwargs):
+        raise AssertionError("no debería descargar")
+
+    monkeypatch.setattr(extraction_cache_module.drive_client, "download", fail)
+    assert cache.get_cotizacion_full_data("f1") == {"tablas": []}
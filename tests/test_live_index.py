@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from app_prueba_3.api.live_index import LiveIndex
+
+
+class FakeWatch:
+    def __init__(self):
+        self.is_active = True
+        self.unsubscribed = False
+
+    def unsubscribe(self):
+        self.unsubscribed = True
+        self.is_active = False
+
+
+class FakeQuery:
+    def __init__(self):
+        self.callback = None
+        self.watch = FakeWatch()
+
+    def on_snapshot(self, callback):
+        self.callback = callback
+        return self.watch
+
+
+def doc(doc_id, **data):
+    return SimpleNamespace(id=doc_id, to_dict=lambda: dict(data))
+
+
+def change(kind, document):
+    return SimpleNamespace(type=SimpleNamespace(name=kind), document=document)
+
+
+def to_model(data):
+    return SimpleNamespace(id=data["id"], ts=data.get("ts", 0), name=data.get("name", ""))
+
+
+def make_index(limit=0):
+    query = FakeQuery()
+    # Más recientes primero
+    index = LiveIndex("cotizaciones/test", query, to_model, lambda m: (-m.ts,), limit=limit)
+    return index, query
+
+
+def ids(models):
+    return [m.id for m in models]
+
+
+def test_applies_changes_in_sort_order():
+    index, query = make_index()
+    docs = [doc("a", ts=1), doc("b", ts=3), doc("c", ts=2)]
+    query.callback(docs, [change("ADDED", d) for d in docs], None)
+    assert index.ready and index.version == 1
+    assert ids(index.items()) == ["b", "c", "a"]
+    assert ids(index.items(1, 2)) == ["c"]
+
+    query.callback(docs, [change("MODIFIED", doc("a", ts=5, name="nuevo")), change("REMOVED", doc("b"))], None)
+    assert ids(index.items()) == ["a", "c"]
+    assert index.get("a").name == "nuevo"
+    assert index.get("b") is None
+    assert len(index) == 2
+
+
+def test_last_snapshot_only_when_page_is_full():
+    index, query = make_index(limit=2)
+    docs = [doc("a", ts=2), doc("b", ts=1)]
+    query.callback(docs, [change("ADDED", d) for d in docs], None)
+    assert index.last_snapshot is docs[-1]
+
+    query.callback(docs[:1], [change("REMOVED", docs[1])], None)
+    assert index.last_snapshot is None
+
+
+def test_failed_when_callback_breaks_or_watch_stops():
+    def broken(data):
+        raise ValueError("boom")
+
+    query = FakeQuery()
+    index = LiveIndex("x", query, broken, lambda m: (0,))
+    query.callback([doc("a")], [change("ADDED", doc("a"))], None)
+    assert index.failed and index.error == "boom"
+
+    index, query = make_index()
+    assert not index.failed
+    query.watch.is_active = False
+    assert index.failed
+
+
+def test_close_unsubscribes():
+    index, query = make_index()
+    index.close()
+    assert query.watch.unsubscribed
+
+
+def test_wait_for_change_wakes_on_snapshot_from_another_thread():
+    index, query = make_index()
+
+    async def scenario():
+        waiting = asyncio.create_task(index.wait_for_change(0, timeout=5))
+        await asyncio.sleep(0.01)
+        threading.Thread(target=query.callback, args=([doc("a")], [change("ADDED", doc("a"))], None)).start()
+        return await waiting
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_wait_for_change_times_out_and_wait_ready_reports_failure():
+    index, query = make_index()
+
+    async def scenario():
+        version = await index.wait_for_change(0, timeout=0.01)
+        ready = await index.wait_ready(timeout=0.05)
+        return version, ready
+
+    assert asyncio.run(scenario()) == (0, False)
+    assert index.failed
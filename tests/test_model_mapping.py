@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from app_prueba_3.api.model_mapping import (
+    CLIENT_SPEC,
+    COT_SPEC,
+    algolia_record,
+    algolia_to_client,
+    algolia_to_cot,
+    firestore_to_certs,
+    firestore_to_client,
+    firestore_to_cot,
+    firestore_to_fam,
+    timestamp_to_date,
+)
+from app_prueba_3.utils import Model
+
+
+@pytest.fixture(scope="module")
+def bench(load_script):
+    return load_script("benchmark_model_mappers")
+
+
+@pytest.mark.parametrize("make_doc, legacy, compiled", [
+    ("make_cot_doc", "legacy_firestore_to_cot", firestore_to_cot),
+    ("make_fam_doc", "legacy_firestore_to_fam", firestore_to_fam),
+    ("make_client_doc", "legacy_firestore_to_client", firestore_to_client),
+    ("make_cot_hit", "legacy_algolia_to_cot", algolia_to_cot),
+])
+def test_same_models_as_previous_converters(bench, make_doc, legacy, compiled):
+    rng = random.Random(11)
+    make_doc, legacy = getattr(bench, make_doc), getattr(bench, legacy)
+    for i in range(300):
+        doc = make_doc(i, rng)
+        assert compiled(doc).dict() == legacy(doc).dict(), doc
+
+
+@pytest.mark.parametrize("legacy, compiled", [
+    ("legacy_firestore_to_cot", firestore_to_cot),
+    ("legacy_firestore_to_fam", firestore_to_fam),
+    ("legacy_firestore_to_client", firestore_to_client),
+    ("legacy_algolia_to_cot", algolia_to_cot),
+])
+def test_missing_keys_use_the_same_defaults(bench, legacy, compiled):
+    assert compiled({}).dict() == getattr(bench, legacy)({}).dict()
+
+
+def test_none_and_wrong_types_are_normalized():
+    cot = firestore_to_cot({
+        "id": "c1", "number": 7, "year": 5, "client": {"ref": "x"}, "estado": None,
+        "issuedate_timestamp": "no es número",
+    })
+    assert (cot.num, cot.year, cot.client_id, cot.status, cot.issuedate_timestamp) == ("0007", "05", "", "", 0.0)
+
+    fam = firestore_to_fam({"id": "f1", "rubro": None, "client": 3})
+    assert (fam.rubro, fam.client_id) == ("", "")
+    assert fam.models == [Model()]
+
+    cert = firestore_to_certs({"id": "k1", "ensayos": None, "revisionnumber": 1})
+    assert (cert.ensayos, cert.rev) == ([], "01")
+
+    client = firestore_to_client({"id": "cl1", "active_fams": None})
+    assert client.active_fams == 0
+
+
+def test_fam_models_are_not_shared_between_rows():
+    first, second = firestore_to_fam({"id": "a"}), firestore_to_fam({"id": "b"})
+    assert first.models is not second.models
+
+
+def test_timestamp_to_date():
+    assert timestamp_to_date(1714608000000) == timestamp_to_date(1714608000)
+    assert timestamp_to_date("1714608000") == timestamp_to_date(1714608000)
+    assert timestamp_to_date("") == ""
+    assert timestamp_to_date("02-05-2024") == "02-05-2024"
+
+
+def test_algolia_record_round_trip():
+    client = firestore_to_client({"id": "cl1", "razonsocial": "ACME", "cuit": "30-1", "active_fams": 4})
+    record = algolia_record(client, CLIENT_SPEC)
+    assert algolia_to_client(record).dict() == client.dict()
+
+    cot_record = algolia_record(firestore_to_cot({"id": "c1", "number": "12"}), COT_SPEC)
+    assert cot_record["objectID"] == "c1" and "object_id" not in cot_record
+    assert cot_record["number"] == "0012"
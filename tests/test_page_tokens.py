@@ -0,0 +1,114 @@
+import base64
+import json
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("firebase_admin")
+
+from app_prueba_3.api import firestore_api as firestore_api_module  # noqa: E402
+from firestore_fakes import FakeDB, FakeSnapshot, make_api  # noqa: E402
+
+ASC = "ASCENDING"
+
+
+@pytest.fixture
+def db():
+    docs = {f"f{i:02d}": {"area": "A1" if i % 2 else "A2", "razonsocial": f"R{i:02d}"} for i in range(10)}
+    return FakeDB({"familias": docs})
+
+
+@pytest.fixture
+def api(monkeypatch, db):
+    return make_api(monkeypatch, firestore_api_module, db)
+
+
+def page(api, page_token="", area="A1", order_by="razonsocial", page_size=2, filters=None, **kwargs):
+    return api.get_collection_page(
+        collection="familias", area=area, order_by=order_by, direction=ASC,
+        page_size=page_size, filters=filters, page_token=page_token, **kwargs
+    )
+
+
+def test_token_round_trip(api):
+    fingerprint = api._query_fingerprint("familias", "A1", None, "razonsocial", ASC)
+    token = api._register_page_cursor("familias", FakeSnapshot("doc-1", {}), fingerprint)
+
+    payload = json.loads(base64.urlsafe_b64decode(token))
+    assert payload == {"c": "familias", "q": fingerprint, "id": "doc-1"}
+    assert api._page_token_doc_id("familias", token, fingerprint) == "doc-1"
+    assert api._resolve_page_token("familias", token, fingerprint).id == "doc-1"
+
+
+def test_fingerprint_depends_on_query_not_page_size(api):
+    base = api._query_fingerprint("familias", "A1", None, "razonsocial", ASC)
+    assert base == api._query_fingerprint("familias", "A1", None, "razonsocial", ASC)
+    assert base != api._query_fingerprint("familias", "A2", None, "razonsocial", ASC)
+    assert base != api._query_fingerprint("familias", "A1", [("status", "==", "x")], "razonsocial", ASC)
+    assert base != api._query_fingerprint("familias", "A1", None, "family", ASC)
+    assert base != api._query_fingerprint("familias", "A1", None, "razonsocial", "DESCENDING")
+
+
+def test_pages_continue_after_the_previous_one(api):
+    seen = []
+    docs, token = page(api)
+    while True:
+        seen += [d["id"] for d in docs]
+        if not token:
+            break
+        docs, token = page(api, token)
+    assert seen == ["f01", "f03", "f05", "f07", "f09"]
+
+
+def test_token_from_another_query_is_rejected(api):
+    _, token = page(api, area="A1")
+    assert token
+    assert page(api, token, area="A2") == ([], "")
+    assert page(api, token, order_by="family") == ([], "")
+    assert page(api, token, filters=[("razonsocial", "==", "R03")]) == ([], "")
+    # Otra colección o un token ilegible tampoco sirven
+    assert api._page_token_doc_id("certificados", token, api._query_fingerprint("familias", "A1", None, "razonsocial", ASC)) == ""
+    assert page(api, "no-es-un-token") == ([], "")
+
+
+def test_page_size_may_change_between_pages(api):
+    _, token = page(api, page_size=2)
+    docs, _ = page(api, token, page_size=3)
+    assert [d["id"] for d in docs] == ["f05", "f07", "f09"]
+
+
+def test_expired_cursor_rereads_the_document(api, db):
+    _, token = page(api)
+    api.page_cursors.clear()
+    reads = db.reads
+    docs, _ = page(api, token)
+    assert [d["id"] for d in docs] == ["f05", "f07"]
+    assert db.reads == reads + 1
+
+
+def test_cursor_memory_is_bounded(api):
+    api.max_page_cursors = 2
+    tokens = [page(api, area=area, page_size=1)[1] for area in ("A1", "A2")]
+    tokens.append(page(api, tokens[0], page_size=1)[1])
+    assert list(api.page_cursors) == tokens[1:]
+
+
+def test_query_cache_and_bypass(api, db):
+    first = page(api)
+    queries = db.queries
+    assert page(api) == first
+    assert db.queries == queries
+
+    page(api, page_size=3, use_cache=False)
+    page(api, page_size=3, use_cache=False)
+    assert db.queries == queries + 2
+    assert len(api.query_cache) == 1
+
+
+def test_missing_index_falls_back_to_unordered_query(monkeypatch):
+    db = FakeDB({"familias": {"b": {"area": "A1", "razonsocial": "Z"}, "a": {"area": "A1", "razonsocial": "Y"}}},
+                unindexed={"razonsocial"})
+    api = make_api(monkeypatch, firestore_api_module, db)
+    docs, token = page(api, page_size=0)
+    assert [d["id"] for d in docs] == ["a", "b"]
+    assert token == ""
@@ -0,0 +1,104 @@
+import random
+from types import SimpleNamespace
+
+from app_prueba_3.api.search_index import SearchIndex, SEARCH_FIELDS, get_search_index
+
+FIELDS = ["client", "product"]
+
+
+def row(row_id, client, product=""):
+    return SimpleNamespace(id=row_id, client=client, product=product)
+
+
+def ids(rows):
+    return [r.id for r in rows]
+
+
+def test_search_matches_substring_in_any_field():
+    index = SearchIndex(FIELDS)
+    index.add_many([
+        row("1", "ACME S.A.", "Luminaria LED"),
+        row("2", "Electro Norte", "Cable"),
+        row("3", "Norteña SRL", "Luminaria"),
+    ])
+    assert ids(index.search("lumin")) == ["1", "3"]
+    assert ids(index.search("NORTE")) == ["2", "3"]
+    assert ids(index.search("norteñ")) == ["3"]
+    assert index.search("inexistente") == []
+
+
+def test_short_queries_scan_normalized_text():
+    index = SearchIndex(FIELDS)
+    index.add_many([row("1", "AB"), row("2", "xyz"), row("3", "cab")])
+    assert ids(index.search("ab")) == ["1", "3"]
+    assert ids(index.search("y")) == ["2"]
+    assert len(index.search("")) == 3
+
+
+def test_matches_do_not_span_fields():
+    index = SearchIndex(FIELDS)
+    index.add(row("1", "abc", "def"))
+    assert index.search("cde") == []
+    assert index.search("c\x00d") == []
+
+
+def test_agrees_with_a_plain_scan():
+    rng = random.Random(7)
+    alphabet = "abcde "
+    rows = [row(str(i), "".join(rng.choice(alphabet) for _ in range(12)),
+                "".join(rng.choice(alphabet) for _ in range(8))) for i in range(300)]
+    index = SearchIndex(FIELDS)
+    index.add_many(rows)
+    for _ in range(200):
+        query = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5)))
+        expected = [r.id for r in rows if query in r.client or query in r.product]
+        assert ids(index.search(query)) == expected, query
+
+
+def test_updates_keep_load_order_and_drop_old_text():
+    index = SearchIndex(FIELDS)
+    index.add_many([row("1", "alfa"), row("2", "beta")])
+    index.add(row("1", "gamma"))
+    assert index.search("alfa") == []
+    assert ids(index.search("gamma")) == ["1"]
+    assert ids(index.search("a")) == ["1", "2"]
+
+    index.remove("2")
+    assert index.search("beta") == []
+    assert len(index) == 1
+
+
+def test_rows_without_key_are_skipped():
+    index = SearchIndex(FIELDS)
+    index.add_many([row("", "sin id"), row("1", "con id")])
+    assert ids(index.search(" id")) == ["1"]
+
+
+def test_replace_all_swaps_content_and_marks_complete():
+    index = SearchIndex(FIELDS)
+    index.add_many([row("1", "viejo"), row("2", "otro")])
+    assert not index.is_complete(60)
+
+    index.replace_all([row("3", "nuevo"), row("4", "nuevo bis"), row("3", "nuevo")])
+    assert index.search("viejo") == []
+    assert ids(index.search("nuevo")) == ["3", "4"]
+    assert len(index) == 2
+    assert index.is_complete(60)
+    assert not index.is_complete(0)
+
+    # Las filas agregadas después del reemplazo siguen numerándose a continuación
+    index.add(row("5", "nuevo tris"))
+    assert ids(index.search("nuevo")) == ["3", "4", "5"]
+
+
+def test_filter_keeps_input_order():
+    index = SearchIndex(FIELDS)
+    rows = [row("2", "match b"), row("1", "match a"), row("3", "otro")]
+    assert ids(index.filter(rows, "match")) == ["2", "1"]
+
+
+def test_shared_index_per_collection_and_area():
+    index = get_search_index("familias", "area-test")
+    assert get_search_index("familias", "area-test") is index
+    assert get_search_index("familias", "otra-area") is not index
+    assert index.fields == SEARCH_FIELDS["familias"]
@@ -0,0 +1,73 @@
+from app_prueba_3.api import ttl_cache
+from app_prueba_3.api.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_returns_value_until_it_expires(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", clock)
+    cache = TTLCache(max_entries=4, ttl=10)
+
+    cache.set("a", 1)
+    clock.now += 9
+    assert cache.get("a") == 1
+
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.get("a", "default") == "default"
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_per_entry_ttl_overrides_default(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", clock)
+    cache = TTLCache(ttl=60)
+
+    cache.set("count", 5, ttl=1)
+    cache.set("page", [1, 2])
+    clock.now += 2
+    assert cache.get("count") is None
+    assert cache.get("page") == [1, 2]
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" pasa a ser la menos usada
+
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_set_existing_key_refreshes_value_and_position():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 10)
+    cache.set("c", 3)
+    assert cache.get("a") == 10
+    assert cache.get("b") is None
+
+
+def test_invalidate_with_predicate_and_all():
+    cache = TTLCache(ttl=60)
+    cache.set(("cotizaciones", "A1"), 1)
+    cache.set(("cotizaciones", "A2"), 2)
+    cache.set(("familias", "A1"), 3)
+
+    assert cache.invalidate(lambda key: key[0] == "cotizaciones") == 2
+    assert cache.get(("familias", "A1")) == 3
+    assert cache.invalidate() == 1
+    assert len(cache) == 0